@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""
+通信プロファイルごとのHLSダウンロード性能を計測するベンチマーク
+
+ローカルの配信サーバー（media_server.py）が返すHLSストリームを、
+プロファイル（conservative / balanced / datacenter）ごとにVideoDownloaderでダウンロードし、
+1秒あたりに取得できた断片の数を比較する。ネットワークには一切アクセスしない
+
+使用例:
+    python benchmarks/bench_hls.py
+    python benchmarks/bench_hls.py --segments 120 --latency 0.1 --runs 3 --json hls.json
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import contextlib
+import tempfile
+import statistics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from media_server import SyntheticMediaServer  # noqa: E402
+
+
+def run_once(url, profile, output_dir):
+    """1回ダウンロードし、所要時間（秒）と出力ファイルのパスを返す"""
+    from datascoop.downloaders import VideoDownloader
+
+    downloader = VideoDownloader(output_dir=output_dir, throughput_profile=profile)
+    started = time.perf_counter()
+    # yt-dlpの標準出力への表示は結果と混ざるため捨てる
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        video_file = downloader.download(url, format="best", filename=f"{profile}-{time.time_ns()}")
+    elapsed = time.perf_counter() - started
+    if video_file and os.path.exists(video_file):
+        os.remove(video_file)
+    return elapsed, video_file
+
+
+def main():
+    """ベンチマークを実行"""
+    from datascoop.utils.config import ConfigManager
+
+    parser = argparse.ArgumentParser(description="通信プロファイルごとのHLSダウンロード性能ベンチマーク")
+    parser.add_argument("--segments", type=int, default=60, help="HLSの断片の数 (デフォルト: 60)")
+    parser.add_argument("--segment-size", type=int, default=256 * 1024, help="断片1つあたりのバイト数 (デフォルト: 262144)")
+    parser.add_argument("--latency", type=float, default=0.05, help="断片ごとの応答遅延（秒） (デフォルト: 0.05)")
+    parser.add_argument("--runs", type=int, default=3, help="各プロファイルの計測回数 (デフォルト: 3)")
+    parser.add_argument("--profile", action="append", help="計測するプロファイル (省略時はすべて)")
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    args = parser.parse_args()
+
+    # ダウンローダーのログはベンチマークの結果と混ざるため抑制する
+    logging.disable(logging.INFO)
+
+    profiles = args.profile or list(ConfigManager.THROUGHPUT_PROFILES)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir, SyntheticMediaServer(
+        segments=args.segments, segment_size=args.segment_size, latency=args.latency
+    ) as server:
+        url = server.url("/hls/stream.m3u8")
+        for profile in profiles:
+            samples = []
+            for _ in range(args.runs):
+                before = server.segment_requests
+                elapsed, video_file = run_once(url, profile, tmp_dir)
+                if not video_file or server.segment_requests - before < args.segments:
+                    print(f"{profile}: ダウンロードに失敗しました", file=sys.stderr)
+                    sys.exit(1)
+                samples.append(elapsed)
+
+            median = statistics.median(samples)
+            options = ConfigManager.THROUGHPUT_PROFILES[profile]
+            results[profile] = {
+                "concurrent_fragment_downloads": options.get("concurrent_fragment_downloads"),
+                "runs": args.runs,
+                "median_s": median,
+                "fragments_per_s": args.segments / median,
+                "mb_per_s": args.segments * args.segment_size / median / (1024 * 1024),
+            }
+            print(f"{profile:<13} 同時取得数 {results[profile]['concurrent_fragment_downloads']:>3}  "
+                  f"{median:7.2f} s  {results[profile]['fragments_per_s']:8.1f} 断片/s  "
+                  f"{results[profile]['mb_per_s']:7.1f} MiB/s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "segments": args.segments,
+                "segment_size": args.segment_size,
+                "latency": args.latency,
+                "results": results,
+            }, f, indent=2)
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
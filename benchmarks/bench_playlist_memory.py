@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""
+長いプレイリストを処理する際のメモリ使用量を計測するベンチマーク
+
+合成したプレイリスト（YouTubeのフラット抽出と同じ形式のエントリ）をページ単位で遅延して返し、
+download_playlistで全エントリを処理したときのピークメモリを動画数ごとに計測する
+各エントリのダウンロードは、フォーマット一覧を含む完全なメタデータを作成してファイル名を決めるだけで、
+ネットワークには一切アクセスしない
+
+計測はサイズごとに新しいPythonプロセスで行い、以下を報告する
+- peak_rss_mb:    プロセスの最大常駐メモリ（resource.getrusage）
+- traced_peak_mb: 処理中にPythonが確保したメモリのピーク（tracemalloc）
+
+--eager を指定すると、従来どおりエントリを一括で取得して処理した場合と比較する
+
+使用例:
+    python benchmarks/bench_playlist_memory.py --sizes 1000 10000
+    python benchmarks/bench_playlist_memory.py --sizes 10000 --eager --json playlist_memory.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+# YouTubeの1ページあたりの動画数
+PAGE_SIZE = 100
+# 完全なメタデータに含めるフォーマットの数
+FORMAT_COUNT = 40
+
+
+def flat_entry(index):
+    """フラット抽出したプレイリストのエントリを作成する"""
+    video_id = f"v{index:010d}"
+    return {
+        "_type": "url",
+        "ie_key": "Youtube",
+        "id": video_id,
+        "url": f"https://www.youtube.com/watch?v={video_id}",
+        "title": f"合成動画 {index}",
+        "description": "説明文 " * 20,
+        "duration": 300 + index % 600,
+        "channel": "合成チャンネル",
+        "channel_id": "UCsynthetic",
+        "view_count": index * 37,
+        "thumbnails": [
+            {"url": f"https://i.ytimg.com/vi/{video_id}/{name}.jpg", "height": height, "width": height * 16 // 9}
+            for name, height in (("default", 90), ("mqdefault", 180), ("hqdefault", 360), ("sddefault", 480))
+        ],
+    }
+
+
+def full_info(entry):
+    """1件の動画をダウンロードする際に作成される完全なメタデータを模倣する"""
+    return {
+        **entry,
+        "_type": "video",
+        "ext": "mp4",
+        "formats": [
+            {
+                "format_id": str(100 + i),
+                "url": f"https://rr1---sn-synthetic.googlevideo.com/videoplayback?id={entry['id']}&itag={100 + i}&" + "x" * 400,
+                "ext": "mp4",
+                "height": 144 * (1 + i % 8),
+                "tbr": 100.0 * (i + 1),
+                "vcodec": "avc1.640028",
+                "acodec": "none" if i % 2 else "mp4a.40.2",
+                "http_headers": {"User-Agent": "Mozilla/5.0", "Accept": "*/*"},
+            }
+            for i in range(FORMAT_COUNT)
+        ],
+        "subtitles": {"ja": [{"ext": "vtt", "url": f"https://www.youtube.com/api/timedtext?v={entry['id']}"}]},
+    }
+
+
+def run_size(count, eager, jobs):
+    """子プロセスで実行: 指定した動画数のプレイリストを処理してメモリ使用量を返す"""
+    import resource
+    import tracemalloc
+    from datascoop.downloaders.youtube import YouTubeDownloader
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        downloader = YouTubeDownloader(output_dir=tmp_dir)
+        downloader.logger.disabled = True
+
+        def pages():
+            # ページごとに作成して返す（取得済みのページはダウンローダー側が保持しない限り解放される）
+            for start in range(0, count, PAGE_SIZE):
+                yield from [flat_entry(i) for i in range(start, min(start + PAGE_SIZE, count))]
+
+        def extract_info(ydl, url, download=True, **kwargs):
+            info = {
+                "_type": "playlist",
+                "id": "PLsynthetic",
+                "title": "合成プレイリスト",
+                "extractor": "youtube:tab",
+                "extractor_key": "YoutubeTab",
+                "playlist_count": count,
+                "entries": pages(),
+            }
+            if eager:
+                # 従来の処理: 全エントリを取得し、各動画の完全なメタデータも保持したまま処理する
+                info["entries"] = [full_info(entry) for entry in info["entries"]]
+            return info
+
+        def download_entry(entry, extra_info, ydl_opts):
+            info = entry if eager else full_info(entry)
+            with downloader._open_ydl(ydl_opts) as ydl:
+                return ydl.prepare_filename({**info, **extra_info})
+
+        downloader._extract_info = extract_info
+        downloader._download_playlist_entry = download_entry
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        files = downloader.download_playlist("https://www.youtube.com/playlist?list=PLsynthetic", jobs=jobs)
+        elapsed = time.perf_counter() - started
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # Linuxのru_maxrssはKB単位、macOSはバイト単位
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss = maxrss if sys.platform == "darwin" else maxrss * 1024
+    return {
+        "entries": count,
+        "downloaded": len(files or []),
+        "elapsed_s": elapsed,
+        "peak_rss_mb": peak_rss / 1024 / 1024,
+        "traced_peak_mb": traced_peak / 1024 / 1024,
+    }
+
+
+def measure(count, eager, jobs):
+    """新しいプロセスで1つのサイズを計測する（ピークメモリが他の計測の影響を受けないようにする）"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", str(count), "--jobs", str(jobs)]
+    if eager:
+        cmd.append("--eager")
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR)
+    with tempfile.TemporaryDirectory() as home:
+        # 利用者の設定やキャッシュに影響しないよう、HOMEを一時ディレクトリに向ける
+        env["HOME"] = home
+        proc = subprocess.run(cmd, env=env, cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """ベンチマークを実行"""
+    parser = argparse.ArgumentParser(description="DataScoop プレイリスト処理のメモリ使用量ベンチマーク")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="計測するプレイリストの動画数")
+    parser.add_argument("--jobs", type=int, default=4, help="同時にダウンロードする動画数 (デフォルト: 4)")
+    parser.add_argument("--eager", action="store_true", help="エントリを一括で取得する従来の処理とも比較する")
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_size(args.child, args.eager, args.jobs)))
+        return
+
+    modes = ["streaming", "eager"] if args.eager else ["streaming"]
+    results = []
+    for count in args.sizes:
+        for mode in modes:
+            result = measure(count, mode == "eager", args.jobs)
+            result["mode"] = mode
+            results.append(result)
+            print(f"{mode:<9} {count:>7}件  peak RSS {result['peak_rss_mb']:8.1f} MB  "
+                  f"traced peak {result['traced_peak_mb']:8.1f} MB  {result['elapsed_s']:6.1f} s")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
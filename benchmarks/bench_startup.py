@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+CLIの起動時間を計測するベンチマーク
+
+新しいPythonプロセスで以下の経路を繰り返し実行し、コールドスタートの所要時間を計測する
+- version:       datascoop --version
+- list-formats:  datascoop <URL> --list-formats --no-cache
+- download:      datascoop <URL> -o <一時ディレクトリ> --retries 0
+
+URLには接続を拒否するローカルアドレスを使用するため、ネットワークには一切アクセスしない
+（計測されるのは起動・モジュール読み込み・yt-dlpの初期化までの時間）
+
+使用例:
+    python benchmarks/bench_startup.py --runs 10
+    python benchmarks/bench_startup.py --json startup.json --importtime
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+# 接続を即座に拒否されるURL（ネットワークへのアクセスを伴わない）
+UNREACHABLE_URL = "http://127.0.0.1:9/video.mp4"
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def build_scenarios(output_dir):
+    """計測する起動経路を定義する"""
+    return {
+        "version": ["--version"],
+        "list-formats": [UNREACHABLE_URL, "--list-formats", "--no-cache"],
+        # 接続の拒否は一時的なエラーとして再試行されるため、待機時間を含めないよう再試行しない
+        "download": [UNREACHABLE_URL, "-o", output_dir, "--retries", "0"],
+    }
+
+
+def run_once(cli_args, env, importtime=False):
+    """CLIを1回起動し、所要時間（秒）とimporttimeの出力を返す"""
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-m", "datascoop", *cli_args]
+    started = time.perf_counter()
+    proc = subprocess.run(cmd, env=env, cwd=ROOT_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    return elapsed, proc.stderr if importtime else ""
+
+
+def top_imports(importtime_output, limit=10):
+    """-X importtime の出力から累積時間の大きいモジュールを抽出する"""
+    rows = []
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _, cumulative_us, name = line.replace("import time:", "|").split("|")
+        # トップレベルのモジュール（インデントが1文字のもの）のみを対象にする
+        if len(name) - len(name.lstrip()) != 1:
+            continue
+        rows.append((int(cumulative_us), name.strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def main():
+    """ベンチマークを実行"""
+    parser = argparse.ArgumentParser(description="DataScoop CLIの起動時間ベンチマーク")
+    parser.add_argument("--runs", type=int, default=10, help="各経路の計測回数 (デフォルト: 10)")
+    parser.add_argument("--scenario", action="append", help="計測する経路 (version, list-formats, download)")
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    parser.add_argument("--importtime", action="store_true", help="読み込みに時間のかかるモジュールも表示する")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # 利用者の設定やキャッシュに影響しないよう、HOMEを一時ディレクトリに向ける
+        env = dict(os.environ, HOME=tmp_dir, PYTHONDONTWRITEBYTECODE="1")
+        scenarios = build_scenarios(os.path.join(tmp_dir, "downloads"))
+        names = args.scenario or list(scenarios)
+
+        results = {}
+        for name in names:
+            # 1回目はバイトコードのキャッシュなどの影響を除くためのウォームアップ
+            run_once(scenarios[name], env)
+            samples = [run_once(scenarios[name], env)[0] for _ in range(args.runs)]
+            results[name] = {
+                "runs": args.runs,
+                "min_ms": min(samples) * 1000,
+                "median_ms": statistics.median(samples) * 1000,
+                "max_ms": max(samples) * 1000,
+            }
+            print(f"{name:<14} min {results[name]['min_ms']:8.1f} ms  "
+                  f"median {results[name]['median_ms']:8.1f} ms  max {results[name]['max_ms']:8.1f} ms")
+
+            if args.importtime:
+                _, output = run_once(scenarios[name], env, importtime=True)
+                for cumulative_us, module in top_imports(output):
+                    print(f"    {cumulative_us / 1000:8.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "results": results}, f, indent=2)
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
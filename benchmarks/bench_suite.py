@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+"""
+ダウンロード性能のベンチマークスイート
+
+ローカルの配信サーバー（media_server.py）が返す合成メディアに対して、
+VideoDownloader / AudioDownloader / download_content / process_batch_file を実行し、
+以下を計測する。ネットワークには一切アクセスしないため、リリースごとの性能の変化を追跡できる
+- スループット（MiB/s）
+- 最初のバイトを受け取るまでの時間（TTFB）
+- URLあたりのオーバーヘッド（小さいファイルを多数処理した場合の1件あたりの時間）
+- ピークメモリ使用量（シナリオごとに別プロセスで実行して計測）
+- 同時実行数ごとのスループット
+
+使用例:
+    python benchmarks/bench_suite.py
+    python benchmarks/bench_suite.py --scenario video-progressive --scenario batch-scaling --json suite.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+import resource
+import contextlib
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+
+from media_server import SyntheticMediaServer  # noqa: E402
+
+MIB = 1024 * 1024
+
+# シナリオ名と説明
+SCENARIOS = {
+    "video-progressive": "VideoDownloaderでプログレッシブ配信のMP4をダウンロード",
+    "video-hls": "VideoDownloaderでHLSストリームをダウンロード",
+    "audio": "AudioDownloaderで音声ストリームをダウンロードして変換（ffmpegが必要）",
+    "download-content": "cli.download_contentで動画をダウンロード",
+    "batch-overhead": "cli.process_batch_fileで小さいファイルを多数ダウンロード",
+    "batch-scaling": "cli.process_batch_fileを同時実行数ごとに実行",
+}
+
+# ffmpegを必要とするシナリオ
+REQUIRES_FFMPEG = {"audio"}
+
+
+class _TTFBRecorder:
+    """進捗フックから最初のバイトを受け取るまでの時間を記録する"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_byte = None
+
+    def hook(self, d):
+        if self.first_byte is None and d.get("downloaded_bytes"):
+            self.first_byte = time.perf_counter() - self.started
+
+
+def _cli_args(output_dir, *extra):
+    """CLIと同じ方法で引数を作成する"""
+    from datascoop import cli
+
+    argv = sys.argv
+    try:
+        sys.argv = ["datascoop", "https://example.invalid/", "-o", output_dir, "--no-progress", *extra]
+        return cli.parse_arguments()
+    finally:
+        sys.argv = argv
+
+
+def _summarize(samples, total_bytes):
+    """所要時間のリストから結果をまとめる"""
+    elapsed = sum(samples)
+    return {
+        "count": len(samples),
+        "elapsed_s": elapsed,
+        "mib_per_s": total_bytes / elapsed / MIB if elapsed else 0.0,
+        "median_s": statistics.median(samples) if samples else 0.0,
+    }
+
+
+def run_video_progressive(base_url, output_dir, params):
+    """VideoDownloaderでプログレッシブ配信のMP4をダウンロードする"""
+    from datascoop.downloaders import VideoDownloader
+
+    downloader = VideoDownloader(output_dir=output_dir)
+    samples, ttfb = [], []
+    for i in range(params["files"]):
+        recorder = _TTFBRecorder()
+        url = f"{base_url}/progressive/video{i:04d}.mp4?size={params['file_size']}"
+        path = downloader.download(url, format="best", progress_hooks=[recorder.hook])
+        samples.append(time.perf_counter() - recorder.started)
+        if not path:
+            raise RuntimeError(f"ダウンロードに失敗しました: {url}")
+        ttfb.append(recorder.first_byte or 0.0)
+        os.remove(path)
+    result = _summarize(samples, params["files"] * params["file_size"])
+    result["ttfb_ms"] = statistics.median(ttfb) * 1000
+    return result
+
+
+def run_video_hls(base_url, output_dir, params):
+    """VideoDownloaderでHLSストリームをダウンロードする"""
+    from datascoop.downloaders import VideoDownloader
+
+    downloader = VideoDownloader(output_dir=output_dir, throughput_profile=params["profile"])
+    samples, ttfb = [], []
+    for i in range(params["runs"]):
+        recorder = _TTFBRecorder()
+        path = downloader.download(f"{base_url}/hls/stream.m3u8", format="best",
+                                   filename=f"hls{i}", progress_hooks=[recorder.hook])
+        samples.append(time.perf_counter() - recorder.started)
+        if not path:
+            raise RuntimeError("HLSストリームのダウンロードに失敗しました")
+        ttfb.append(recorder.first_byte or 0.0)
+        os.remove(path)
+    result = _summarize(samples, params["runs"] * params["segments"] * params["segment_size"])
+    result["ttfb_ms"] = statistics.median(ttfb) * 1000
+    result["fragments_per_s"] = params["runs"] * params["segments"] / result["elapsed_s"]
+    return result
+
+
+def run_audio(base_url, output_dir, params):
+    """AudioDownloaderで音声ストリームをダウンロードして変換する"""
+    from datascoop.downloaders import AudioDownloader
+
+    downloader = AudioDownloader(output_dir=output_dir, audio_format="mp3")
+    samples = []
+    for i in range(params["files"]):
+        started = time.perf_counter()
+        url = f"{base_url}/audio/audio{i:04d}.m4a?size={params['file_size']}"
+        path = downloader.download(url, bitrate="192K")
+        samples.append(time.perf_counter() - started)
+        if not path:
+            raise RuntimeError(f"ダウンロードに失敗しました: {url}")
+    return _summarize(samples, params["files"] * params["file_size"])
+
+
+def run_download_content(base_url, output_dir, params):
+    """cli.download_contentで動画をダウンロードする"""
+    from datascoop import cli
+
+    args = _cli_args(output_dir)
+    samples = []
+    for i in range(params["files"]):
+        started = time.perf_counter()
+        url = f"{base_url}/progressive/content{i:04d}.mp4?size={params['file_size']}"
+        if not cli.download_content(url, args):
+            raise RuntimeError(f"ダウンロードに失敗しました: {url}")
+        samples.append(time.perf_counter() - started)
+    return _summarize(samples, params["files"] * params["file_size"])
+
+
+def _run_batch(base_url, output_dir, files, file_size, jobs, prefix):
+    """バッチファイルを作成してprocess_batch_fileを実行し、所要時間を返す"""
+    from datascoop import cli
+
+    batch_file = os.path.join(output_dir, f"{prefix}.txt")
+    with open(batch_file, "w", encoding="utf-8") as f:
+        for i in range(files):
+            f.write(f"{base_url}/progressive/{prefix}-{i:05d}.mp4?size={file_size}\n")
+    args = _cli_args(os.path.join(output_dir, prefix), "--batch-file", batch_file, "-j", str(jobs))
+    started = time.perf_counter()
+    summary = cli.process_batch_file(batch_file, args)
+    elapsed = time.perf_counter() - started
+    if summary.failed:
+        raise RuntimeError(f"{len(summary.failed)}件のダウンロードに失敗しました")
+    return elapsed
+
+
+def run_batch_overhead(base_url, output_dir, params):
+    """小さいファイルを多数ダウンロードし、URLあたりのオーバーヘッドを計測する"""
+    files = params["overhead_files"]
+    elapsed = _run_batch(base_url, output_dir, files, params["overhead_file_size"], 1, "overhead")
+    return {
+        "count": files,
+        "elapsed_s": elapsed,
+        "per_url_ms": elapsed / files * 1000,
+    }
+
+
+def run_batch_scaling(base_url, output_dir, params):
+    """同時実行数ごとにprocess_batch_fileのスループットを計測する"""
+    results = {}
+    for jobs in params["jobs"]:
+        files = params["scaling_files"]
+        elapsed = _run_batch(base_url, output_dir, files, params["file_size"], jobs, f"scaling-j{jobs}")
+        results[str(jobs)] = {
+            "elapsed_s": elapsed,
+            "mib_per_s": files * params["file_size"] / elapsed / MIB,
+            "urls_per_s": files / elapsed,
+        }
+    return {"jobs": results}
+
+
+RUNNERS = {
+    "video-progressive": run_video_progressive,
+    "video-hls": run_video_hls,
+    "audio": run_audio,
+    "download-content": run_download_content,
+    "batch-overhead": run_batch_overhead,
+    "batch-scaling": run_batch_scaling,
+}
+
+
+def run_child(scenario, base_url, params):
+    """子プロセスでシナリオを実行し、結果をJSONで標準出力に書き出す"""
+    # ダウンローダーのログとyt-dlpの表示は結果と混ざるため抑制する
+    logging.disable(logging.CRITICAL)
+    with tempfile.TemporaryDirectory() as output_dir:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            result = RUNNERS[scenario](base_url, output_dir, params)
+    # Linuxではキロバイト単位
+    result["peak_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def format_result(name, result):
+    """結果を1行（同時実行数ごとの結果は複数行）の文字列にする"""
+    if "skipped" in result:
+        return f"{name:<18} スキップ: {result['skipped']}"
+    if "error" in result:
+        return f"{name:<18} 失敗: {result['error']}"
+    rss = f"RSS {result['peak_rss_mib']:6.1f} MiB"
+    if "jobs" in result:
+        lines = [f"{name:<18} {rss}"]
+        for jobs, r in result["jobs"].items():
+            lines.append(f"    同時実行数 {jobs:>2}: {r['mib_per_s']:7.1f} MiB/s  {r['urls_per_s']:6.1f} URL/s")
+        return "\n".join(lines)
+    if "per_url_ms" in result:
+        return f"{name:<18} {result['count']}件  URLあたり {result['per_url_ms']:7.1f} ms  {rss}"
+    line = f"{name:<18} {result['mib_per_s']:7.1f} MiB/s  中央値 {result['median_s']:6.2f} s"
+    if "ttfb_ms" in result:
+        line += f"  TTFB {result['ttfb_ms']:6.1f} ms"
+    if "fragments_per_s" in result:
+        line += f"  {result['fragments_per_s']:6.1f} 断片/s"
+    return f"{line}  {rss}"
+
+
+def main():
+    """ベンチマークを実行"""
+    parser = argparse.ArgumentParser(description="DataScoopのダウンロード性能ベンチマークスイート")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="実行するシナリオ (省略時はすべて)")
+    parser.add_argument("--files", type=int, default=5, help="1シナリオあたりのファイル数 (デフォルト: 5)")
+    parser.add_argument("--file-size", type=int, default=8 * MIB, help="ファイル1つあたりのバイト数 (デフォルト: 8MiB)")
+    parser.add_argument("--latency", type=float, default=0.02, help="リクエストごとの応答遅延（秒） (デフォルト: 0.02)")
+    parser.add_argument("--segments", type=int, default=60, help="HLSの断片の数 (デフォルト: 60)")
+    parser.add_argument("--segment-size", type=int, default=256 * 1024, help="HLSの断片1つあたりのバイト数")
+    parser.add_argument("--profile", default="balanced", help="HLSで使用する通信プロファイル (デフォルト: balanced)")
+    parser.add_argument("--overhead-files", type=int, default=50, help="オーバーヘッド計測に使うファイル数 (デフォルト: 50)")
+    parser.add_argument("--jobs", type=int, nargs="+", default=[1, 2, 4, 8], help="計測する同時実行数 (デフォルト: 1 2 4 8)")
+    parser.add_argument("--json", help="結果をJSONで保存するファイル")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--base-url", help=argparse.SUPPRESS)
+    parser.add_argument("--params", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.base_url, json.loads(args.params))
+        return
+
+    params = {
+        "files": args.files,
+        "file_size": args.file_size,
+        "runs": 3,
+        "segments": args.segments,
+        "segment_size": args.segment_size,
+        "profile": args.profile,
+        "overhead_files": args.overhead_files,
+        "overhead_file_size": 16 * 1024,
+        "scaling_files": max(args.jobs) * 2,
+        "jobs": args.jobs,
+    }
+    has_ffmpeg = shutil.which("ffmpeg") and shutil.which("ffprobe")
+    results = {}
+
+    with tempfile.TemporaryDirectory() as home_dir, SyntheticMediaServer(
+        segments=args.segments, segment_size=args.segment_size, latency=args.latency, file_size=args.file_size
+    ) as server:
+        # 利用者の設定・キャッシュ・アーカイブに影響しないよう、HOMEを一時ディレクトリに向ける
+        env = dict(os.environ, HOME=home_dir, PYTHONPATH=ROOT_DIR)
+        base_url = server.url("").rstrip("/")
+        for name in args.scenario or list(SCENARIOS):
+            if name in REQUIRES_FFMPEG and not has_ffmpeg:
+                results[name] = {"skipped": "ffmpegが見つかりません"}
+            else:
+                cmd = [sys.executable, __file__, "--child", name, "--base-url", base_url, "--params", json.dumps(params)]
+                proc = subprocess.run(cmd, env=env, cwd=ROOT_DIR, capture_output=True, text=True)
+                lines = proc.stdout.strip().splitlines()
+                if proc.returncode == 0 and lines:
+                    results[name] = json.loads(lines[-1])
+                else:
+                    error = (proc.stderr.strip().splitlines() or ["不明なエラー"])[-1]
+                    results[name] = {"error": error}
+            print(format_result(name, results[name]), flush=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version, "params": params, "latency": args.latency, "results": results}, f, indent=2)
+        print(f"結果を保存しました: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+ベンチマーク用のローカル配信サーバー
+
+以下の合成メディアを返す。応答遅延を設定でき、ネットワークにアクセスせずに計測できる
+- /progressive/<名前>.mp4?size=N   プログレッシブ配信のMP4（Rangeリクエストに対応）
+- /audio/<名前>.m4a?size=N         音声ストリーム（Rangeリクエストに対応）
+- /hls/stream.m3u8, /hls/segNNNNN.ts  HLSのプレイリストと断片
+
+使用例:
+    with SyntheticMediaServer(segments=60, latency=0.05) as server:
+        url = server.url("/hls/stream.m3u8")
+        url = server.url("/progressive/sample.mp4?size=1048576")
+"""
+
+import re
+import time
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# MPEG-TSのパケットサイズ
+TS_PACKET_SIZE = 188
+
+
+# プログレッシブ配信・音声のデフォルトのサイズ（バイト）
+DEFAULT_FILE_SIZE = 4 * 1024 * 1024
+
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _ts_payload(size):
+    """同期バイト（0x47）で始まるパケットを並べたダミーのMPEG-TSデータを作成する"""
+    packet = b"\x47" + b"\xff" * (TS_PACKET_SIZE - 1)
+    count = max(1, size // TS_PACKET_SIZE)
+    return packet * count
+
+
+def _mp4_payload(size, brand=b"isom"):
+    """ftypボックスで始まるダミーのMP4データを作成する"""
+    header = b"\x00\x00\x00\x18ftyp" + brand + b"\x00\x00\x02\x00" + brand + b"mp41"
+    return (header + b"\x00" * max(0, size - len(header)))[:max(size, len(header))]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """配信サーバーのリクエストハンドラ"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _resolve(self):
+        """パスに対応する (本文, Content-Type, 断片かどうか) を返す"""
+        server = self.server
+        parts = urlsplit(self.path)
+        path = parts.path
+        query = parse_qs(parts.query)
+        size = int(query.get("size", [server.file_size])[0])
+        if path == "/hls/stream.m3u8":
+            return server.playlist.encode("utf-8"), "application/vnd.apple.mpegurl", False
+        if path.startswith("/hls/seg") and path.endswith(".ts"):
+            return server.segment, "video/mp2t", True
+        if path.startswith("/progressive/") and path.endswith(".mp4"):
+            return server.payload(size, b"isom"), "video/mp4", False
+        if path.startswith("/audio/") and path.endswith(".m4a"):
+            return server.payload(size, b"M4A "), "audio/mp4", False
+        return None, None, False
+
+    def _respond(self, send_body):
+        server = self.server
+        body, content_type, is_segment = self._resolve()
+        if body is None:
+            self.send_error(404)
+            return
+
+        # 最初のバイトを返すまでの遅延（往復時間とサーバーの処理時間を模す）
+        time.sleep(server.latency)
+        with server.lock:
+            server.requests += 1
+            if is_segment:
+                server.segment_requests += 1
+
+        status, start, end = 200, 0, len(body) - 1
+        match = _RANGE_RE.fullmatch(self.headers.get("Range", "").strip())
+        if match and (match.group(1) or match.group(2)):
+            if match.group(1):
+                start = int(match.group(1))
+                end = min(int(match.group(2)), end) if match.group(2) else end
+            else:
+                start = max(0, len(body) - int(match.group(2)))
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(end - start + 1))
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+        self.end_headers()
+        if send_body:
+            with server.lock:
+                server.bytes_sent += end - start + 1
+            self.wfile.write(memoryview(body)[start:end + 1])
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def log_message(self, format, *args):
+        """アクセスログは出力しない"""
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    """クライアントによる切断を無視するサーバー"""
+
+    daemon_threads = True
+
+    def payload(self, size, brand):
+        """サイズごとに合成したデータを再利用する"""
+        key = (size, brand)
+        with self.lock:
+            if key not in self.payloads:
+                self.payloads[key] = _mp4_payload(size, brand)
+            return self.payloads[key]
+
+    def handle_error(self, request, client_address):
+        # 保持していた接続をダウンロード終了時に閉じられるのは正常な動作
+        pass
+
+
+class SyntheticMediaServer:
+    """
+    ベンチマーク用の配信サーバーを別スレッドで起動するクラス
+    """
+
+    def __init__(self, segments=60, segment_size=256 * 1024, segment_duration=2.0, latency=0.05,
+                 file_size=DEFAULT_FILE_SIZE):
+        """
+        コンストラクタ
+
+        Args:
+            segments (int): HLSの断片の数
+            segment_size (int): 断片1つあたりのバイト数
+            segment_duration (float): 断片1つあたりの再生時間（秒）
+            latency (float): リクエストごとの応答遅延（秒）
+            file_size (int): プログレッシブ配信・音声のデフォルトのサイズ（バイト）
+        """
+        self.segments = segments
+        self.segment_size = segment_size
+        self.file_size = file_size
+        self.segment_duration = segment_duration
+        self.latency = latency
+        self._httpd = None
+        self._thread = None
+
+    def _build_playlist(self):
+        """HLSのメディアプレイリストを作成する"""
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            f"#EXT-X-TARGETDURATION:{int(self.segment_duration + 0.999)}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+            "#EXT-X-PLAYLIST-TYPE:VOD",
+        ]
+        for i in range(self.segments):
+            lines.append(f"#EXTINF:{self.segment_duration:.3f},")
+            lines.append(f"seg{i:05d}.ts")
+        lines.append("#EXT-X-ENDLIST")
+        return "\n".join(lines) + "\n"
+
+    def start(self):
+        """サーバーを起動する"""
+        self._httpd = _Server(("127.0.0.1", 0), _Handler)
+        self._httpd.playlist = self._build_playlist()
+        self._httpd.segment = _ts_payload(self.segment_size)
+        self._httpd.latency = self.latency
+        self._httpd.file_size = self.file_size
+        self._httpd.payloads = {}
+        self._httpd.lock = threading.Lock()
+        self._httpd.requests = 0
+        self._httpd.segment_requests = 0
+        self._httpd.bytes_sent = 0
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def segment_requests(self):
+        """これまでに受け付けた断片のリクエスト数"""
+        return self._httpd.segment_requests
+
+    @property
+    def requests(self):
+        """これまでに受け付けたリクエスト数"""
+        return self._httpd.requests
+
+    @property
+    def bytes_sent(self):
+        """これまでに送信した本文のバイト数"""
+        return self._httpd.bytes_sent
+
+    def url(self, path):
+        """サーバー上のパスに対応するURLを取得する"""
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def stop(self):
+        """サーバーを停止する"""
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -3,23 +3,22 @@ DataScoop パッケージ
 yt-dlpを利用した動画・音声ダウンロードライブラリ
 """
 
-import logging
-import importlib.metadata
-
-try:
-    # pyproject.tomlからバージョン情報を取得
-    __version__ = importlib.metadata.version("datascoop")
-except importlib.metadata.PackageNotFoundError:
-    # インストールされていない場合は不明とする
-    __version__ = "unknown"
+import importlib
 
 __author__ = 'ShiningWank0'
 
-from .downloaders.video import VideoDownloader
-from .downloaders.audio import AudioDownloader
-from .downloaders.youtube import YouTubeDownloader
-from .utils.helpers import setup_logger
-from .utils.config import ConfigManager
+# 起動時間を短縮するため、ダウンローダー（yt-dlp）や対話モード（tkinter）は
+# 最初に参照された時点で読み込む
+_LAZY_ATTRIBUTES = {
+    'VideoDownloader': '.downloaders.video',
+    'AudioDownloader': '.downloaders.audio',
+    'YouTubeDownloader': '.downloaders.youtube',
+    'ConfigManager': '.utils.config',
+    'setup_logger': '.utils.helpers',
+    'InteractiveDownloader': '.interactive',
+    'DownloadSession': '.session',
+    'AsyncDownloader': '.aio',
+}
 
 # バージョン情報をエクスポート
 __all__ = [
@@ -27,9 +26,34 @@ __all__ = [
     'AudioDownloader', 
     'YouTubeDownloader',
     'ConfigManager',
+    'DownloadSession',
+    'AsyncDownloader',
     '__version__',
 ]
-from .interactive import InteractiveDownloader
 
-# パッケージ全体のロガーをセットアップ
-logger = setup_logger()
\ No newline at end of file
+def __getattr__(name):
+    """遅延読み込みする属性を解決する"""
+    if name == '__version__':
+        # importlib.metadataの読み込みにも時間がかかるため、参照時に取得する
+        from importlib import metadata
+        try:
+            # pyproject.tomlからバージョン情報を取得
+            value = metadata.version("datascoop")
+        except metadata.PackageNotFoundError:
+            # インストールされていない場合は不明とする
+            value = "unknown"
+    elif name == 'logger':
+        # パッケージ全体のロガーをセットアップ
+        from .utils.helpers import setup_logger
+        value = setup_logger()
+    elif name in _LAZY_ATTRIBUTES:
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+def __dir__():
+    """遅延読み込みする属性も含めた属性の一覧"""
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES) | {'__version__', 'logger'})
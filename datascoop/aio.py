@@ -0,0 +1,244 @@
+"""
+asyncio向けのダウンロードAPI
+既存のダウンローダーをスレッドプールで実行し、完了の待機・進捗の受け取り・キャンセルを提供する
+
+使用例:
+    async with AsyncDownloader(VideoDownloader(output_dir="downloads")) as downloader:
+        task = downloader.submit(url)
+        async for event in task.events():
+            print(event["status"], event.get("downloaded_bytes"))
+        video_file = await task
+"""
+
+import os
+import glob
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# 進捗イベントに含めるyt-dlpの進捗情報のキー（info_dictなどの大きな値は含めない）
+EVENT_KEYS = (
+    "status",
+    "filename",
+    "tmpfilename",
+    "downloaded_bytes",
+    "total_bytes",
+    "total_bytes_estimate",
+    "speed",
+    "eta",
+    "elapsed",
+    "fragment_index",
+    "fragment_count",
+)
+
+# イベントの終わりを示す値
+_END = object()
+
+
+class DownloadCancelled(Exception):
+    """ダウンロードがキャンセルされたことをyt-dlpの処理中に通知する例外"""
+
+
+class DownloadTask:
+    """
+    1件のダウンロードを表すクラス
+    awaitすると結果（ダウンロードしたファイルのパス）を返す
+    """
+
+    def __init__(self, owner, url, method, kwargs):
+        """
+        コンストラクタ
+
+        Args:
+            owner (AsyncDownloader): タスクを作成したダウンローダー
+            url (str): ダウンロード対象のURL
+            method (str): 呼び出すダウンローダーのメソッド名
+            kwargs (dict): メソッドに渡す追加のパラメータ
+        """
+        self.url = url
+        self._owner = owner
+        self._method = method
+        self._kwargs = kwargs
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        self._cancel_event = threading.Event()
+        self._partial_files = set()
+        self._task = self._loop.create_task(self._run())
+
+    def _hook(self, d):
+        """yt-dlpの進捗フック（ワーカースレッド内で呼ばれる）"""
+        if d.get("status") == "downloading":
+            for key in ("tmpfilename", "filename"):
+                if d.get(key):
+                    self._partial_files.add(d[key])
+        elif d.get("status") == "finished" and d.get("filename"):
+            self._partial_files.discard(d["filename"])
+
+        if self._cancel_event.is_set():
+            # yt-dlpの処理を中断させる（次の進捗通知の時点で止まる協調的なキャンセル）
+            raise DownloadCancelled(self.url)
+
+        event = {key: d[key] for key in EVENT_KEYS if key in d}
+        event["url"] = self.url
+        self._loop.call_soon_threadsafe(self._events.put_nowait, event)
+
+    def _call(self):
+        """ダウンローダーのメソッドを実行する（ワーカースレッド内で呼ばれる）"""
+        kwargs = dict(self._kwargs)
+        kwargs["progress_hooks"] = [*kwargs.get("progress_hooks", []), self._hook]
+        try:
+            if self._cancel_event.is_set():
+                raise DownloadCancelled(self.url)
+            result = getattr(self._owner.downloader, self._method)(self.url, **kwargs)
+            if self._cancel_event.is_set():
+                raise DownloadCancelled(self.url)
+            return result
+        except DownloadCancelled:
+            self._remove_partial_files()
+            raise
+
+    def _remove_partial_files(self):
+        """キャンセルにより途中まで書き込まれたファイルを削除する"""
+        for path in list(self._partial_files):
+            candidates = [path, f"{path}.part", f"{path}.ytdl", *glob.glob(glob.escape(path) + "*-Frag*")]
+            for candidate in candidates:
+                try:
+                    os.remove(candidate)
+                    logger.debug(f"途中まで書き込まれたファイルを削除しました: {candidate}")
+                except OSError:
+                    pass
+
+    async def _run(self):
+        """同時実行数の上限を守ってダウンロードを実行する"""
+        try:
+            async with self._owner._semaphore:
+                future = self._loop.run_in_executor(self._owner._executor, self._call)
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    # ワーカースレッドに中断を伝え、後片付けが終わるまで待つ
+                    self._cancel_event.set()
+                    try:
+                        await future
+                    except Exception:
+                        pass
+                    raise
+                except DownloadCancelled:
+                    raise asyncio.CancelledError()
+        finally:
+            # ワーカースレッドからの進捗イベントは全て先にキューに入っている
+            self._events.put_nowait(_END)
+
+    def cancel(self):
+        """
+        ダウンロードをキャンセルする
+        実行中の場合は次の進捗通知の時点で中断し、途中まで書き込まれたファイルを削除する
+        """
+        self._cancel_event.set()
+        self._task.cancel()
+
+    def cancelled(self):
+        """キャンセルされたかどうか"""
+        return self._cancel_event.is_set()
+
+    def done(self):
+        """完了（成功・失敗・キャンセル）したかどうか"""
+        return self._task.done()
+
+    async def events(self):
+        """
+        進捗イベントを順に返す非同期イテレータ
+
+        Yields:
+            dict: status, downloaded_bytes, total_bytes, speed, eta, url などを含む進捗イベント
+        """
+        while True:
+            event = await self._events.get()
+            if event is _END:
+                return
+            yield event
+
+    def __await__(self):
+        return self._task.__await__()
+
+
+class AsyncDownloader:
+    """
+    既存のダウンローダーをasyncioから使用するためのクラス
+    同時実行数を制限し、各ダウンロードをスレッドプールで実行する
+    """
+
+    def __init__(self, downloader, max_concurrency=4):
+        """
+        コンストラクタ
+
+        Args:
+            downloader (BaseDownloader): VideoDownloader, AudioDownloader, YouTubeDownloader, AbemaDownloaderなど
+            max_concurrency (int): 同時に実行するダウンロードの数
+        """
+        self.downloader = downloader
+        self.max_concurrency = max(1, int(max_concurrency))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="datascoop-async")
+
+    def submit(self, url, method="download", **kwargs):
+        """
+        ダウンロードを開始する
+
+        Args:
+            url (str): ダウンロード対象のURL
+            method (str): 呼び出すダウンローダーのメソッド名 (download, download_playlist など)
+            **kwargs: メソッドに渡す追加のパラメータ (filename, format など)
+
+        Returns:
+            DownloadTask: awaitすると結果を返すタスク
+        """
+        if not callable(getattr(self.downloader, method, None)):
+            raise AttributeError(f"{type(self.downloader).__name__} には {method} メソッドがありません")
+        return DownloadTask(self, url, method, kwargs)
+
+    async def download(self, url, **kwargs):
+        """
+        URLからコンテンツをダウンロードし、完了を待つ
+
+        Args:
+            url (str): ダウンロード対象のURL
+            **kwargs: ダウンローダーのdownloadメソッドに渡す追加のパラメータ
+
+        Returns:
+            str: ダウンロードしたファイルのパス（失敗した場合はNone）
+        """
+        return await self.submit(url, **kwargs)
+
+    async def download_many(self, urls, **kwargs):
+        """
+        複数のURLを同時実行数の上限内で並列にダウンロードする
+
+        Args:
+            urls (iterable): ダウンロード対象のURLのリスト
+            **kwargs: ダウンローダーのdownloadメソッドに渡す追加のパラメータ
+
+        Returns:
+            list: URLと同じ順序の結果のリスト
+        """
+        tasks = [self.submit(url, **kwargs) for url in urls]
+        try:
+            return await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def close(self):
+        """スレッドプールを終了する"""
+        # 同時実行数はセマフォで制限しているため、スレッドプールに開始前のダウンロードが溜まることはない
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
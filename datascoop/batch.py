@@ -0,0 +1,427 @@
+"""
+バッチダウンロードエンジン
+ワーカープールを使用してURLリストを並列にダウンロードする
+"""
+
+import sys
+import time
+import heapq
+import queue
+import hashlib
+import logging
+import threading
+from collections import Counter, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from .utils.helpers import get_platform_from_url
+from .utils.retry import classify_error, clear_error, last_error
+from .scheduler import FifoScheduler
+
+logger = logging.getLogger(__name__)
+
+# プラットフォームごとの同時実行数の上限（デフォルト）
+DEFAULT_PLATFORM_LIMITS = {
+    "youtube": 4,
+    "niconico": 2,
+    "abema": 2,
+    "unknown": 4,
+}
+
+# 読み込み済みで完了していないURLの数の上限（デフォルト）
+DEFAULT_QUEUE_SIZE = 256
+
+# 標準入力からURLを読み込むことを示すバッチファイル名
+STDIN_BATCH_FILE = "-"
+
+# 1件のジョブの実行結果
+# attemptsは試行回数、categoryは失敗した場合のエラーの分類 (transient, throttled, geo_auth, permanent)
+BatchResult = namedtuple(
+    "BatchResult",
+    ["index", "url", "platform", "success", "elapsed", "error", "skipped", "attempts", "category"],
+    defaults=(False, 1, None)
+)
+
+
+class BatchSummary:
+    """バッチ処理全体の結果を集計するクラス"""
+
+    def __init__(self):
+        """初期化"""
+        self.results = []
+        self.started_at = time.monotonic()
+        self.finished_at = None
+
+    def add(self, result):
+        """結果を追加"""
+        self.results.append(result)
+
+    def finish(self):
+        """集計を終了"""
+        self.finished_at = time.monotonic()
+
+    @property
+    def succeeded(self):
+        """成功したジョブのリスト"""
+        return [r for r in self.results if r.success and not r.skipped]
+
+    @property
+    def skipped(self):
+        """アーカイブ済みのためスキップしたジョブのリスト"""
+        return [r for r in self.results if r.skipped]
+
+    @property
+    def failed(self):
+        """失敗したジョブのリスト"""
+        return [r for r in self.results if not r.success]
+
+    @property
+    def retried(self):
+        """再試行したジョブのリスト"""
+        return [r for r in self.results if r.attempts > 1]
+
+    def failure_categories(self):
+        """
+        失敗したジョブのエラーの分類ごとの件数を取得する
+
+        Returns:
+            collections.Counter: 分類をキーとした件数
+        """
+        return Counter(r.category or "unknown" for r in self.failed)
+
+    @property
+    def elapsed(self):
+        """経過時間（秒）"""
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return end - self.started_at
+
+    def log(self, log=None):
+        """集計結果をログに出力"""
+        log = log or logger
+        log.info(
+            f"バッチダウンロードが完了しました: 成功 {len(self.succeeded)}件 / "
+            f"スキップ {len(self.skipped)}件 / 失敗 {len(self.failed)}件 / "
+            f"再試行 {len(self.retried)}件 (所要時間 {self.elapsed:.1f}秒)"
+        )
+        if self.failed:
+            categories = ", ".join(f"{c} {n}件" for c, n in sorted(self.failure_categories().items()))
+            log.info(f"  失敗の分類: {categories}")
+        for result in sorted(self.failed, key=lambda r: r.index):
+            details = [d for d in (result.category, f"{result.attempts}回試行", result.error) if d]
+            log.error(f"  失敗: [{result.index}] {result.url} ({', '.join(details)})")
+
+
+class BatchDownloader:
+    """
+    URLリストをワーカープールで並列にダウンロードするクラス
+    全体の同時実行数に加えて、プラットフォームごとの同時実行数を制限する
+    """
+
+    def __init__(self, download_func, jobs=1, platform_limits=None, archive=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 retry_policy=None, scheduler=None, lanes=False):
+        """
+        コンストラクタ
+
+        Args:
+            download_func (callable): 1件のURLをダウンロードする関数。成功時にTrueを返す
+                （後処理を別に行う場合は、成功したかどうかを受け取るFutureを返してもよい）
+            jobs (int): 全体の同時実行数
+            platform_limits (dict, optional): プラットフォーム名をキーとした同時実行数の上限
+            archive (DownloadArchive, optional): ダウンロード済みURLをスキップするためのアーカイブ
+            queue_size (int): 読み込み済みで完了していないURLの数の上限（同時実行数より小さい場合は同時実行数）
+            retry_policy (RetryPolicy, optional): 一時的なエラーで失敗したジョブを再試行する方針（省略時は再試行しない）
+            scheduler (FifoScheduler, optional): ジョブの実行順序を決めるスケジューラー（省略時は読み込んだ順）
+            lanes (bool): Trueの場合はプラットフォームごとに専用のワーカーを割り当てる
+                （プラットフォームの上限の数だけ、全体の同時実行数とは別に実行する）
+        """
+        self.download_func = download_func
+        self.archive = archive
+        self.jobs = max(1, int(jobs))
+        self.queue_size = max(self.jobs, int(queue_size))
+        self.retry_policy = retry_policy
+        self.scheduler = scheduler or FifoScheduler()
+        self.lanes = lanes
+        self.received = 0
+        self.platform_limits = dict(DEFAULT_PLATFORM_LIMITS)
+        if platform_limits:
+            self.platform_limits.update(platform_limits)
+
+    def _limit_for(self, platform):
+        """プラットフォームの同時実行数の上限を取得"""
+        limit = self.platform_limits.get(platform, self.platform_limits.get("unknown", self.jobs))
+        if self.lanes:
+            return max(1, int(limit))
+        return max(1, min(int(limit), self.jobs))
+
+    @property
+    def workers(self):
+        """ワーカーの数（レーンを使用する場合はプラットフォームごとの上限の合計）"""
+        if self.lanes:
+            return sum(self._limit_for(platform) for platform in self.platform_limits)
+        return self.jobs
+
+    def _run_job(self, index, url, platform, attempt=1, elapsed=0.0):
+        """1件のジョブを実行する（ワーカースレッド内で呼ばれる）"""
+        started = time.monotonic()
+        # ダウンローダーが記録したエラーから失敗の原因を分類する
+        clear_error()
+        try:
+            outcome = self.download_func(url)
+            if isinstance(outcome, Future):
+                # 後処理の完了を待たずにワーカーを空け、結果は後処理の完了時に受け取る
+                return self._defer(outcome, index, url, platform, attempt, elapsed, started)
+            success = bool(outcome)
+            cause = None if success else last_error()
+        except Exception as e:
+            logger.error(f"{url} の処理中にエラーが発生しました: {e}")
+            success, cause = False, e
+        return self._make_result(index, url, platform, success, cause, attempt, elapsed + time.monotonic() - started)
+
+    def _defer(self, outcome, index, url, platform, attempt, elapsed, started):
+        """後処理のFutureから、ジョブの結果を受け取るFutureを作成する"""
+        deferred = Future()
+
+        def done(f):
+            try:
+                success = bool(f.result())
+                cause = None if success else "後処理に失敗しました"
+            except Exception as e:
+                logger.error(f"{url} の後処理中にエラーが発生しました: {e}")
+                success, cause = False, e
+            deferred.set_result(self._make_result(
+                index, url, platform, success, cause, attempt, elapsed + time.monotonic() - started
+            ))
+
+        outcome.add_done_callback(done)
+        return deferred
+
+    @staticmethod
+    def _make_result(index, url, platform, success, cause, attempt, elapsed):
+        """ジョブの結果を作成する"""
+        if success:
+            return BatchResult(index, url, platform, True, elapsed, None, False, attempt)
+        error = str(cause) if cause else "ダウンロードに失敗しました"
+        return BatchResult(index, url, platform, False, elapsed, error, False, attempt, classify_error(cause))
+
+    def _retry_delay(self, result):
+        """失敗したジョブを再試行する場合は待機時間を返す"""
+        if self.retry_policy is None:
+            return None
+        return self.retry_policy.next_delay(result.platform, result.attempts, result.category)
+
+    def run(self, urls):
+        """
+        URLを読み込みながら並列にダウンロードし、完了したものから順に結果を返す
+        URLは別スレッドで読み込み、読み込み済みで完了していないURLの数をqueue_sizeまでに制限する
+        そのため、標準入力などから少しずつ届くURLも最初の1件からすぐにダウンロードを開始できる
+
+        Args:
+            urls (iterable): ダウンロードするURLのリストまたはイテレータ
+
+        Yields:
+            BatchResult: 完了したジョブの結果
+        """
+        events = queue.Queue()
+        slots = threading.Semaphore(self.queue_size)
+        stopped = threading.Event()
+        reader = threading.Thread(
+            target=self._read_urls, args=(urls, events, slots, stopped),
+            name="datascoop-batch-reader", daemon=True
+        )
+        reader.start()
+
+        # プラットフォームごとの待ち行列（スケジューラーのキーの順に取り出すヒープ）
+        pending = {}
+        active = {}
+        running = 0
+        # ワーカーを空けて後処理の完了を待っているジョブの数
+        deferred = 0
+        reading = True
+        # 再試行を待っているジョブ（再試行する時刻の順）
+        delayed = []
+        # 実行中のジョブのスケジューラーのキー（再試行する場合に同じ順序で戻すため）
+        keys = {}
+
+        try:
+            workers = self.workers
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="datascoop-batch") as executor:
+                while reading or pending or running or deferred or delayed:
+                    try:
+                        timeout = max(0.0, delayed[0][0] - time.monotonic()) if delayed else None
+                        kind, value = events.get(timeout=timeout)
+                    except queue.Empty:
+                        kind, value = "retry", None
+                    if kind == "url":
+                        index, url, platform, key = value
+                        self.received += 1
+                        if self.archive is not None and self.archive.contains_url(url):
+                            # ダウンロード済みのURLはネットワークにアクセスせずにスキップする
+                            logger.info(f"ダウンロード済みのためスキップします: {url}")
+                            slots.release()
+                            yield BatchResult(index, url, platform, True, 0.0, None, True)
+                        else:
+                            heapq.heappush(pending.setdefault(platform, []), (key, index, url, 1, 0.0))
+                    elif kind == "released":
+                        running -= 1
+                        active[value] -= 1
+                        deferred += 1
+                    elif kind in ("done", "result"):
+                        platform, result = value
+                        if kind == "done":
+                            running -= 1
+                            active[platform] -= 1
+                        else:
+                            deferred -= 1
+                        delay = None if result.success else self._retry_delay(result)
+                        if delay is None:
+                            keys.pop(result.index, None)
+                            slots.release()
+                            yield result
+                        else:
+                            logger.warning(
+                                f"{result.url} を{delay:.1f}秒後に再試行します "
+                                f"({result.category}, {result.attempts}回目の試行で失敗: {result.error})"
+                            )
+                            heapq.heappush(delayed, (
+                                time.monotonic() + delay, result.index, keys[result.index], result.url,
+                                result.attempts + 1, result.elapsed
+                            ))
+                    elif kind == "retry":
+                        pass
+                    elif kind == "end":
+                        reading = False
+                    else:
+                        raise value
+
+                    # 待機時間が過ぎたジョブを元の順序で待ち行列に戻す
+                    now = time.monotonic()
+                    while delayed and delayed[0][0] <= now:
+                        _, index, key, url, attempt, elapsed = heapq.heappop(delayed)
+                        platform = get_platform_from_url(url)
+                        heapq.heappush(pending.setdefault(platform, []), (key, index, url, attempt, elapsed))
+
+                    # 空きがある限り、上限に達していないプラットフォームの中でキーが最も小さいジョブを投入する
+                    while running < workers:
+                        ready = [p for p in pending if active.get(p, 0) < self._limit_for(p)]
+                        if not ready:
+                            break
+                        platform = min(ready, key=lambda p: pending[p][0])
+                        jobs = pending[platform]
+                        key, index, url, attempt, elapsed = heapq.heappop(jobs)
+                        if not jobs:
+                            del pending[platform]
+                        keys[index] = key
+                        future = executor.submit(self._run_job, index, url, platform, attempt, elapsed)
+                        future.add_done_callback(
+                            lambda f, platform=platform: self._job_done(f.result(), platform, events)
+                        )
+                        running += 1
+                        active[platform] = active.get(platform, 0) + 1
+        finally:
+            # 途中で中断された場合は読み込みスレッドも止める
+            stopped.set()
+            slots.release()
+
+    @staticmethod
+    def _job_done(result, platform, events):
+        """ワーカーでの処理の完了を通知する（後処理が残っている場合は、その完了時にも通知する）"""
+        if isinstance(result, Future):
+            events.put(("released", platform))
+            result.add_done_callback(lambda f: events.put(("result", (platform, f.result()))))
+        else:
+            events.put(("done", (platform, result)))
+
+    def _read_urls(self, urls, events, slots, stopped):
+        """URLを読み込んで待ち行列に渡す（読み込みスレッド内で呼ばれる）"""
+        try:
+            for index, url in enumerate(urls, 1):
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                # プラットフォームの判定と並べ替えのキーの計算（キャッシュの読み込みなど）は読み込みスレッドで行う
+                platform = get_platform_from_url(url)
+                events.put(("url", (index, url, platform, self.scheduler.key(index, url, platform))))
+            events.put(("end", None))
+        except Exception as e:
+            events.put(("error", e))
+
+
+def read_batch_urls(batch_file, priorities=None):
+    """
+    バッチファイルからURLを1行ずつ読み込む
+    空行と#で始まるコメント行は無視する
+    「URL 優先度」のように、URLの後に空白で区切って整数の優先度を指定できる
+
+    Args:
+        batch_file (str): バッチファイルのパス（"-"の場合は標準入力）
+        priorities (dict, optional): 優先度を指定した行のURLと優先度を記録する辞書
+
+    Yields:
+        str: URL
+    """
+    if batch_file == STDIN_BATCH_FILE:
+        f = sys.stdin
+    else:
+        f = open(batch_file, 'r', encoding='utf-8')
+    try:
+        # パイプから届いた行をすぐに処理できるよう、readlineで1行ずつ読み込む
+        for line in iter(f.readline, ''):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            url, _, priority = line.partition(' ')
+            priority = priority.strip()
+            if priority and priorities is not None:
+                try:
+                    priorities[url] = int(priority)
+                except ValueError:
+                    logger.warning(f"優先度は整数で指定してください: {line}")
+            yield url
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def unique_urls(urls):
+    """
+    重複したURLを取り除く
+    URLそのものではなく固定長のハッシュ値を記録するため、URLの長さに関わらず1件あたりのメモリ使用量は一定
+
+    Args:
+        urls (iterable): URLのイテレータ
+
+    Yields:
+        str: 初めて現れたURL
+    """
+    seen = set()
+    for url in urls:
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        if digest in seen:
+            logger.debug(f"重複したURLをスキップします: {url}")
+            continue
+        seen.add(digest)
+        yield url
+
+
+def parse_platform_limits(values):
+    """
+    "platform=N" 形式の文字列のリストをプラットフォームごとの上限に変換する
+
+    Args:
+        values (list): "youtube=2" のような文字列のリスト（カンマ区切りも可）
+
+    Returns:
+        dict: プラットフォーム名をキーとした同時実行数の上限
+
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    limits = {}
+    for value in values or []:
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            platform, sep, limit = item.partition("=")
+            if not sep or not limit.strip().isdigit() or int(limit) < 1:
+                raise ValueError(f"同時実行数の指定が正しくありません: {item}")
+            limits[platform.strip().lower()] = int(limit)
+    return limits
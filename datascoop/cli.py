@@ -4,12 +4,34 @@ DataScoopコマンドラインインターフェース
 
 import os
 import sys
+import json
+import signal
 import argparse
 import logging
-from .downloaders import VideoDownloader, AudioDownloader, YouTubeDownloader, AbemaDownloader
-from .utils.helpers import setup_logger, get_platform_from_url, check_available_formats
+from contextlib import nullcontext
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from .utils.helpers import setup_logger, check_available_formats
+from .utils.router import classify_url, KIND_CHANNEL
 from .utils.config import ConfigManager
-from .interactive import InteractiveDownloader
+from .batch import (
+    BatchDownloader,
+    BatchSummary,
+    parse_platform_limits,
+    read_batch_urls,
+    unique_urls,
+    STDIN_BATCH_FILE,
+)
+from .postprocess import TranscodePool, then
+from .scheduler import create_scheduler, SCHEDULES, FIFO, DEFAULT_PLATFORM_ORDER
+from .utils.archive import DownloadArchive
+from .utils.sync_state import ChannelSyncState
+from .utils import journal as job_journal
+from .utils import metadata as metadata_output
+from .utils.progress import configure_progress
+from .utils.metrics import configure_metrics, get_metrics
+from .utils.retry import RetryPolicy, DEFAULT_RETRIES, DEFAULT_PLATFORM_BUDGET
+from .utils.bandwidth import configure_bandwidth, get_shared_state_path, parse_rate, parse_platform_rates
 
 logger = setup_logger()
 
@@ -82,9 +104,184 @@ def parse_arguments():
         help="利用可能なフォーマットを表示"
     )
     
+    parser.add_argument(
+        "--metadata-only",
+        action="store_true",
+        help="動画を転送せず、タイトル・再生時間・チャプター・フォーマット・字幕の一覧などのメタデータのみを"
+             "JSON Lines形式で書き出す（-jで並列に取得し、--subtitles/--thumbnailsで字幕・サムネイルのみ保存できる）"
+    )
+    
+    parser.add_argument(
+        "--metadata-file",
+        metavar="FILE",
+        help=f"--metadata-only の書き出し先 (\"-\"の場合は標準出力, デフォルト: <出力ディレクトリ>/{metadata_output.DEFAULT_FILENAME})"
+    )
+    
+    parser.add_argument(
+        "--thumbnails",
+        action="store_true",
+        help="--metadata-only の場合にサムネイルも保存する"
+    )
+    
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="メタデータキャッシュを使用せずに情報を再取得する"
+    )
+    
     parser.add_argument(
         "--batch-file",
-        help="URLリストを含むファイルからバッチダウンロード"
+        help="URLリストを含むファイルからバッチダウンロード（\"-\"の場合は標準入力から読み込む）"
+    )
+    
+    parser.add_argument(
+        "--journal",
+        metavar="FILE",
+        help="バッチ処理の進行状況を記録するジャーナル (デフォルト: <バッチファイル>.journal.jsonl)"
+    )
+    
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="ジャーナルを引き継ぎ、完了していないURLのみを処理する"
+    )
+    
+    parser.add_argument(
+        "--retry-file",
+        metavar="FILE",
+        help="失敗したURLのみを書き出すバッチファイル (デフォルト: <バッチファイル>.retry.txt)"
+    )
+    
+    parser.add_argument(
+        "--archive",
+        nargs="?",
+        const=DownloadArchive.DEFAULT_FILENAME,
+        metavar="FILE",
+        help="ダウンロード済みのコンテンツを記録し、次回以降はスキップする "
+             "(ファイル省略時: ~/.datascoop/archive.txt)"
+    )
+    
+    parser.add_argument(
+        "--import-archive",
+        metavar="DIR",
+        help="既存のダウンロードディレクトリからダウンロード済みのIDをアーカイブに取り込む"
+    )
+    
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="バッチダウンロード時の同時実行数 (デフォルト: 1)"
+    )
+    
+    parser.add_argument(
+        "--platform-jobs",
+        action="append",
+        metavar="PLATFORM=N",
+        help="プラットフォームごとの同時実行数の上限 (例: youtube=4,abema=1)"
+    )
+    
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        metavar="N",
+        help=f"一時的なエラー（接続の切断、5xx、429など）で失敗したURLを再試行する回数 (デフォルト: {DEFAULT_RETRIES})"
+    )
+    
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=DEFAULT_PLATFORM_BUDGET,
+        metavar="N",
+        help=f"プラットフォームごとの再試行の回数の合計の上限 (デフォルト: {DEFAULT_PLATFORM_BUDGET})"
+    )
+    
+    parser.add_argument(
+        "--schedule",
+        choices=SCHEDULES,
+        default=FIFO,
+        help="バッチダウンロードの実行順序 (fifo: ファイルの順, priority: 「URL 優先度」で指定した優先度の高い順, "
+             "sjf: キャッシュ済みのメタデータから推定したサイズの小さい順, platform: --platform-orderの順) (デフォルト: fifo)"
+    )
+    
+    parser.add_argument(
+        "--platform-order",
+        metavar="PLATFORMS",
+        help=f"--schedule platform で先に実行するプラットフォームの順序 (デフォルト: {','.join(DEFAULT_PLATFORM_ORDER)})"
+    )
+    
+    parser.add_argument(
+        "--lanes",
+        action="store_true",
+        help="プラットフォームごとに専用のワーカーを割り当て、遅いプラットフォームが他を待たせないようにする "
+             "(各プラットフォームで --platform-jobs の数だけ同時に実行する)"
+    )
+    
+    parser.add_argument(
+        "--transcode-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="バッチダウンロード時に音声の変換を行うプロセスの数 (デフォルト: CPUの数, 0: ダウンロードと同じワーカーで変換)"
+    )
+    
+    parser.add_argument(
+        "--throughput-profile",
+        choices=list(ConfigManager.THROUGHPUT_PROFILES),
+        default="balanced",
+        help="HLS/DASHの断片の同時取得数やチャンクサイズなどのプロファイル (デフォルト: balanced)"
+    )
+    
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=0.5,
+        metavar="SECONDS",
+        help="進捗表示を更新する最短間隔（秒）。端末以外では一定間隔で要約をログに出力する (デフォルト: 0.5)"
+    )
+    
+    parser.add_argument(
+        "--no-progress",
+        action="store_true",
+        help="ダウンロード中の進捗を表示しない"
+    )
+    
+    parser.add_argument(
+        "--limit-rate",
+        metavar="RATE",
+        help="全てのダウンロードの合計速度の上限 (例: 5M, 500K。0で無制限)"
+    )
+    
+    parser.add_argument(
+        "--platform-limit-rate",
+        action="append",
+        metavar="PLATFORM=RATE",
+        help="プラットフォームごとの速度の上限 (例: youtube=2M,niconico=1M)"
+    )
+    
+    parser.add_argument(
+        "--shared-bandwidth",
+        action="store_true",
+        help="同じホストの他のDataScoopのプロセスと速度の上限を共有する。URLを指定しない場合は上限の変更のみを行う"
+    )
+    
+    parser.add_argument(
+        "--metrics-jsonl",
+        metavar="FILE",
+        help="段階（抽出・転送・後処理など）ごとの所要時間と転送量をJSON Lines形式で追記するファイル"
+    )
+    
+    parser.add_argument(
+        "--metrics-prom",
+        metavar="FILE",
+        help="終了時に計測の集計結果をPrometheusのtextfile形式 (.prom) で書き出すファイル"
+    )
+    
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="常駐プロセス（datascoop serve）が起動していても、このプロセスでダウンロードする"
     )
     
     parser.add_argument(
@@ -101,6 +298,441 @@ def parse_arguments():
     
     return parser.parse_args()
 
+def parse_sync_arguments(argv):
+    """
+    syncサブコマンドの引数をパースする
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        argparse.Namespace: パースした引数
+    """
+    parser = argparse.ArgumentParser(
+        prog="datascoop sync",
+        description="YouTubeチャンネルの前回の同期以降の新しい動画のみをダウンロードする（定期実行向け）"
+    )
+    
+    parser.add_argument(
+        "channels",
+        nargs="*",
+        help="同期するチャンネルのURL (省略時は同期したことのあるすべてのチャンネル)"
+    )
+    
+    parser.add_argument(
+        "--channels-file",
+        metavar="FILE",
+        help="チャンネルのURLリストを含むファイル（\"-\"の場合は標準入力から読み込む）"
+    )
+    
+    parser.add_argument(
+        "-o", "--output-dir",
+        default="downloads",
+        help="出力ディレクトリ (デフォルト: downloads)"
+    )
+    
+    parser.add_argument(
+        "-q", "--quality",
+        default="best",
+        help="動画の品質 (デフォルト: best)"
+    )
+    
+    parser.add_argument(
+        "--subtitles",
+        action="store_true",
+        help="可能であれば字幕もダウンロード"
+    )
+    
+    parser.add_argument(
+        "--throughput-profile",
+        choices=list(ConfigManager.THROUGHPUT_PROFILES),
+        default="balanced",
+        help="HLS/DASHの断片の同時取得数やチャンクサイズなどのプロファイル (デフォルト: balanced)"
+    )
+    
+    parser.add_argument(
+        "--max-videos",
+        type=int,
+        default=None,
+        metavar="N",
+        help="1回の同期でチャンネルごとにダウンロードする最大動画数。初回の同期では最新のN件から同期を始め、"
+             "2回目以降に新しい動画がN件より多い場合は古い順にダウンロードして残りは次回の同期に回す"
+    )
+    
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=None,
+        help="チャンネルごとに同時にダウンロードする動画の数 (デフォルト: 4)"
+    )
+    
+    parser.add_argument(
+        "--channel-jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="同時に同期するチャンネルの数 (デフォルト: 1)"
+    )
+    
+    parser.add_argument(
+        "--state",
+        metavar="FILE",
+        help="同期の状態を記録するファイル (デフォルト: ~/.datascoop/sync_state.json)"
+    )
+    
+    parser.add_argument(
+        "--archive",
+        nargs="?",
+        const=DownloadArchive.DEFAULT_FILENAME,
+        metavar="FILE",
+        help="ダウンロード済みのコンテンツを記録し、次回以降はスキップする "
+             "(ファイル省略時: ~/.datascoop/archive.txt)"
+    )
+    
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="詳細なログを出力"
+    )
+    
+    parser.set_defaults(import_archive=None)
+    return parser.parse_args(argv)
+
+def parse_serve_arguments(argv):
+    """
+    serveサブコマンドの引数をパースする
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        argparse.Namespace: パースした引数
+    """
+    from .daemon import DEFAULT_HOST, DEFAULT_PORT
+    parser = argparse.ArgumentParser(
+        prog="datascoop serve",
+        description="常駐してlocalhostのHTTP APIでジョブを受け付ける（起動中は datascoop <URL> がジョブを転送する）"
+    )
+    
+    parser.add_argument(
+        "--host",
+        default=DEFAULT_HOST,
+        help=f"待ち受けるアドレス (デフォルト: {DEFAULT_HOST})"
+    )
+    
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help=f"待ち受けるポート。0の場合は空いているポート (デフォルト: {DEFAULT_PORT})"
+    )
+    
+    parser.add_argument(
+        "-t", "--type",
+        choices=["video", "audio", "both"],
+        default="video",
+        help="オプションを指定しないジョブでダウンロードするコンテンツの種類 (デフォルト: video)"
+    )
+    
+    parser.add_argument(
+        "-o", "--output-dir",
+        default="downloads",
+        help="オプションを指定しないジョブの出力ディレクトリ (デフォルト: downloads)"
+    )
+    
+    parser.add_argument(
+        "-q", "--quality",
+        default="best",
+        help="オプションを指定しないジョブの品質 (デフォルト: best)"
+    )
+    
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=4,
+        help="同時実行数 (デフォルト: 4)"
+    )
+    
+    parser.add_argument(
+        "--platform-jobs",
+        action="append",
+        metavar="PLATFORM=N",
+        help="プラットフォームごとの同時実行数の上限 (例: youtube=4,abema=1)"
+    )
+    
+    parser.add_argument(
+        "--lanes",
+        action="store_true",
+        help="プラットフォームごとに専用のワーカーを割り当て、遅いプラットフォームが他を待たせないようにする"
+    )
+    
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        metavar="N",
+        help=f"一時的なエラーで失敗したジョブを再試行する回数 (デフォルト: {DEFAULT_RETRIES})"
+    )
+    
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=DEFAULT_PLATFORM_BUDGET,
+        metavar="N",
+        help=f"プラットフォームごとの再試行の回数の合計の上限 (デフォルト: {DEFAULT_PLATFORM_BUDGET})"
+    )
+    
+    parser.add_argument(
+        "--transcode-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="音声の変換を行うプロセスの数 (デフォルト: CPUの数, 0: ダウンロードと同じワーカーで変換)"
+    )
+    
+    parser.add_argument(
+        "--archive",
+        nargs="?",
+        const=DownloadArchive.DEFAULT_FILENAME,
+        metavar="FILE",
+        help="ダウンロード済みのコンテンツを記録し、次回以降はスキップする "
+             "(ファイル省略時: ~/.datascoop/archive.txt)"
+    )
+    
+    parser.add_argument(
+        "--throughput-profile",
+        choices=list(ConfigManager.THROUGHPUT_PROFILES),
+        default="balanced",
+        help="HLS/DASHの断片の同時取得数やチャンクサイズなどのプロファイル (デフォルト: balanced)"
+    )
+    
+    parser.add_argument(
+        "--limit-rate",
+        metavar="RATE",
+        help="全てのダウンロードの合計速度の上限 (例: 5M, 500K。0で無制限)"
+    )
+    
+    parser.add_argument(
+        "--platform-limit-rate",
+        action="append",
+        metavar="PLATFORM=RATE",
+        help="プラットフォームごとの速度の上限 (例: youtube=2M,niconico=1M)"
+    )
+    
+    parser.add_argument(
+        "--metrics-jsonl",
+        metavar="FILE",
+        help="段階（抽出・転送・後処理など）ごとの所要時間と転送量をJSON Lines形式で追記するファイル"
+    )
+    
+    parser.add_argument(
+        "--metrics-prom",
+        metavar="FILE",
+        help="終了時に計測の集計結果をPrometheusのtextfile形式 (.prom) で書き出すファイル"
+    )
+    
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="詳細なログを出力"
+    )
+    
+    # ジョブごとのオプションの既定値（コマンドラインモードと同じ）
+    parser.set_defaults(
+        filename=None, audio_format="mp3", video_format="mp4", subtitles=False,
+        import_archive=None, shared_bandwidth=False
+    )
+    return parser.parse_args(argv)
+
+def parse_jobs_arguments(argv):
+    """
+    jobsサブコマンドの引数をパースする
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        argparse.Namespace: パースした引数
+    """
+    parser = argparse.ArgumentParser(
+        prog="datascoop jobs",
+        description="常駐プロセス（datascoop serve）のジョブの一覧・状態の表示とキャンセルを行う"
+    )
+    
+    parser.add_argument(
+        "job_id",
+        nargs="?",
+        help="状態を表示するジョブのID (省略時はジョブの一覧を表示)"
+    )
+    
+    parser.add_argument(
+        "--cancel",
+        action="store_true",
+        help="指定したジョブをキャンセルする"
+    )
+    
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="JSON形式で出力する"
+    )
+    
+    return parser.parse_args(argv)
+
+def parse_worker_arguments(argv):
+    """
+    workerサブコマンドの引数をパースする
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        argparse.Namespace: パースした引数
+    """
+    from .spool import DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS
+    parser = argparse.ArgumentParser(
+        prog="datascoop worker",
+        description="共有のジョブキュー（SQLite）からジョブを取得して処理する。"
+                    "複数のプロセス・ホストで同じキューを指定すると、重複せずに分担して処理する"
+    )
+    
+    parser.add_argument(
+        "--queue",
+        metavar="FILE",
+        help="ジョブキューのファイル (デフォルト: ~/.datascoop/queue.db)"
+    )
+    
+    parser.add_argument(
+        "--enqueue",
+        metavar="BATCH_FILE",
+        help="バッチファイルのURLをジョブキューに追加して終了する（\"-\"の場合は標準入力から読み込む）"
+    )
+    
+    parser.add_argument(
+        "--requeue-failed",
+        action="store_true",
+        help="--enqueue で指定したURLのうち、失敗したジョブを試行回数を0に戻して待ち行列に戻す"
+    )
+    
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="ジョブキューとワーカーごとの統計を表示して終了する"
+    )
+    
+    parser.add_argument(
+        "-j", "--jobs",
+        type=int,
+        default=1,
+        help="このプロセスで並列に処理するジョブの数 (デフォルト: 1)"
+    )
+    
+    parser.add_argument(
+        "--lease",
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        metavar="SECONDS",
+        help=f"ジョブのリースの有効期限。停止したワーカーのジョブはこの時間の経過後に回収する (デフォルト: {DEFAULT_LEASE_SECONDS:.0f})"
+    )
+    
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=DEFAULT_MAX_ATTEMPTS,
+        metavar="N",
+        help=f"リースの期限切れで回収されたジョブを試行する回数の上限 (デフォルト: {DEFAULT_MAX_ATTEMPTS})"
+    )
+    
+    parser.add_argument(
+        "--exit-when-empty",
+        action="store_true",
+        help="待機中・処理中のジョブがなくなった時点で終了する"
+    )
+    
+    parser.add_argument(
+        "-t", "--type",
+        choices=["video", "audio", "both"],
+        help="ダウンロードするコンテンツの種類 (--enqueue ではジョブに記録する。デフォルト: video)"
+    )
+    
+    parser.add_argument(
+        "-o", "--output-dir",
+        help="出力ディレクトリ (--enqueue ではジョブに記録する。デフォルト: downloads)"
+    )
+    
+    parser.add_argument(
+        "-q", "--quality",
+        help="動画/音声の品質 (--enqueue ではジョブに記録する。デフォルト: best)"
+    )
+    
+    parser.add_argument(
+        "--audio-format",
+        choices=["mp3", "m4a", "wav", "flac"],
+        help="音声フォーマット (--enqueue ではジョブに記録する。デフォルト: mp3)"
+    )
+    
+    parser.add_argument(
+        "--video-format",
+        choices=["mp4", "webm", "mkv"],
+        help="動画フォーマット (--enqueue ではジョブに記録する。デフォルト: mp4)"
+    )
+    
+    parser.add_argument(
+        "--subtitles",
+        action="store_true",
+        default=None,
+        help="可能であれば字幕もダウンロード (--enqueue ではジョブに記録する)"
+    )
+    
+    parser.add_argument(
+        "--retries",
+        type=int,
+        default=DEFAULT_RETRIES,
+        metavar="N",
+        help=f"一時的なエラーで失敗したジョブを再試行する回数 (デフォルト: {DEFAULT_RETRIES})"
+    )
+    
+    parser.add_argument(
+        "--retry-budget",
+        type=int,
+        default=DEFAULT_PLATFORM_BUDGET,
+        metavar="N",
+        help=f"プラットフォームごとの再試行の回数の合計の上限 (デフォルト: {DEFAULT_PLATFORM_BUDGET})"
+    )
+    
+    parser.add_argument(
+        "--transcode-workers",
+        type=int,
+        default=None,
+        metavar="N",
+        help="音声の変換を行うプロセスの数 (デフォルト: CPUの数, 0: ダウンロードと同じワーカーで変換)"
+    )
+    
+    parser.add_argument(
+        "--archive",
+        nargs="?",
+        const=DownloadArchive.DEFAULT_FILENAME,
+        metavar="FILE",
+        help="ダウンロード済みのコンテンツを記録し、次回以降はスキップする "
+             "(ファイル省略時: ~/.datascoop/archive.txt)"
+    )
+    
+    parser.add_argument(
+        "--throughput-profile",
+        choices=list(ConfigManager.THROUGHPUT_PROFILES),
+        default="balanced",
+        help="HLS/DASHの断片の同時取得数やチャンクサイズなどのプロファイル (デフォルト: balanced)"
+    )
+    
+    parser.add_argument(
+        "-v", "--verbose",
+        action="store_true",
+        help="詳細なログを出力"
+    )
+    
+    parser.set_defaults(filename=None, import_archive=None)
+    return parser.parse_args(argv)
+
 def print_version():
     """バージョン情報を表示"""
     from . import __version__
@@ -108,13 +740,13 @@ def print_version():
     print("A Python application for downloading videos and audio using yt-dlp")
     sys.exit(0)
 
-def print_formats(url):
+def print_formats(url, use_cache=True):
     """利用可能なフォーマットを表示"""
     if not url:
         logger.error("フォーマット一覧を取得するにはURLを指定してください")
         sys.exit(1)
         
-    formats = check_available_formats(url)
+    formats = check_available_formats(url, use_cache=use_cache)
     
     if not formats:
         logger.error("利用可能なフォーマットを取得できませんでした")
@@ -147,83 +779,709 @@ def print_formats(url):
     print("-" * 80)
     sys.exit(0)
 
-def process_batch_file(batch_file, args):
+def open_archive(args):
+    """コマンドライン引数に応じてダウンロードアーカイブを開く"""
+    if not args.archive and not args.import_archive:
+        return None
+    path = None
+    if args.archive and args.archive != DownloadArchive.DEFAULT_FILENAME:
+        path = args.archive
+    return DownloadArchive(path)
+
+def open_bandwidth(args):
+    """
+    コマンドライン引数から帯域制御を設定する
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+    
+    Returns:
+        BandwidthScheduler: 設定した帯域制御
+    """
+    try:
+        limit = parse_rate(args.limit_rate) if args.limit_rate is not None else None
+        platform_limits = parse_platform_rates(args.platform_limit_rate)
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    return configure_bandwidth(
+        limit=limit,
+        platform_limits=platform_limits,
+        shared_path=get_shared_state_path() if args.shared_bandwidth else None
+    )
+
+def open_metadata_writer(args):
+    """
+    --metadata-only の記録を書き出すファイルを開く
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+    
+    Returns:
+        MetadataWriter: 記録の書き出し先（再開する場合は既存のファイルに追記する）
+    """
+    path = args.metadata_file or os.path.join(args.output_dir, metadata_output.DEFAULT_FILENAME)
+    return metadata_output.MetadataWriter(path, append=args.resume)
+
+def process_batch_file(batch_file, args, archive=None, session=None, metadata_writer=None):
     """バッチファイルからURLリストを処理する"""
-    if not os.path.exists(batch_file):
+    if session is None:
+        # バッチ全体で1つのセッションを使用し、ダウンローダーとyt-dlpのインスタンスを再利用する
+        from .session import DownloadSession
+        with DownloadSession() as session:
+            return process_batch_file(
+                batch_file, args, archive=archive, session=session, metadata_writer=metadata_writer
+            )
+    
+    if batch_file != STDIN_BATCH_FILE and not os.path.exists(batch_file):
         logger.error(f"バッチファイルが見つかりません: {batch_file}")
         sys.exit(1)
         
-    with open(batch_file, 'r', encoding='utf-8') as f:
-        urls = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
-    
-    if not urls:
-        logger.error("バッチファイルに有効なURLが含まれていません")
+    try:
+        platform_limits = parse_platform_limits(args.platform_jobs)
+    except ValueError as e:
+        logger.error(str(e))
         sys.exit(1)
+    
+    # 標準入力から読み込む場合、ジャーナルと再試行用ファイルはカレントディレクトリに作成する
+    batch_name = "datascoop-stdin" if batch_file == STDIN_BATCH_FILE else batch_file
         
-    logger.info(f"{len(urls)}件のURLを処理します...")
+    # 進行状況をジャーナルに記録し、中断しても --resume で再開できるようにする
+    journal_path = args.journal or f"{batch_name}.journal.jsonl"
+    journal = job_journal.JobJournal(journal_path, resume=args.resume)
+    counts = {"read": 0, "resumed": 0}
+    priorities = {}
     
-    for i, url in enumerate(urls, 1):
-        logger.info(f"[{i}/{len(urls)}] {url} をダウンロード中...")
-        download_content(url, args)
+    def queued_urls():
+        """バッチファイルのURLを重複を除いて1件ずつ読み込み、ジャーナルに記録する"""
+        for url in unique_urls(read_batch_urls(batch_file, priorities)):
+            counts["read"] += 1
+            if args.resume and journal.is_done(url):
+                counts["resumed"] += 1
+                continue
+            journal.record(url, job_journal.QUEUED)
+            yield url
     
-    logger.info("バッチダウンロードが完了しました")
+    jobs = max(1, args.jobs)
+    
+    # 音声の変換はダウンロードのワーカーとは別のプロセスプールで行う
+    transcode_pool = None
+    if args.type in ["audio", "both"] and args.transcode_workers != 0 and not args.metadata_only:
+        transcode_pool = TranscodePool(workers=args.transcode_workers)
+        logger.info(f"音声の変換を{transcode_pool.workers}個のプロセスで並列に行います")
+    
+    if metadata_writer is not None:
+        # メタデータのみを取得する場合は、アーカイブに記録済みのURLも対象にする
+        job = partial(harvest_metadata, args=args, writer=metadata_writer, journal=journal, session=session)
+        archive = None
+    else:
+        job = partial(
+            download_content, args=args, archive=archive, journal=journal, session=session,
+            transcode_pool=transcode_pool
+        )
+    
+    batch = BatchDownloader(
+        job,
+        jobs=jobs,
+        platform_limits=platform_limits,
+        archive=archive,
+        retry_policy=RetryPolicy(retries=args.retries, platform_budget=args.retry_budget),
+        scheduler=create_scheduler(
+            args.schedule,
+            priorities=priorities,
+            platform_order=[p.strip().lower() for p in args.platform_order.split(",")] if args.platform_order else None
+        ),
+        lanes=args.lanes
+    )
+    lanes = "、プラットフォームごとのレーン" if args.lanes else ""
+    logger.info(
+        f"バッチファイルのURLを読み込みながら処理します... (同時実行数: {batch.workers}{lanes}, 実行順序: {args.schedule})"
+    )
+    summary = BatchSummary()
+    
+    # 完了したジョブから順に結果を表示
+    with journal, transcode_pool or nullcontext():
+        for done, result in enumerate(batch.run(queued_urls()), 1):
+            summary.add(result)
+            if result.success:
+                journal.record(result.url, job_journal.DONE)
+            else:
+                journal.record(result.url, job_journal.FAILED, reason=result.error)
+            get_metrics().record_retries(result.platform, result.attempts - 1)
+            status = "スキップ" if result.skipped else ("成功" if result.success else "失敗")
+            logger.info(f"[{done}/{batch.received}] {status}: {result.url} ({result.elapsed:.1f}秒)")
+        
+        if not counts["read"]:
+            logger.error("バッチファイルに有効なURLが含まれていません")
+            sys.exit(1)
+        if counts["resumed"]:
+            logger.info(f"ジャーナルから再開しました: 完了済みの{counts['resumed']}件をスキップしました")
+        
+        summary.finish()
+        summary.log(logger)
+        get_metrics().log_summary(logger)
+        
+        # 失敗したURLのみを含む再試行用のバッチファイルを書き出す
+        if journal.failures():
+            retry_path = args.retry_file or f"{batch_name}.retry.txt"
+            count = journal.write_retry_file(retry_path)
+            logger.info(f"失敗した{count}件のURLを再試行用ファイルに書き出しました: {retry_path}")
+    
+    return summary
 
-def download_content(url, args):
-    """指定されたURLからコンテンツをダウンロードする"""
-    # URLからプラットフォームを判定
-    platform = get_platform_from_url(url)
-    logger.info(f"検出されたプラットフォーム: {platform}")
+def download_content(url, args, archive=None, journal=None, session=None, transcode_pool=None):
+    """
+    指定されたURLからコンテンツをダウンロードする
+    
+    Args:
+        url (str): ダウンロードするURL
+        args (argparse.Namespace): コマンドライン引数
+        archive (DownloadArchive, optional): ダウンロード済みのコンテンツを記録するアーカイブ
+        journal (JobJournal, optional): 進行状況を記録するジャーナル
+        session (DownloadSession, optional): ダウンローダーを再利用するセッション
+            （省略時はこのURLの処理のみで使用するセッションを作成する）
+        transcode_pool (TranscodePool, optional): 音声の変換を別のプロセスで行うプール
+    
+    Returns:
+        bool: 要求されたすべてのダウンロードに成功した場合はTrue
+            （transcode_poolを指定して音声を変換する場合は、変換の完了時に結果を受け取るFuture）
+    """
+    if archive is not None and archive.contains_url(url):
+        logger.info(f"ダウンロード済みのためスキップします: {url}")
+        return True
+    
+    # ダウンローダー（yt-dlp）は実際にダウンロードする時のみ読み込む
+    from .downloaders import AudioDownloader
+    
+    if session is None:
+        from .session import DownloadSession
+        with DownloadSession() as session:
+            return download_content(
+                url, args, archive=archive, journal=journal, session=session, transcode_pool=transcode_pool
+            )
+    
+    success = True
+    video_file = None
+    progress_hooks = []
+    if journal is not None:
+        journal.record(url, job_journal.EXTRACTING)
+        progress_hooks.append(journal.progress_hook(url))
+    
+    # URLからプラットフォームと使用するダウンローダーを判定
+    route = classify_url(url)
+    logger.info(f"検出されたプラットフォーム: {route.platform}")
     
     # コンテンツの種類に応じたダウンローダーを準備
     if args.type in ["video", "both"]:
         video_output_dir = os.path.join(args.output_dir, "videos") if args.type == "both" else args.output_dir
         
-        # プラットフォームに応じたダウンローダーを選択
-        if platform == 'youtube':
-            video_downloader = YouTubeDownloader(output_dir=video_output_dir, quality=args.quality)
-        elif platform == 'abema':
-            video_downloader = AbemaDownloader(output_dir=video_output_dir, quality=args.quality)
-        else:
-            # その他のプラットフォームは一般的なVideoDownloaderを使用
-            video_downloader = VideoDownloader(output_dir=video_output_dir, quality=args.quality)
-        
         # 動画をダウンロード
         logger.info("動画のダウンロードを開始します...")
-        video_file = video_downloader.download(
-            url, 
-            filename=args.filename,
-            format=f"bestvideo[ext={args.video_format}]+bestaudio/best[ext={args.video_format}]",
-            subtitles=args.subtitles
-        )
+        with session.downloader(
+            route.downloader_class,
+            output_dir=video_output_dir,
+            quality=args.quality,
+            throughput_profile=args.throughput_profile
+        ) as video_downloader:
+            video_file = video_downloader.download(
+                url, 
+                filename=args.filename,
+                format=f"bestvideo[ext={args.video_format}]+bestaudio/best[ext={args.video_format}]",
+                subtitles=args.subtitles,
+                progress_hooks=progress_hooks,
+                archive=archive
+            )
         
-        if video_file:
+        # 作品タイトルURLの場合はファイルパスのリストが返る（すべてスキップした場合は空のリスト）
+        if video_file is not None:
             logger.info(f"動画ダウンロード成功: {video_file}")
         else:
             logger.error("動画のダウンロードに失敗しました")
+            success = False
     
     if args.type in ["audio", "both"]:
         audio_output_dir = os.path.join(args.output_dir, "audio")
-        audio_downloader = AudioDownloader(
-            output_dir=audio_output_dir, 
+        
+        audio_file = None
+        with session.downloader(
+            AudioDownloader,
+            output_dir=audio_output_dir,
             quality=args.quality,
-            audio_format=args.audio_format
-        )
+            audio_format=args.audio_format,
+            throughput_profile=args.throughput_profile
+        ) as audio_downloader:
+            if isinstance(video_file, str):
+                # 取得済みの動画から音声をローカルで抽出し、同じメディアの再ダウンロードを避ける
+                logger.info("ダウンロード済みの動画から音声を抽出します...")
+                if journal is not None:
+                    journal.record(url, job_journal.POST_PROCESSING)
+                audio_file = audio_downloader.extract_audio(
+                    video_file, filename=args.filename, bitrate="192K", transcode_pool=transcode_pool
+                )
+                if not audio_file:
+                    logger.warning("音声の抽出に失敗したため、音声を個別にダウンロードします")
+            
+            if not audio_file:
+                logger.info("音声のダウンロードを開始します...")
+                audio_file = audio_downloader.download(
+                    url, 
+                    filename=args.filename,
+                    bitrate="192K",
+                    progress_hooks=progress_hooks,
+                    transcode_pool=transcode_pool
+                )
+                if audio_file and transcode_pool is not None and journal is not None:
+                    journal.record(url, job_journal.POST_PROCESSING)
         
-        # 音声をダウンロード
-        logger.info("音声のダウンロードを開始します...")
-        audio_file = audio_downloader.download(
-            url, 
-            filename=args.filename,
-            bitrate="192K"
-        )
+        if isinstance(audio_file, Future):
+            # 変換の完了を待たずに次のダウンロードに進み、結果は変換の完了時に確定する
+            def finish(path):
+                logger.info(f"音声ダウンロード成功: {path}")
+                if success and archive is not None:
+                    archive.record_url(url)
+                return success
+            return then(audio_file, finish)
         
         if audio_file:
             logger.info(f"音声ダウンロード成功: {audio_file}")
         else:
             logger.error("音声のダウンロードに失敗しました")
+            success = False
+    
+    if success and archive is not None:
+        archive.record_url(url)
+    
+    return success
+
+def harvest_metadata(url, args, writer, journal=None, session=None):
+    """
+    指定されたURLの動画を転送せずにメタデータのみを取得し、記録を書き出す
+    
+    Args:
+        url (str): 対象のURL
+        args (argparse.Namespace): コマンドライン引数
+        writer (MetadataWriter): 記録の書き出し先
+        journal (JobJournal, optional): 進行状況を記録するジャーナル
+        session (DownloadSession, optional): ダウンローダーを再利用するセッション
+    
+    Returns:
+        bool: メタデータを取得できた場合はTrue
+    """
+    if session is None:
+        from .session import DownloadSession
+        with DownloadSession() as session:
+            return harvest_metadata(url, args, writer, journal=journal, session=session)
+    
+    progress_hooks = []
+    if journal is not None:
+        journal.record(url, job_journal.EXTRACTING)
+        progress_hooks.append(journal.progress_hook(url))
+    
+    route = classify_url(url)
+    with session.downloader(
+        route.downloader_class,
+        output_dir=args.output_dir,
+        quality=args.quality,
+        throughput_profile=args.throughput_profile
+    ) as downloader:
+        info = downloader.extract_metadata(
+            url,
+            subtitles=args.subtitles,
+            thumbnails=args.thumbnails,
+            use_cache=not args.no_cache,
+            progress_hooks=progress_hooks
+        )
+    
+    if info is None:
+        logger.error(f"メタデータの取得に失敗しました: {url}")
+        return False
+    
+    count = 0
+    for record in metadata_output.iter_records(info, url):
+        writer.write(record)
+        count += 1
+    logger.info(f"メタデータを書き出しました: {url} ({count}件)")
+    return True
+
+def run_sync(argv):
+    """
+    syncサブコマンドを実行する
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        bool: すべてのチャンネルの同期に成功した場合はTrue
+    """
+    args = parse_sync_arguments(argv)
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    
+    state = ChannelSyncState(args.state)
+    channels = list(args.channels)
+    if args.channels_file:
+        channels.extend(read_batch_urls(args.channels_file))
+    if not channels:
+        channels = state.channels()
+        if not channels:
+            logger.error("同期するチャンネルが指定されていません")
+            return False
+        logger.info(f"同期したことのある{len(channels)}個のチャンネルを同期します")
+    
+    archive = open_archive(args)
+    progress = configure_progress()
+    
+    from .downloaders import YouTubeDownloader
+    from .downloaders.youtube import DEFAULT_PLAYLIST_JOBS
+    from .session import DownloadSession
+    
+    def sync(session, channel_url):
+        """1つのチャンネルを同期する"""
+        route = classify_url(channel_url)
+        if route.platform != "youtube" or route.kind != KIND_CHANNEL:
+            logger.error(f"YouTubeチャンネルのURLではないため同期できません: {channel_url}")
+            return False
+        with session.downloader(
+            YouTubeDownloader,
+            output_dir=args.output_dir,
+            quality=args.quality,
+            throughput_profile=args.throughput_profile
+        ) as downloader:
+            return downloader.sync_channel(
+                channel_url, state,
+                max_videos=args.max_videos,
+                jobs=args.jobs or DEFAULT_PLAYLIST_JOBS,
+                subtitles=args.subtitles,
+                archive=archive
+            ) is not None
+    
+    with DownloadSession() as session:
+        with ThreadPoolExecutor(max_workers=max(1, args.channel_jobs), thread_name_prefix="datascoop-sync") as executor:
+            results = list(executor.map(partial(sync, session), unique_urls(channels)))
+    progress.close()
+    
+    failed = results.count(False)
+    logger.info(f"チャンネルの同期が完了しました: 成功 {len(results) - failed}件 / 失敗 {failed}件")
+    return not failed
+
+def run_serve(argv):
+    """
+    serveサブコマンドを実行する（終了するまで戻らない）
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        bool: 起動できた場合はTrue
+    """
+    args = parse_serve_arguments(argv)
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    
+    try:
+        platform_limits = parse_platform_limits(args.platform_jobs)
+    except ValueError as e:
+        logger.error(str(e))
+        return False
+    
+    archive = open_archive(args)
+    bandwidth = open_bandwidth(args)
+    progress = configure_progress()
+    metrics = configure_metrics(jsonl_path=args.metrics_jsonl)
+    
+    # yt-dlpとダウンローダーは起動時に読み込み、最初のジョブで読み込みを待たないようにする
+    from .downloaders import AudioDownloader  # noqa: F401
+    from .session import DownloadSession
+    from .daemon import DownloadDaemon
+    
+    transcode_pool = None
+    if args.transcode_workers != 0:
+        transcode_pool = TranscodePool(workers=args.transcode_workers)
+    
+    with DownloadSession() as session, transcode_pool or nullcontext():
+        def run_job(url, options, journal):
+            """ジョブごとのオプションを起動時の設定に重ねてダウンロードする"""
+            job_args = argparse.Namespace(**{**vars(args), **options})
+            return download_content(
+                url, job_args, archive=archive, journal=journal, session=session, transcode_pool=transcode_pool
+            )
+        
+        try:
+            daemon = DownloadDaemon(
+                run_job,
+                jobs=max(1, args.jobs),
+                platform_limits=platform_limits,
+                retry_policy=RetryPolicy(retries=args.retries, platform_budget=args.retry_budget),
+                lanes=args.lanes,
+                host=args.host,
+                port=args.port
+            )
+        except OSError as e:
+            logger.error(f"{args.host}:{args.port} で待ち受けられませんでした: {e}")
+            return False
+        
+        # SIGTERMでもCtrl+Cと同じように終了する
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.request_stop())
+        daemon.start()
+        try:
+            daemon.wait()
+        except KeyboardInterrupt:
+            logger.info("終了します...")
+        finally:
+            daemon.stop()
+    
+    progress.close()
+    bandwidth.log_report(logger)
+    finish_metrics(metrics, args)
+    return True
+
+def print_spool_stats(stats):
+    """ジョブキューとワーカーごとの統計を表示する"""
+    counts = stats["counts"]
+    print(" / ".join(f"{state} {count}件" for state, count in counts.items()))
+    if not stats["workers"]:
+        return
+    print("-" * 80)
+    print(f"{'ワーカー':<28} {'状態':<8} {'完了':>6} {'失敗':>6} {'回収':>6} {'転送量':>10} {'件/時':>8}")
+    print("-" * 80)
+    for worker in stats["workers"]:
+        state = "停止" if worker["stopped_at"] else "稼働中"
+        per_hour = worker["done"] / worker["busy_seconds"] * 3600 if worker["busy_seconds"] else 0.0
+        transferred = f"{worker['bytes'] / (1024 * 1024):.1f} MB"
+        print(
+            f"{worker['worker_id']:<28} {state:<8} {worker['done']:>6} {worker['failed']:>6} "
+            f"{worker['reclaimed']:>6} {transferred:>10} {per_hour:>8.1f}"
+        )
+
+def run_worker(argv):
+    """
+    workerサブコマンドを実行する
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        bool: 成功した場合はTrue
+    """
+    args = parse_worker_arguments(argv)
+    if args.verbose:
+        logger.setLevel(logging.DEBUG)
+    
+    from .spool import JobSpool, SpoolWorker
+    
+    # --enqueue で指定したオプションはジョブに記録し、ワーカーの設定より優先する
+    job_options = {
+        name: getattr(args, name)
+        for name in ("type", "output_dir", "quality", "audio_format", "video_format", "subtitles")
+        if getattr(args, name) is not None
+    }
+    
+    with JobSpool(args.queue) as spool:
+        if args.stats:
+            print_spool_stats(spool.stats())
+            return True
+        
+        if args.enqueue:
+            if args.enqueue != STDIN_BATCH_FILE and not os.path.exists(args.enqueue):
+                logger.error(f"バッチファイルが見つかりません: {args.enqueue}")
+                return False
+            priorities = {}
+            urls = unique_urls(read_batch_urls(args.enqueue, priorities))
+            result = spool.add(urls, job_options, priorities, requeue_failed=args.requeue_failed)
+            logger.info(f"{result.added}件のジョブをキューに追加しました: {spool.path}")
+            if result.requeued:
+                logger.info(f"失敗した{result.requeued}件のジョブを待ち行列に戻しました")
+            if result.skipped:
+                hint = "" if args.requeue_failed else "（失敗したジョブは --requeue-failed で待ち行列に戻せます）"
+                logger.info(f"登録済みまたは完了済みのため{result.skipped}件のURLを追加しませんでした{hint}")
+            return True
+        
+        defaults = {"type": "video", "output_dir": "downloads", "quality": "best", "audio_format": "mp3",
+                    "video_format": "mp4", "subtitles": False}
+        archive = open_archive(args)
+        progress = configure_progress()
+        
+        from .session import DownloadSession
+        transcode_pool = None
+        if args.transcode_workers != 0:
+            transcode_pool = TranscodePool(workers=args.transcode_workers)
+        
+        with DownloadSession() as session, transcode_pool or nullcontext():
+            def run_job(url, options, journal):
+                """ジョブに記録したオプションをワーカーの設定に重ねてダウンロードする"""
+                job_args = argparse.Namespace(**{**vars(args), **defaults, **job_options, **options})
+                return download_content(
+                    url, job_args, archive=archive, journal=journal, session=session, transcode_pool=transcode_pool
+                )
+            
+            worker = SpoolWorker(
+                spool, run_job,
+                jobs=args.jobs,
+                lease_seconds=args.lease,
+                retry_policy=RetryPolicy(retries=args.retries, platform_budget=args.retry_budget),
+                max_attempts=args.max_attempts
+            )
+            signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+            try:
+                totals = worker.run(exit_when_empty=args.exit_when_empty)
+            except KeyboardInterrupt:
+                return False
+            finally:
+                progress.close()
+    return not totals["failed"]
+
+def format_job(job):
+    """ジョブの状態を1行の文字列にする"""
+    progress = ""
+    if job.get("total_bytes"):
+        progress = f" {job['downloaded_bytes'] / job['total_bytes'] * 100:.1f}%"
+    error = f" ({job['category']}: {job['error']})" if job.get("error") else ""
+    return f"{job['id']}  {job['state']:<15}{progress:>7}  {job['url']}{error}"
+
+def run_jobs(argv):
+    """
+    jobsサブコマンドを実行する
+    
+    Args:
+        argv (list): サブコマンド名より後の引数
+    
+    Returns:
+        bool: 成功した場合はTrue
+    """
+    args = parse_jobs_arguments(argv)
+    from .daemon import DaemonClient, DaemonError
+    
+    client = DaemonClient.find()
+    if client is None:
+        logger.error("常駐プロセスが起動していません（datascoop serve で起動してください）")
+        return False
+    
+    try:
+        if args.job_id is None:
+            if args.cancel:
+                logger.error("キャンセルするジョブのIDを指定してください")
+                return False
+            jobs = client.list()
+        elif args.cancel:
+            jobs = [client.cancel(args.job_id)]
+        else:
+            jobs = [client.status(args.job_id)]
+    except DaemonError as e:
+        logger.error(f"常駐プロセスの操作に失敗しました: {e}")
+        return False
+    
+    if args.json:
+        print(json.dumps(jobs if args.job_id is None else jobs[0], ensure_ascii=False, indent=2))
+    else:
+        for job in jobs:
+            print(format_job(job))
+    return True
+
+# 常駐プロセスに転送できないオプション（引数の属性名, オプション名, デフォルト値）
+# アーカイブ・キャッシュ・帯域・再試行の設定は、常駐プロセスが起動時の設定をすべてのジョブで共有する
+DAEMON_LOCAL_OPTIONS = (
+    ("archive", "--archive", None),
+    ("no_cache", "--no-cache", False),
+    ("throughput_profile", "--throughput-profile", "balanced"),
+    ("limit_rate", "--limit-rate", None),
+    ("platform_limit_rate", "--platform-limit-rate", None),
+    ("retries", "--retries", DEFAULT_RETRIES),
+    ("retry_budget", "--retry-budget", DEFAULT_PLATFORM_BUDGET),
+)
+
+def daemon_local_options(args):
+    """
+    常駐プロセスに転送すると反映されないオプションのうち、指定されているものを返す
+    
+    Args:
+        args (argparse.Namespace): コマンドライン引数
+    
+    Returns:
+        list: オプション名のリスト
+    """
+    return [name for attr, name, default in DAEMON_LOCAL_OPTIONS if getattr(args, attr, default) != default]
+
+def forward_to_daemon(client, args):
+    """
+    URLのダウンロードを常駐プロセスに依頼し、完了するまで待機する
+    中断（Ctrl+C）した場合はジョブをキャンセルする
+    
+    Args:
+        client (DaemonClient): 常駐プロセスのクライアント
+        args (argparse.Namespace): コマンドライン引数
+    
+    Returns:
+        bool: ダウンロードに成功した場合はTrue
+    """
+    from .daemon import DaemonError, DONE
+    
+    # 出力先は常駐プロセスではなく、このコマンドを実行したディレクトリを基準にする
+    options = {
+        "type": args.type,
+        "output_dir": os.path.abspath(args.output_dir),
+        "filename": args.filename,
+        "quality": args.quality,
+        "audio_format": args.audio_format,
+        "video_format": args.video_format,
+        "subtitles": args.subtitles,
+    }
+    last = {"state": None}
+    
+    def report(job):
+        if job["state"] != last["state"]:
+            last["state"] = job["state"]
+            logger.info(f"[{job['id']}] {job['state']}: {job['url']}")
+    
+    try:
+        job = client.submit(args.url, options)
+        logger.info(f"常駐プロセスにジョブを送信しました: {job['id']} ({client.url})")
+        try:
+            job = client.wait(job["id"], callback=report)
+        except KeyboardInterrupt:
+            client.cancel(job["id"])
+            logger.info(f"ジョブをキャンセルしました: {job['id']}")
+            raise
+    except DaemonError as e:
+        logger.error(f"常駐プロセスの操作に失敗しました: {e}")
+        return False
+    
+    if job["state"] != DONE:
+        logger.error(f"ダウンロードに失敗しました: {format_job(job)}")
+        return False
+    return True
+
+def finish_metrics(metrics, args):
+    """
+    計測を終了し、指定されていればPrometheusのtextfile形式で書き出す
+    
+    Args:
+        metrics (MetricsRecorder): 計測
+        args (argparse.Namespace): コマンドライン引数
+    """
+    if args.metrics_prom:
+        try:
+            metrics.write_prometheus(args.metrics_prom)
+            logger.info(f"計測の集計結果を書き出しました: {args.metrics_prom}")
+        except OSError as e:
+            logger.error(f"計測の集計結果を書き出せませんでした: {e}")
+    metrics.close()
+
+def start_interactive():
+    """対話モードを開始する"""
+    # 対話モード（tkinterを含む）は必要な時のみ読み込む
+    from .interactive import InteractiveDownloader
+    interactive = InteractiveDownloader()
+    interactive.start()
 
 def main():
     """メイン関数"""
+    # サブコマンド
+    subcommands = {"sync": run_sync, "serve": run_serve, "jobs": run_jobs, "worker": run_worker}
+    if sys.argv[1:2] and sys.argv[1] in subcommands:
+        if not subcommands[sys.argv[1]](sys.argv[2:]):
+            sys.exit(1)
+        return
+    
     args = parse_arguments()
     
     # バージョン情報表示
@@ -236,14 +1494,24 @@ def main():
         logger.setLevel(logging.DEBUG)
         logger.debug("詳細ログが有効になりました")
     
-    # URLが指定されていて、かつ明示的に対話モードが無効の場合のみコマンドラインモードを使用
+    # アーカイブへの取り込みのみを行う場合
+    if args.import_archive:
+        open_archive(args).import_directory(args.import_archive)
+        if not args.url and not args.batch_file:
+            return
+    
+    # 速度の上限を設定する（共有する場合は他のプロセスにも反映される）
+    bandwidth = open_bandwidth(args)
+    if args.shared_bandwidth and not args.url and not args.batch_file:
+        return
+    
+    # URLまたはバッチファイルが指定されていて、かつ明示的に対話モードが無効の場合のみコマンドラインモードを使用
     # つまり、デフォルトは対話モード
-    use_command_line = args.url and not args.interactive
+    use_command_line = (args.url or args.batch_file) and not args.interactive
     
     if not use_command_line:
         # 対話モードの実行（デフォルト）
-        interactive = InteractiveDownloader()
-        interactive.start()
+        start_interactive()
         return
     
     # 以下はコマンドラインモードの処理
@@ -253,19 +1521,55 @@ def main():
         if not args.url:
             logger.error("フォーマット一覧を取得するにはURLを指定してください")
             # フォールバックとして対話モードを使用
-            interactive = InteractiveDownloader()
-            interactive.start()
+            start_interactive()
             return
-        print_formats(args.url)
+        print_formats(args.url, use_cache=not args.no_cache)
         return
     
+    # 常駐プロセスが起動している場合は、URLのダウンロードを常駐プロセスに転送する
+    if args.url and not args.batch_file and not args.no_daemon and not args.metadata_only:
+        from .daemon import DaemonClient
+        client = DaemonClient.find()
+        local_options = daemon_local_options(args) if client is not None else []
+        if local_options:
+            logger.info(f"常駐プロセスはジョブごとに {', '.join(local_options)} を変更できないため、このプロセスでダウンロードします")
+        elif client is not None:
+            if not forward_to_daemon(client, args):
+                sys.exit(1)
+            return
+    
+    archive = open_archive(args)
+    progress = configure_progress(interval=args.progress_interval, enabled=not args.no_progress)
+    metrics = configure_metrics(jsonl_path=args.metrics_jsonl)
+    
+    # メタデータのみを取得する場合は、記録の書き出し先を開く
+    metadata_writer = open_metadata_writer(args) if args.metadata_only else None
+    
     # バッチファイルがある場合はバッチ処理
     if args.batch_file:
-        process_batch_file(args.batch_file, args)
+        with metadata_writer or nullcontext():
+            process_batch_file(args.batch_file, args, archive=archive, metadata_writer=metadata_writer)
+        if metadata_writer is not None:
+            logger.info(f"{metadata_writer.count}件のメタデータを書き出しました: {metadata_writer.path}")
+        progress.close()
+        bandwidth.log_report(logger)
+        finish_metrics(metrics, args)
         return
     
-    # URLが指定されている場合はコマンドラインモードでダウンロード
-    download_content(args.url, args)
+    # URLが指定されている場合はコマンドラインモードでダウンロード（一時的なエラーは再試行する）
+    if metadata_writer is not None:
+        job = partial(harvest_metadata, args.url, args, metadata_writer)
+    else:
+        job = partial(download_content, args.url, args, archive=archive)
+    policy = RetryPolicy(retries=args.retries, platform_budget=args.retry_budget)
+    with metadata_writer or nullcontext():
+        success, attempts, category, error = policy.call(job, classify_url(args.url).platform)
+    if not success:
+        logger.error(f"ダウンロードに失敗しました ({category}, {attempts}回試行): {error or args.url}")
+    metrics.record_retries(classify_url(args.url).platform, attempts - 1)
+    progress.close()
+    bandwidth.log_report(logger)
+    finish_metrics(metrics, args)
     logger.info("処理が完了しました")
 
 if __name__ == "__main__":
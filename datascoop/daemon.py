@@ -0,0 +1,611 @@
+"""
+常駐モード（datascoop serve）とそのクライアント
+Pythonの起動、yt-dlpの読み込み、抽出器やHTTP接続の初期化を一度だけ行い、
+localhostのHTTP APIで受け付けたジョブを常駐しているワーカーで処理する
+
+API（JSON、Authorization: Bearer <トークン> が必要）:
+    POST   /jobs       ジョブを投入する {"url": ..., "options": {...}, "priority": 0}
+    GET    /jobs       ジョブの一覧を取得する
+    GET    /jobs/<id>  ジョブの状態を取得する
+    DELETE /jobs/<id>  ジョブをキャンセルする
+"""
+
+import os
+import json
+import time
+import uuid
+import queue
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib import request as urlrequest
+from urllib.error import HTTPError, URLError
+from .aio import DownloadCancelled
+from .batch import BatchDownloader
+from .scheduler import PriorityScheduler
+from .utils.config import get_config_dir
+from .utils.journal import QUEUED, EXTRACTING, DOWNLOADING, POST_PROCESSING, DONE, FAILED
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# キャンセルされたジョブの状態
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+# ジョブごとに指定できるオプション（それ以外は常駐プロセスの起動時の設定を使用する）
+JOB_OPTIONS = ("type", "output_dir", "filename", "quality", "audio_format", "video_format", "subtitles")
+
+# 保持する完了済みのジョブの数の上限（古いものから破棄する）
+MAX_FINISHED_JOBS = 1000
+
+# 常駐プロセスの接続先とトークンを記録するファイル名
+STATE_FILENAME = "daemon.json"
+
+
+def get_daemon_state_path():
+    """
+    常駐プロセスの接続先を記録するファイルのパスを取得する
+
+    Returns:
+        str: ~/.datascoop/daemon.json
+    """
+    return os.path.join(get_config_dir(), STATE_FILENAME)
+
+
+class DaemonError(Exception):
+    """常駐プロセスとの通信に失敗したことを示す例外"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class JobTable:
+    """
+    常駐プロセスのジョブを管理するクラス
+    JobJournalと同じ record / progress_hook を持ち、download_content の journal として渡せる
+    同じURLの処理中のジョブは1件のみとし、重複して投入された場合は既存のジョブを返す
+    """
+
+    def __init__(self, max_finished=MAX_FINISHED_JOBS):
+        """
+        コンストラクタ
+
+        Args:
+            max_finished (int): 保持する完了済みのジョブの数の上限
+        """
+        self.max_finished = max_finished
+        self.priorities = {}
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._finished = []
+        # URLをキーとした処理中のジョブ（キャンセル済みでもバッチから取り出されるまでは残す）
+        self._active = {}
+        # バッチの待ち行列に入っているURL
+        self._enqueued = set()
+
+    def submit(self, url, options=None, priority=0, enqueue=None):
+        """
+        ジョブを登録する
+
+        Args:
+            url (str): ダウンロードするURL
+            options (dict, optional): ジョブごとのオプション
+            priority (int): 優先度（大きいほど先に実行する）
+            enqueue (callable, optional): URLをバッチの待ち行列に入れる関数
+
+        Returns:
+            tuple: (ジョブの辞書, 新しく作成した場合はTrue)
+                同じURLのジョブが処理中の場合は既存のジョブと False を返す
+        """
+        with self._lock:
+            current = self._active.get(url)
+            if current is not None and current["state"] not in FINISHED_STATES:
+                return dict(current), False
+            job = {
+                "id": uuid.uuid4().hex[:12],
+                "url": url,
+                "state": QUEUED,
+                "options": dict(options or {}),
+                "priority": int(priority),
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "downloaded_bytes": 0,
+                "total_bytes": None,
+                "attempts": 0,
+                "skipped": False,
+                "error": None,
+                "category": None,
+                "cancel_requested": False,
+            }
+            self._jobs[job["id"]] = job
+            self._active[url] = job
+            self.priorities[url] = job["priority"]
+            # キャンセルされたジョブがまだ待ち行列に残っている場合は、その順番で新しいジョブを実行する
+            if url not in self._enqueued:
+                self._enqueued.add(url)
+                if enqueue is not None:
+                    enqueue(url)
+            return dict(job), True
+
+    def get(self, job_id):
+        """ジョブの状態を取得する（存在しない場合はNone）"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        """全てのジョブの状態を投入した順に取得する"""
+        with self._lock:
+            return [dict(job) for job in self._jobs.values()]
+
+    def counts(self):
+        """状態ごとのジョブの数を取得する"""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["state"]] = counts.get(job["state"], 0) + 1
+            return counts
+
+    def cancel(self, job_id):
+        """
+        ジョブをキャンセルする
+        待機中のジョブはすぐにキャンセルし、実行中のジョブは次の進捗通知の時点で中断する
+
+        Args:
+            job_id (str): ジョブのID
+
+        Returns:
+            dict: キャンセル後のジョブの状態（存在しない場合はNone）
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["state"] not in FINISHED_STATES:
+                job["cancel_requested"] = True
+                if job["state"] == QUEUED:
+                    self._finish(job, CANCELLED)
+            return dict(job)
+
+    def cancel_all(self):
+        """
+        完了していない全てのジョブをキャンセルする
+
+        Returns:
+            int: キャンセルしたジョブの数
+        """
+        with self._lock:
+            job_ids = [job["id"] for job in self._jobs.values() if job["state"] not in FINISHED_STATES]
+        for job_id in job_ids:
+            self.cancel(job_id)
+        return len(job_ids)
+
+    def start(self, url):
+        """
+        バッチから取り出したURLのジョブを開始する（ワーカースレッド内で呼ばれる）
+
+        Returns:
+            dict: 実行するジョブ（キャンセル済みの場合はNone）
+        """
+        with self._lock:
+            job = self._active.get(url)
+            if job is None or job["cancel_requested"]:
+                return None
+            job["state"] = EXTRACTING
+            job["attempts"] += 1
+            if job["started_at"] is None:
+                job["started_at"] = time.time()
+            return dict(job)
+
+    def complete(self, result):
+        """
+        バッチの結果をジョブに反映する
+
+        Args:
+            result (BatchResult): ジョブの実行結果
+        """
+        with self._lock:
+            self._enqueued.discard(result.url)
+            job = self._active.pop(result.url, None)
+            self.priorities.pop(result.url, None)
+            if job is None or job["state"] in FINISHED_STATES:
+                return
+            if job["cancel_requested"]:
+                self._finish(job, CANCELLED)
+            elif result.success:
+                job["skipped"] = result.skipped
+                self._finish(job, DONE)
+            else:
+                job["error"] = result.error
+                job["category"] = result.category
+                self._finish(job, FAILED)
+
+    def _finish(self, job, state):
+        """ジョブを完了させ、古い完了済みのジョブを破棄する（ロックを取得した状態で呼ぶ）"""
+        job["state"] = state
+        job["finished_at"] = time.time()
+        self._finished.append(job["id"])
+        while len(self._finished) > self.max_finished:
+            self._jobs.pop(self._finished.pop(0), None)
+
+    def record(self, url, state, reason=None):
+        """
+        処理中のジョブの状態を更新する（JobJournal.record と同じ引数）
+
+        Args:
+            url (str): 対象のURL
+            state (str): 状態 (extracting, downloading, post-processing)
+            reason (str, optional): 使用しない
+        """
+        with self._lock:
+            job = self._active.get(url)
+            if job is not None and job["state"] not in FINISHED_STATES and state not in FINISHED_STATES:
+                job["state"] = state
+
+    def progress_hook(self, url):
+        """
+        yt-dlpの進捗フックからジョブの状態と転送量を更新する関数を作成する
+        ジョブがキャンセルされた場合は例外を送出してyt-dlpの処理を中断させる
+
+        Args:
+            url (str): 対象のURL
+
+        Returns:
+            callable: progress_hooksに渡すフック関数
+        """
+        def hook(d):
+            with self._lock:
+                job = self._active.get(url)
+                if job is None:
+                    return
+                if job["cancel_requested"]:
+                    raise DownloadCancelled(url)
+                if d.get("status") == "downloading":
+                    job["state"] = DOWNLOADING
+                    job["downloaded_bytes"] = d.get("downloaded_bytes") or 0
+                    job["total_bytes"] = d.get("total_bytes") or d.get("total_bytes_estimate")
+                elif d.get("status") == "finished":
+                    job["state"] = POST_PROCESSING
+
+        return hook
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """常駐プロセスのHTTP APIのリクエストハンドラ"""
+
+    server_version = "DataScoop"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method):
+        daemon = self.server.owner
+        if self.headers.get("Authorization") != f"Bearer {daemon.token}":
+            return self._send(401, {"error": "トークンが正しくありません"})
+        parts = [p for p in self.path.split("?")[0].split("/") if p]
+        if not parts or parts[0] != "jobs" or len(parts) > 2:
+            return self._send(404, {"error": f"不明なパスです: {self.path}"})
+        job_id = parts[1] if len(parts) == 2 else None
+
+        if method == "GET" and job_id is None:
+            return self._send(200, {"jobs": daemon.jobs.list(), "counts": daemon.jobs.counts()})
+        if method == "POST" and job_id is None:
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                job, created = daemon.submit(body.get("url"), body.get("options"), body.get("priority", 0))
+            except (ValueError, TypeError, AttributeError) as e:
+                return self._send(400, {"error": str(e)})
+            return self._send(201 if created else 200, job)
+        if method == "GET" and job_id is not None:
+            job = daemon.jobs.get(job_id)
+        elif method == "DELETE" and job_id is not None:
+            job = daemon.jobs.cancel(job_id)
+            if job is not None:
+                logger.info(f"ジョブをキャンセルしました: {job_id} {job['url']}")
+        else:
+            return self._send(405, {"error": f"{method} は使用できません"})
+        if job is None:
+            return self._send(404, {"error": f"ジョブが見つかりません: {job_id}"})
+        return self._send(200, job)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_DELETE(self):
+        self._dispatch("DELETE")
+
+
+class DownloadDaemon:
+    """
+    ジョブをHTTP APIで受け付け、常駐しているBatchDownloaderで処理するクラス
+    プラットフォームごとの同時実行数、再試行、優先度はバッチダウンロードと同じ仕組みで扱う
+
+    使用例:
+        daemon = DownloadDaemon(run_job, jobs=4)
+        daemon.start()
+        daemon.wait()
+        daemon.stop()
+    """
+
+    def __init__(self, run_job, jobs=1, platform_limits=None, retry_policy=None, lanes=False,
+                 host=DEFAULT_HOST, port=DEFAULT_PORT, state_path=None):
+        """
+        コンストラクタ
+
+        Args:
+            run_job (callable): run_job(url, options, journal) で1件のジョブを実行する関数
+                （成功時にTrue、または成功したかどうかを受け取るFutureを返す）
+            jobs (int): 全体の同時実行数
+            platform_limits (dict, optional): プラットフォーム名をキーとした同時実行数の上限
+            retry_policy (RetryPolicy, optional): 一時的なエラーで失敗したジョブを再試行する方針
+            lanes (bool): Trueの場合はプラットフォームごとに専用のワーカーを割り当てる
+            host (str): 待ち受けるアドレス
+            port (int): 待ち受けるポート（0の場合は空いているポート）
+            state_path (str, optional): 接続先とトークンを記録するファイル（省略時は ~/.datascoop/daemon.json）
+        """
+        self.run_job = run_job
+        self.jobs = JobTable()
+        self.token = uuid.uuid4().hex
+        self.state_path = state_path or get_daemon_state_path()
+        self.batch = BatchDownloader(
+            self._download,
+            jobs=jobs,
+            platform_limits=platform_limits,
+            retry_policy=retry_policy,
+            scheduler=PriorityScheduler(self.jobs.priorities),
+            lanes=lanes
+        )
+        self._queue = queue.Queue()
+        self._stopped = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self._server.daemon_threads = True
+        self._server.owner = self
+        self._threads = []
+
+    @property
+    def url(self):
+        """APIのURL"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def submit(self, url, options=None, priority=0):
+        """
+        ジョブを投入する
+
+        Args:
+            url (str): ダウンロードするURL
+            options (dict, optional): ジョブごとのオプション（JOB_OPTIONSのいずれか）
+            priority (int): 優先度（大きいほど先に実行する）
+
+        Returns:
+            tuple: (ジョブの辞書, 新しく作成した場合はTrue)
+
+        Raises:
+            ValueError: URLやオプションが正しくない場合
+        """
+        if not isinstance(url, str) or not url.strip():
+            raise ValueError("URLを指定してください")
+        options = options or {}
+        if not isinstance(options, dict):
+            raise ValueError("オプションはオブジェクトで指定してください")
+        unknown = sorted(set(options) - set(JOB_OPTIONS))
+        if unknown:
+            raise ValueError(f"ジョブごとに指定できないオプションです: {', '.join(unknown)}")
+        if self._stopped.is_set():
+            raise ValueError("常駐プロセスは終了処理中です")
+        job, created = self.jobs.submit(url.strip(), options, priority, enqueue=self._queue.put)
+        if created:
+            logger.info(f"ジョブを受け付けました: {job['id']} {job['url']}")
+        return job, created
+
+    def _urls(self):
+        """投入されたURLを終了するまで1件ずつ返す"""
+        return iter(self._queue.get, None)
+
+    def _download(self, url):
+        """バッチから取り出したジョブを実行する（ワーカースレッド内で呼ばれる）"""
+        job = self.jobs.start(url)
+        if job is None:
+            # 実行前にキャンセルされたジョブは何もしない
+            return True
+        return self.run_job(url, job["options"], self.jobs)
+
+    def _run_batch(self):
+        """ジョブの結果を受け取ってジョブの状態に反映する"""
+        for result in self.batch.run(self._urls()):
+            self.jobs.complete(result)
+            job_state = "スキップ" if result.skipped else ("成功" if result.success else "失敗")
+            logger.info(f"ジョブが完了しました: {job_state}: {result.url} ({result.elapsed:.1f}秒)")
+
+    def _write_state(self):
+        """接続先とトークンを本人のみが読めるファイルに記録する"""
+        state = {"url": self.url, "token": self.token, "pid": os.getpid(), "started_at": time.time()}
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _remove_state(self):
+        """自分が記録した接続先のファイルを削除する"""
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("token") != self.token:
+                    return
+            os.remove(self.state_path)
+        except (OSError, ValueError):
+            pass
+
+    def start(self):
+        """ジョブの処理とHTTP APIの待ち受けを開始する"""
+        for target, name in ((self._run_batch, "datascoop-daemon"), (self._server.serve_forever, "datascoop-api")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self._write_state()
+        logger.info(f"常駐プロセスを開始しました: {self.url} (同時実行数: {self.batch.workers})")
+
+    def wait(self, timeout=None):
+        """
+        stop() が呼ばれるまで待機する
+
+        Returns:
+            bool: 終了した場合はTrue
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        # シグナル（Ctrl+C）を受け取れるよう、短い間隔で待機する
+        while not self._stopped.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._stopped.wait(0.5)
+        return True
+
+    def request_stop(self):
+        """wait() で待機している処理に終了を通知する（シグナルハンドラから呼ばれる）"""
+        self._stopped.set()
+
+    def stop(self):
+        """完了していないジョブをキャンセルし、実行中のジョブの中断を待ってから終了する"""
+        if self._stopped.is_set() and not self._threads:
+            return
+        self._stopped.set()
+        self._remove_state()
+        self._server.shutdown()
+        self._server.server_close()
+        cancelled = self.jobs.cancel_all()
+        if cancelled:
+            logger.info(f"完了していない{cancelled}件のジョブをキャンセルしました")
+        self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        logger.info("常駐プロセスを終了しました")
+
+
+class DaemonClient:
+    """
+    常駐プロセスのHTTP APIのクライアント
+
+    使用例:
+        client = DaemonClient.find()
+        if client is not None:
+            job = client.wait(client.submit(url)["id"])
+    """
+
+    def __init__(self, url, token, timeout=10):
+        """
+        コンストラクタ
+
+        Args:
+            url (str): APIのURL
+            token (str): 認証用のトークン
+            timeout (float): 1回のリクエストのタイムアウト（秒）
+        """
+        self.url = url.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+
+    @classmethod
+    def find(cls, state_path=None):
+        """
+        起動している常駐プロセスに接続するクライアントを作成する
+
+        Args:
+            state_path (str, optional): 接続先を記録したファイル（省略時は ~/.datascoop/daemon.json）
+
+        Returns:
+            DaemonClient: 応答した常駐プロセスのクライアント（起動していない場合はNone）
+        """
+        try:
+            with open(state_path or get_daemon_state_path(), "r", encoding="utf-8") as f:
+                state = json.load(f)
+            client = cls(state["url"], state["token"], timeout=2)
+            client.list()
+        except (OSError, ValueError, KeyError, TypeError, DaemonError) as e:
+            logger.debug(f"常駐プロセスに接続できませんでした: {e}")
+            return None
+        client.timeout = 10
+        return client
+
+    def _request(self, method, path, body=None):
+        """APIを呼び出してJSONの応答を返す"""
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urlrequest.Request(f"{self.url}{path}", data=data, method=method)
+        req.add_header("Authorization", f"Bearer {self.token}")
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except HTTPError as e:
+            try:
+                message = json.loads(e.read()).get("error")
+            except ValueError:
+                message = None
+            raise DaemonError(message or str(e), status=e.code) from e
+        except (URLError, OSError, ValueError) as e:
+            raise DaemonError(f"常駐プロセスと通信できませんでした: {e}") from e
+
+    def submit(self, url, options=None, priority=0):
+        """
+        ジョブを投入する
+
+        Args:
+            url (str): ダウンロードするURL
+            options (dict, optional): ジョブごとのオプション（type, output_dir, quality など）
+            priority (int): 優先度（大きいほど先に実行する）
+
+        Returns:
+            dict: ジョブの状態
+        """
+        return self._request("POST", "/jobs", {"url": url, "options": options or {}, "priority": priority})
+
+    def status(self, job_id):
+        """ジョブの状態を取得する"""
+        return self._request("GET", f"/jobs/{job_id}")
+
+    def cancel(self, job_id):
+        """ジョブをキャンセルする"""
+        return self._request("DELETE", f"/jobs/{job_id}")
+
+    def list(self):
+        """ジョブの一覧を取得する"""
+        return self._request("GET", "/jobs")["jobs"]
+
+    def wait(self, job_id, interval=0.5, callback=None):
+        """
+        ジョブが完了するまで待機する
+
+        Args:
+            job_id (str): ジョブのID
+            interval (float): 状態を確認する間隔（秒）
+            callback (callable, optional): 状態を確認するたびにジョブの状態を受け取る関数
+
+        Returns:
+            dict: 完了したジョブの状態
+        """
+        while True:
+            job = self.status(job_id)
+            if callback is not None:
+                callback(job)
+            if job["state"] in FINISHED_STATES:
+                return job
+            time.sleep(interval)
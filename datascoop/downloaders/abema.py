@@ -3,9 +3,18 @@
 """
 import os
 import re
-import yt_dlp
+import copy
 from .video import VideoDownloader
 from ..utils.helpers import verify_output_directory
+from ..utils.router import classify_url, KIND_SERIES
+from ..utils.cache import cached_extract_info
+from ..utils.archive import DownloadArchive
+
+# 作品のエピソードを同時にダウンロードする数（デフォルト）
+DEFAULT_SERIES_JOBS = 2
+
+# アーカイブが指定されない場合に、シリーズのディレクトリ内に作成するアーカイブのファイル名
+SERIES_ARCHIVE_FILENAME = ".datascoop-archive.txt"
 
 class AbemaDownloader(VideoDownloader):
     """
@@ -13,15 +22,16 @@ class AbemaDownloader(VideoDownloader):
     Abema固有の機能を提供する
     """
     
-    def __init__(self, output_dir="downloads/abema", quality="best"):
+    def __init__(self, output_dir="downloads/abema", quality="best", throughput_profile=None):
         """
         コンストラクタ
         
         Args:
             output_dir (str): ダウンロードした動画の保存先ディレクトリ
             quality (str): ダウンロードする動画の品質
+            throughput_profile (str, optional): 通信量に関するプロファイル
         """
-        super().__init__(output_dir, quality)
+        super().__init__(output_dir, quality, throughput_profile)
         self.logger.info("Abema専用ダウンローダーを初期化しました")
         
     def download(self, url, filename=None, **kwargs):
@@ -35,9 +45,11 @@ class AbemaDownloader(VideoDownloader):
             **kwargs: 追加のパラメータ
                 - format (str): 動画フォーマット
                 - subtitles (bool): 字幕もダウンロードするかどうか
+                - jobs (int): 作品タイトルURLの場合に同時にダウンロードするエピソードの数
+                - archive (DownloadArchive): ダウンロード済みのエピソードを記録するアーカイブ
                 
         Returns:
-            str: ダウンロードした動画ファイルのパス
+            str: ダウンロードした動画ファイルのパス（作品タイトルURLの場合はファイルパスのリスト）
         """
         if not self.validate_url(url):
             return None
@@ -63,92 +75,118 @@ class AbemaDownloader(VideoDownloader):
         Returns:
             bool: 作品タイトルURLの場合はTrue、エピソードURLの場合はFalse
         """
-        # 作品タイトルURLのパターン (例: https://abema.tv/video/title/...)
-        title_pattern = r'https?://(?:www\.)?abema\.tv/video/title/'
-        # エピソードURLのパターン (例: https://abema.tv/video/episode/...)
-        episode_pattern = r'https?://(?:www\.)?abema\.tv/video/episode/'
-        
-        if re.search(title_pattern, url):
-            return True
-        elif re.search(episode_pattern, url):
-            return False
-        else:
-            # その他のAbema URLの場合は標準の処理を使用
-            return False
+        # 作品タイトルURL (例: https://abema.tv/video/title/...) は作品として判定される
+        # エピソードURLやその他のAbema URLの場合は標準の処理を使用
+        route = classify_url(url)
+        return route.platform == 'abema' and route.kind == KIND_SERIES
     
     def _handle_series_url(self, url, filename=None, **kwargs):
         """
         作品タイトルURLの処理
-        シリーズ名のフォルダを作成し、その中に各エピソードをダウンロード
+        シリーズ名のフォルダを作成し、その中に各エピソードをワーカープールで並列にダウンロード
+        アーカイブに記録済みのエピソードは抽出を行わずにスキップする
         
         Args:
             url (str): 作品タイトルURL
             filename (str, optional): 保存するファイル名のベース
             **kwargs: 追加のパラメータ
+                - jobs (int): 同時にダウンロードするエピソードの数
+                - archive (DownloadArchive): ダウンロード済みのエピソードを記録するアーカイブ
+                  （省略時はシリーズのディレクトリ内のアーカイブを使用する）
                 
         Returns:
-            list: ダウンロードした動画ファイルパスのリスト
+            list: ダウンロードした動画ファイルパスのリスト（エピソードの順序）。失敗したエピソードがある場合はNone
         """
         self.logger.info(f"Abema作品タイトルURLを処理します: {url}")
         
-        # yt-dlpでメタデータを取得
-        ydl_opts = {
-            'quiet': True,
-            'skip_download': True,
-        }
-        
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                # シリーズ名を取得
-                series_title = info.get('title', 'abema_series')
-                sanitized_title = self._sanitize_filename(series_title)
-                
-                # シリーズ用のサブディレクトリを作成
-                series_dir = os.path.join(self.output_dir, sanitized_title)
-                verify_output_directory(series_dir)
-                
-                self.logger.info(f"作品タイトル「{series_title}」用のディレクトリを作成しました: {series_dir}")
-                
-                # 各エピソードのダウンロード
-                downloaded_files = []
-                
-                # yt-dlpでのダウンロードオプション設定
-                format_spec = kwargs.get('format', f'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/{self.quality}')
-                download_subtitles = kwargs.get('subtitles', False)
-                
-                output_template = os.path.join(series_dir, '%(title)s.%(ext)s')
-                if filename:
-                    output_template = os.path.join(series_dir, f"{filename}_%(episode_number)s.%(ext)s")
-                    
-                ydl_opts = {
-                    'format': format_spec,
-                    'outtmpl': output_template,
-                    'progress_hooks': [self._progress_hook],
-                }
-                
-                if download_subtitles:
-                    ydl_opts.update({
-                        'writesubtitles': True,
-                        'writeautomaticsub': True,
-                        'subtitleslangs': ['en', 'ja'],
-                        'subtitlesformat': 'srt',
-                    })
+            # 作品のメタデータはフラット抽出で1回だけ取得する（結果はキャッシュされる）
+            info = cached_extract_info(
+                url,
+                {'quiet': True, 'extract_flat': 'in_playlist'},
+                use_cache=kwargs.get('use_cache', True),
+                variant='flat'
+            )
+            
+            # シリーズ名を取得
+            series_title = info.get('title', 'abema_series')
+            sanitized_title = self._sanitize_filename(series_title)
+            
+            # シリーズ用のサブディレクトリを作成
+            series_dir = os.path.join(self.output_dir, sanitized_title)
+            verify_output_directory(series_dir)
+            
+            self.logger.info(f"作品タイトル「{series_title}」用のディレクトリを作成しました: {series_dir}")
+            
+            # yt-dlpでのダウンロードオプション設定
+            format_spec = kwargs.get('format', f'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/{self.quality}')
+            download_subtitles = kwargs.get('subtitles', False)
+            
+            output_template = os.path.join(series_dir, '%(title)s.%(ext)s')
+            if filename:
+                output_template = os.path.join(series_dir, f"{filename}_%(episode_number)s.%(ext)s")
+            
+            archive = kwargs.get('archive')
+            if archive is None:
+                archive = DownloadArchive(os.path.join(series_dir, SERIES_ARCHIVE_FILENAME))
                 
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    result = ydl.download([url])
-                    
-                    # yt-dlpの仕様上、複数エピソードが自動的にダウンロードされる
-                    self.logger.info(f"作品タイトル「{series_title}」のダウンロードが完了しました")
-                    
-                    # 実際にダウンロードされたファイルのパスはログから確認する必要がある
-                    return [series_dir]  # ダウンロード先ディレクトリを返す
+            ydl_opts = {
+                'format': format_spec,
+                'outtmpl': output_template,
+                'progress_hooks': self._build_progress_hooks(kwargs),
+                # ダウンロードしたエピソードはアーカイブに記録される
+                'download_archive': archive,
+            }
+            
+            if download_subtitles:
+                ydl_opts.update({
+                    'writesubtitles': True,
+                    'writeautomaticsub': True,
+                    'subtitleslangs': ['en', 'ja'],
+                    'subtitlesformat': 'srt',
+                })
+            
+            # 取得済みのメタデータを再利用し、作品ページの再抽出を避ける
+            entries = self._playlist_entries(copy.deepcopy(info))
+            
+            pending = [(entry, extra) for entry, extra in entries if not self._is_archived(entry, archive)]
+            skipped = len(entries) - len(pending)
+            if skipped:
+                self.logger.info(f"ダウンロード済みの{skipped}話をスキップします")
+            
+            jobs = kwargs.get('jobs', DEFAULT_SERIES_JOBS)
+            self.logger.info(f"作品タイトル「{series_title}」の{len(pending)}話をダウンロードします (同時実行数: {jobs})")
+            downloaded_files, failed = self._download_entries(pending, ydl_opts, jobs)
+            
+            if failed:
+                self.logger.error(
+                    f"作品タイトル「{series_title}」の{failed}話のダウンロードに失敗しました"
+                    f"（成功した{len(downloaded_files)}話は次回スキップされます）"
+                )
+                return None
+            
+            self.logger.info(f"作品タイトル「{series_title}」のダウンロードが完了しました。{len(downloaded_files)}話をダウンロードしました。")
+            return downloaded_files
                     
         except Exception as e:
             self.logger.error(f"Abema作品タイトルのダウンロード中にエラーが発生しました: {e}")
+            self._record_error(e)
             return None
     
+    def _is_archived(self, entry, archive):
+        """
+        フラット抽出したエピソードがアーカイブに記録済みかどうか確認する（ネットワークにはアクセスしない）
+        
+        Args:
+            entry (dict): フラット抽出したエントリ
+            archive (DownloadArchive): ダウンロード済みのエピソードを記録するアーカイブ
+            
+        Returns:
+            bool: 記録済みの場合はTrue
+        """
+        episode_url = entry.get('url') or entry.get('webpage_url')
+        return bool(episode_url) and archive.contains_url(episode_url)
+    
     def _sanitize_filename(self, filename):
         """ファイル名に使用できない文字を削除する"""
         # ファイルシステムで無効な文字を削除または置換
@@ -2,8 +2,11 @@
 yt-dlpを利用した音声ダウンローダー
 """
 import os
-import yt_dlp
+import shutil
 from .base import BaseDownloader
+from ..utils.progress import get_progress_reporter
+from ..utils.metrics import get_metrics, STAGE_POSTPROCESS
+from ..utils.router import classify_url
 
 class AudioDownloader(BaseDownloader):
     """
@@ -11,7 +14,7 @@ class AudioDownloader(BaseDownloader):
     BaseDownloaderを継承し、yt-dlpを使用して音声をダウンロードする
     """
     
-    def __init__(self, output_dir="downloads/audio", quality="best", audio_format="mp3"):
+    def __init__(self, output_dir="downloads/audio", quality="best", audio_format="mp3", throughput_profile=None):
         """
         コンストラクタ
         
@@ -19,8 +22,9 @@ class AudioDownloader(BaseDownloader):
             output_dir (str): ダウンロードした音声の保存先ディレクトリ
             quality (str): ダウンロードする音声の品質
             audio_format (str): 音声ファイルのフォーマット
+            throughput_profile (str, optional): 通信量に関するプロファイル
         """
-        super().__init__(output_dir)
+        super().__init__(output_dir, throughput_profile)
         self.quality = quality
         self.audio_format = audio_format
         self.logger.info(f"音声ダウンローダーを初期化: 品質={self.quality}, フォーマット={self.audio_format}")
@@ -34,9 +38,12 @@ class AudioDownloader(BaseDownloader):
             filename (str, optional): 保存するファイル名
             **kwargs: 追加のパラメータ
                 - bitrate (str): 音声のビットレート (例: '128K')
+                - progress_hooks (list): 追加の進捗フック
+                - transcode_pool (TranscodePool): 変換を別のプロセスで行うプール
                 
         Returns:
             str: ダウンロードした音声ファイルのパス
+                （transcode_poolを指定した場合は、変換後のパスを受け取るFuture）
         """
         if not self.validate_url(url):
             return None
@@ -45,6 +52,9 @@ class AudioDownloader(BaseDownloader):
         
         # yt-dlpのオプションを設定
         bitrate = kwargs.get('bitrate', '192K')
+        if kwargs.get('transcode_pool') is not None:
+            return self._download_for_transcode(url, filename, bitrate, kwargs)
+        
         output_template = os.path.join(self.output_dir, '%(title)s.%(ext)s')
         if filename:
             output_template = os.path.join(self.output_dir, f"{filename}.{self.audio_format}")
@@ -58,12 +68,12 @@ class AudioDownloader(BaseDownloader):
                 'preferredcodec': self.audio_format,
                 'preferredquality': bitrate,
             }],
-            'progress_hooks': [self._progress_hook],
+            'progress_hooks': self._build_progress_hooks(kwargs),
         }
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
+            with self._open_ydl(ydl_opts) as ydl:
+                info = self._extract_info(ydl, url)
                 # 出力ファイル名の拡張子を変更（yt-dlpがファイル変換後の拡張子を更新するため）
                 downloaded_file = ydl.prepare_filename(info)
                 downloaded_file = os.path.splitext(downloaded_file)[0] + f".{self.audio_format}"
@@ -71,6 +81,45 @@ class AudioDownloader(BaseDownloader):
                 return downloaded_file
         except Exception as e:
             self.logger.error(f"音声のダウンロード中にエラーが発生しました: {e}")
+            self._record_error(e)
+            return None
+            
+    def _download_for_transcode(self, url, filename, bitrate, kwargs):
+        """
+        変換せずに音声をダウンロードし、変換をプロセスプールに登録する
+        ダウンロードしたファイルは一時ディレクトリに置き、変換後に削除する
+        
+        Args:
+            url (str): ダウンロード対象の音声URL
+            filename (str): 保存するファイル名
+            bitrate (str): 音声のビットレート
+            kwargs (dict): downloadメソッドの追加パラメータ
+            
+        Returns:
+            concurrent.futures.Future: 変換後の音声ファイルのパスを受け取るFuture
+        """
+        from ..postprocess import STAGING_DIR
+        
+        staging_dir = os.path.join(self.output_dir, STAGING_DIR)
+        ydl_opts = {
+            'format': 'bestaudio/best',
+            'outtmpl': os.path.join(staging_dir, f"{filename}.%(ext)s" if filename else '%(title)s.%(ext)s'),
+            'noplaylist': True,
+            'progress_hooks': self._build_progress_hooks(kwargs),
+        }
+        
+        try:
+            with self._open_ydl(ydl_opts) as ydl:
+                info = self._extract_info(ydl, url)
+                source_path = self._get_downloaded_filepath(ydl, info)
+            name = filename or os.path.splitext(os.path.basename(source_path))[0]
+            return kwargs['transcode_pool'].submit_audio(
+                source_path, self.output_dir, self.audio_format, bitrate, name, remove_source=True,
+                platform=classify_url(url).platform
+            )
+        except Exception as e:
+            self.logger.error(f"音声のダウンロード中にエラーが発生しました: {e}")
+            self._record_error(e)
             return None
             
     def _progress_hook(self, d):
@@ -80,54 +129,83 @@ class AudioDownloader(BaseDownloader):
         Args:
             d (dict): 進捗情報
         """
-        if d['status'] == 'downloading':
-            percent = d.get('_percent_str', 'N/A')
-            speed = d.get('_speed_str', 'N/A')
-            eta = d.get('_eta_str', 'N/A')
-            self.logger.info(f"ダウンロード進捗: {percent} 速度: {speed} 残り時間: {eta}")
-        elif d['status'] == 'finished':
+        # 進捗は共有の表示に集計し、一定間隔でのみ表示する
+        get_progress_reporter().update(d)
+        if d['status'] == 'finished':
             self.logger.info(f"ダウンロード完了: {d['filename']}")
             self.logger.info("音声変換処理を開始...")
             
-    def extract_audio(self, video_path, output_format="mp3", bitrate="192K"):
+    def extract_audio(self, video_path, output_format=None, bitrate="192K", filename=None, transcode_pool=None):
         """
-        動画ファイルから音声を抽出する
+        ダウンロード済みの動画ファイルから音声を抽出する
+        ネットワークにはアクセスせず、ffmpegでローカルに変換する
         
         Args:
             video_path (str): 音声を抽出する動画ファイルのパス
-            output_format (str): 出力音声のフォーマット
-            bitrate (str): 音声のビットレート
+            output_format (str, optional): 出力音声のフォーマット（省略時はaudio_format）
+            bitrate (str): 音声のビットレート (例: '192K')
+            filename (str, optional): 保存するファイル名（拡張子なし、省略時は動画と同じ名前）
+            transcode_pool (TranscodePool, optional): 変換を別のプロセスで行うプール
             
         Returns:
             str: 抽出した音声ファイルのパス
+                （transcode_poolを指定した場合は、抽出後のパスを受け取るFuture）
         """
-        if not os.path.exists(video_path):
+        if not isinstance(video_path, str) or not os.path.exists(video_path):
             self.logger.error(f"指定されたファイルが見つかりません: {video_path}")
             return None
             
+        output_format = output_format or self.audio_format
+        if transcode_pool is not None:
+            return transcode_pool.submit_audio(video_path, self.output_dir, output_format, bitrate, filename)
         self.logger.info(f"音声抽出開始: {video_path}")
         
-        filename = os.path.splitext(os.path.basename(video_path))[0]
-        output_path = os.path.join(self.output_dir, f"{filename}.{output_format}")
-        
-        ydl_opts = {
-            'outtmpl': os.path.join(self.output_dir, filename),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': output_format,
-                'preferredquality': bitrate,
-            }],
-            'progress_hooks': [self._progress_hook],
-        }
-        
         try:
-            # yt-dlpのFFmpegPostProcessorを使って変換
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # ここではダウンロードではなく、既存ファイルに後処理を適用
-                ydl.download([f"file://{video_path}"])
-                
+            output_path = convert_audio(video_path, self.output_dir, output_format, bitrate, filename)
             self.logger.info(f"音声抽出が完了しました: {output_path}")
             return output_path
         except Exception as e:
             self.logger.error(f"音声抽出中にエラーが発生しました: {e}")
+            self._record_error(e)
             return None
+
+
+def convert_audio(source_path, output_dir, audio_format="mp3", bitrate="192K", filename=None):
+    """
+    メディアファイルから音声を抽出し、指定したディレクトリに保存する
+    yt-dlpのFFmpegExtractAudioPPを直接利用するため、ネットワークにはアクセスしない
+    
+    Args:
+        source_path (str): 変換元のファイルパス
+        output_dir (str): 音声ファイルの保存先ディレクトリ
+        audio_format (str): 出力音声のフォーマット
+        bitrate (str): 音声のビットレート (例: '192K')
+        filename (str, optional): 保存するファイル名（拡張子なし）
+        
+    Returns:
+        str: 変換後の音声ファイルのパス
+        
+    Raises:
+        yt_dlp.utils.PostProcessingError: 変換に失敗した場合
+    """
+    from yt_dlp.postprocessor import FFmpegExtractAudioPP
+    
+    # yt-dlpのCLIと同様に、ビットレートの単位 (K) を取り除く
+    quality = str(bitrate).rstrip('kK') if bitrate else None
+    
+    source_ext = os.path.splitext(source_path)[1].lstrip('.')
+    pp = FFmpegExtractAudioPP(preferredcodec=audio_format, preferredquality=quality)
+    with get_metrics().stage(STAGE_POSTPROCESS):
+        _, info = pp.run({'filepath': source_path, 'ext': source_ext})
+    converted_path = info['filepath']
+    
+    # 変換後のファイルを音声用ディレクトリへ移動する
+    basename = filename or os.path.splitext(os.path.basename(source_path))[0]
+    output_path = os.path.join(output_dir, f"{basename}.{info['ext']}")
+    os.makedirs(output_dir, exist_ok=True)
+    if os.path.abspath(converted_path) == os.path.abspath(source_path):
+        # 既に目的の形式の場合は元ファイルを残してコピーする
+        shutil.copy2(converted_path, output_path)
+    elif os.path.abspath(converted_path) != os.path.abspath(output_path):
+        shutil.move(converted_path, output_path)
+    return output_path
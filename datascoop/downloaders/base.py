@@ -4,6 +4,10 @@
 import os
 import logging
 from abc import ABC, abstractmethod
+from ..utils.config import ConfigManager
+from ..utils.bandwidth import get_bandwidth_scheduler
+from ..utils.retry import record_error
+from ..utils.metrics import get_metrics, postprocessor_hook, STAGE_SETUP, STAGE_DOWNLOAD, STAGE_EXTRACT
 
 class BaseDownloader(ABC):
     """
@@ -11,20 +15,29 @@ class BaseDownloader(ABC):
     全てのダウンローダーはこのクラスを継承する
     """
     
-    def __init__(self, output_dir="downloads"):
+    def __init__(self, output_dir="downloads", throughput_profile=None):
         """
         コンストラクタ
         
         Args:
             output_dir (str): ダウンロードしたファイルの保存先ディレクトリ
+            throughput_profile (str, optional): 通信量に関するプロファイル (conservative, balanced, datacenter)
         """
         self.output_dir = output_dir
-        self._setup_output_dir()
+        self.throughput_profile = throughput_profile
+        # プロファイル未指定の場合はyt-dlpのデフォルト値を使用する
+        self.throughput_options = dict(ConfigManager.THROUGHPUT_PROFILES.get(throughput_profile, {}))
+        # DownloadSessionから取り出された場合に設定される
+        self.session = None
+        # 最後に発生したエラー（再試行するかどうかの判定に使用する）
+        self.last_error = None
         self._setup_logger()
+        self._setup_output_dir()
         
     def _setup_output_dir(self):
         """出力ディレクトリを作成する"""
-        os.makedirs(self.output_dir, exist_ok=True)
+        with get_metrics().stage(STAGE_SETUP, platform="unknown"):
+            os.makedirs(self.output_dir, exist_ok=True)
         self.logger.info(f"出力ディレクトリを設定: {self.output_dir}")
         
     def _setup_logger(self):
@@ -51,6 +64,88 @@ class BaseDownloader(ABC):
         """
         pass
     
+    def _build_progress_hooks(self, kwargs):
+        """
+        yt-dlpに渡す進捗フックのリストを作成する
+        
+        Args:
+            kwargs (dict): downloadメソッドの追加パラメータ
+                - progress_hooks (list): 呼び出し側が追加する進捗フック
+                
+        Returns:
+            list: 自身の進捗フック、帯域制御と計測のフック、追加の進捗フックのリスト
+        """
+        return [
+            self._progress_hook,
+            get_bandwidth_scheduler().progress_hook,
+            get_metrics().progress_hook,
+            *kwargs.get('progress_hooks', []),
+        ]
+    
+    def _extract_info(self, ydl, url, download=True, **kwargs):
+        """
+        yt-dlpで情報を抽出し、所要時間を計測する
+        
+        Args:
+            ydl (yt_dlp.YoutubeDL): 使用するインスタンス
+            url (str): 対象のURL
+            download (bool): ダウンロードも行うかどうか
+            **kwargs: extract_infoに渡す追加の引数
+            
+        Returns:
+            dict: extract_infoの戻り値
+        """
+        with get_metrics().stage(STAGE_DOWNLOAD if download else STAGE_EXTRACT, url=url):
+            return ydl.extract_info(url, download=download, **kwargs)
+    
+    def _get_downloaded_filepath(self, ydl, info):
+        """
+        ダウンロード後の実際のファイルパスを取得する
+        フォーマットの結合や後処理で拡張子が変わった場合も正しいパスを返す
+        
+        Args:
+            ydl (yt_dlp.YoutubeDL): ダウンロードに使用したインスタンス
+            info (dict): extract_infoの戻り値
+            
+        Returns:
+            str: ダウンロードしたファイルのパス
+        """
+        for download in info.get('requested_downloads') or []:
+            if download.get('filepath'):
+                return download['filepath']
+        return ydl.prepare_filename(info)
+    
+    def _record_error(self, error):
+        """
+        ダウンロードのエラーを記録する
+        ダウンロードメソッドは失敗時にNoneを返すため、呼び出し側はlast_errorで原因を確認する
+        
+        Args:
+            error (Exception): 発生した例外
+        """
+        self.last_error = error
+        record_error(error)
+    
+    def _open_ydl(self, ydl_opts):
+        """
+        yt-dlpのインスタンスを取得する
+        セッションに紐付いている場合はプールされたインスタンスを再利用する
+        
+        Args:
+            ydl_opts (dict): yt-dlpのオプション
+            
+        Returns:
+            contextmanager: with文で使用するyt_dlp.YoutubeDLのインスタンス
+        """
+        # 進捗はProgressReporterがまとめて表示するため、yt-dlp自身の進捗表示は無効にする
+        # 断片の同時取得数などはプロファイルの値を使用し、個別に指定されたオプションを優先する
+        # 後処理（ffmpeg）の所要時間は計測のフックで記録する
+        ydl_opts = {'noprogress': True, 'postprocessor_hooks': [postprocessor_hook], **self.throughput_options, **ydl_opts}
+        if self.session is not None:
+            return self.session.acquire_ydl(ydl_opts)
+        import yt_dlp
+        return yt_dlp.YoutubeDL(ydl_opts)
+    
     def validate_url(self, url):
         """
         URLが有効かどうか検証する
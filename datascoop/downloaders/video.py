@@ -2,8 +2,50 @@
 yt-dlpを利用した動画ダウンローダー
 """
 import os
-import yt_dlp
+import itertools
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from .base import BaseDownloader
+from ..utils.cache import cached_extract_info, get_metadata_cache
+from ..utils.progress import get_progress_reporter
+from ..utils.metrics import get_metrics, STAGE_DOWNLOAD, STAGE_EXTRACT
+
+# yt-dlpが出力テンプレートの%(playlist_index)sをゼロ埋めする桁数を決めるために参照する項目
+# yt-dlpの内部の項目（公開されていない）であり、datascoopでこの名前を使用するのはplaylist_extra_infoのみとする
+# yt-dlp 2026.08.19 で確認済み。名前が変わった場合はtests/test_playlist.pyのテストで検出する
+LAST_PLAYLIST_INDEX_KEY = '__last_playlist_index'
+
+def playlist_extra_info(info, n_entries=None, last_index=0):
+    """
+    プレイリスト内の動画に付加する情報を作成する
+    yt-dlpがプレイリストを順に処理する際に付加するもの（playlist_titleなど）と同じ項目を、
+    抽出結果の公開されている項目から作成する（ゼロ埋めの桁数のみLAST_PLAYLIST_INDEX_KEYに依存する）
+    
+    Args:
+        info (dict): プレイリストの抽出結果
+        n_entries (int, optional): 処理する動画数
+        last_index (int): 最後に処理するplaylist_index（出力テンプレートのゼロ埋めの桁数に使用される）
+        
+    Returns:
+        dict: 各動画の追加情報に共通する項目
+    """
+    extra_info = {
+        'playlist_count': info.get('playlist_count'),
+        'playlist': info.get('title') or info.get('id'),
+        'playlist_id': info.get('id'),
+        'playlist_title': info.get('title'),
+        'playlist_uploader': info.get('uploader'),
+        'playlist_uploader_id': info.get('uploader_id'),
+        'playlist_channel': info.get('channel'),
+        'playlist_channel_id': info.get('channel_id'),
+        'playlist_webpage_url': info.get('webpage_url'),
+        'n_entries': n_entries,
+        'extractor': info.get('extractor'),
+        'extractor_key': info.get('extractor_key'),
+        LAST_PLAYLIST_INDEX_KEY: last_index,
+    }
+    if info.get('webpage_url'):
+        extra_info['webpage_url'] = info['webpage_url']
+    return extra_info
 
 class VideoDownloader(BaseDownloader):
     """
@@ -11,15 +53,16 @@ class VideoDownloader(BaseDownloader):
     BaseDownloaderを継承し、yt-dlpを使用して動画をダウンロードする
     """
     
-    def __init__(self, output_dir="downloads/videos", quality="best"):
+    def __init__(self, output_dir="downloads/videos", quality="best", throughput_profile=None):
         """
         コンストラクタ
         
         Args:
             output_dir (str): ダウンロードした動画の保存先ディレクトリ
             quality (str): ダウンロードする動画の品質
+            throughput_profile (str, optional): 通信量に関するプロファイル
         """
-        super().__init__(output_dir)
+        super().__init__(output_dir, throughput_profile)
         self.quality = quality
         self.logger.info(f"動画ダウンローダーを初期化: 品質={self.quality}")
         
@@ -33,6 +76,7 @@ class VideoDownloader(BaseDownloader):
             **kwargs: 追加のパラメータ
                 - format (str): 動画フォーマット
                 - subtitles (bool): 字幕もダウンロードするかどうか
+                - progress_hooks (list): 追加の進捗フック
                 
         Returns:
             str: ダウンロードした動画ファイルのパス
@@ -54,7 +98,7 @@ class VideoDownloader(BaseDownloader):
             'format': format_spec,
             'outtmpl': output_template,
             'noplaylist': True,
-            'progress_hooks': [self._progress_hook],
+            'progress_hooks': self._build_progress_hooks(kwargs),
         }
         
         if download_subtitles:
@@ -66,15 +110,157 @@ class VideoDownloader(BaseDownloader):
             })
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                downloaded_file = ydl.prepare_filename(info)
+            with self._open_ydl(ydl_opts) as ydl:
+                info = self._extract_info(ydl, url)
+                downloaded_file = self._get_downloaded_filepath(ydl, info)
                 self.logger.info(f"動画のダウンロードが完了しました: {downloaded_file}")
                 return downloaded_file
         except Exception as e:
             self.logger.error(f"動画のダウンロード中にエラーが発生しました: {e}")
+            self._record_error(e)
             return None
             
+    def _playlist_entries(self, info, start_at=1):
+        """
+        フラット抽出したプレイリストから、動画ごとのエントリと追加情報の組を作成する
+        追加情報はyt-dlpがプレイリストを順に処理する場合と同じもの（playlist_indexなど）
+        
+        Args:
+            info (dict): フラット抽出したプレイリストの情報
+            start_at (int): プレイリスト内の開始位置
+            
+        Returns:
+            list: (エントリ, 追加情報) のリスト
+        """
+        if info.get('_type') not in ('playlist', 'multi_video'):
+            # 単一の動画の場合はそのままダウンロードする
+            return [({'_type': 'url', 'url': info.get('webpage_url') or info.get('url')}, {'playlist_index': 1})]
+        
+        entries = list(info.get('entries') or [])
+        indices = info.get('requested_entries') or range(start_at, start_at + len(entries))
+        pairs = [(index, entry) for index, entry in zip(indices, entries) if entry]
+        
+        # playlist_indexの桁数は最後の番号に合わせてゼロ埋めされる
+        common_info = playlist_extra_info(info, len(entries), max((index for index, _ in pairs), default=0))
+        
+        return [
+            (entry, {**common_info, 'playlist_index': index, 'playlist_autonumber': number})
+            for number, (index, entry) in enumerate(pairs, 1)
+        ]
+    
+    def _iter_playlist_entries(self, info, start_at=1, end_at=None):
+        """
+        遅延抽出（process=False）したプレイリストのエントリを1件ずつ取り出し、追加情報と組にして返す
+        取り出したエントリは保持しないため、プレイリストの長さに関わらずメモリ使用量は一定になる
+        playlist_indexのゼロ埋めの桁数は、yt-dlpと同じく最後に処理する番号（動画数と終了位置の小さい方）から決める
+        動画数が分からない場合（チャンネルのタブなど）は、桁数を決めるために先にフラット抽出のエントリをすべて取り出す
+        
+        Args:
+            info (dict): process=Falseで抽出したプレイリストの情報
+            start_at (int): プレイリスト内の開始位置
+            end_at (int, optional): プレイリスト内の終了位置（この位置の動画を含む）
+            
+        Yields:
+            tuple: (エントリ, 追加情報)
+        """
+        if info.get('_type') not in ('playlist', 'multi_video'):
+            yield from self._playlist_entries(info, start_at)
+            return
+        
+        entries = itertools.islice(info.get('entries') or [], start_at - 1, end_at)
+        count = info.get('playlist_count')
+        if count:
+            last_index = min(count, end_at) if end_at else count
+        else:
+            # 最後の番号が分からないまま処理すると、ゼロ埋めされないファイル名になる
+            entries = list(entries)
+            last_index = start_at - 1 + len(entries)
+        common_info = playlist_extra_info(info, max(last_index - start_at + 1, 0), last_index)
+        
+        number = 0
+        for index, entry in enumerate(entries, start_at):
+            if not entry:
+                continue
+            number += 1
+            yield entry, {**common_info, 'playlist_index': index, 'playlist_autonumber': number}
+    
+    def _download_playlist_entry(self, entry, extra_info, ydl_opts):
+        """
+        プレイリスト内の1つの動画をダウンロードする（ワーカースレッド内で呼ばれる）
+        
+        Args:
+            entry (dict): フラット抽出したエントリ
+            extra_info (dict): playlist_indexなどの追加情報
+            ydl_opts (dict): yt-dlpのオプション
+            
+        Returns:
+            str: ダウンロードした動画ファイルのパス。スキップした場合はNone、失敗した場合はFalse
+        """
+        try:
+            with self._open_ydl(ydl_opts) as ydl:
+                with get_metrics().stage(STAGE_DOWNLOAD, url=entry.get('url')):
+                    result = ydl.process_ie_result(dict(entry), download=True, extra_info=extra_info)
+                if not result:
+                    return None
+                return self._get_downloaded_filepath(ydl, result)
+        except Exception as e:
+            self.logger.error(f"プレイリスト内の動画 ({extra_info['playlist_index']}) のダウンロード中にエラーが発生しました: {e}")
+            self._record_error(e)
+            return False
+            
+    def _download_entries(self, entries, ydl_opts, jobs):
+        """
+        フラット抽出したエントリをワーカープールで並列にダウンロードする
+        ワーカーごとにyt-dlpのインスタンスが必要なため、セッションがなければ一時的に作成する
+        エントリは同時実行数の2倍までしか先に取り出さず、完了したエントリはファイルパスのみを残して破棄する
+        
+        Args:
+            entries (iterable): (エントリ, 追加情報) のリストまたはイテレータ
+            ydl_opts (dict): yt-dlpのオプション
+            jobs (int): 同時にダウンロードする数
+            
+        Returns:
+            tuple: (ダウンロードしたファイルパスのリスト（playlist_indexの順序）, 失敗した数)
+        """
+        owns_session = self.session is None
+        if owns_session:
+            from ..session import DownloadSession
+            self.session = DownloadSession()
+        
+        jobs = max(1, int(jobs))
+        results = {}
+        failed = 0
+        futures = {}
+        
+        def collect(done):
+            """完了したダウンロードの結果を記録する"""
+            failures = 0
+            for future in done:
+                index = futures.pop(future)
+                video_file = future.result()
+                if video_file:
+                    results[index] = video_file
+                    self.logger.info(f"プレイリスト内の動画をダウンロードしました: {video_file}")
+                elif video_file is False:
+                    failures += 1
+            return failures
+        
+        try:
+            with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="datascoop-playlist") as executor:
+                for entry, extra_info in entries:
+                    if len(futures) >= jobs * 2:
+                        failed += collect(wait(futures, return_when=FIRST_COMPLETED).done)
+                    future = executor.submit(self._download_playlist_entry, entry, extra_info, ydl_opts)
+                    futures[future] = extra_info['playlist_index']
+                failed += collect(wait(futures).done)
+        finally:
+            if owns_session:
+                self.session.close()
+                self.session = None
+        
+        # 完了順ではなくプレイリストの順序で返す
+        return [results[index] for index in sorted(results)], failed
+    
     def _progress_hook(self, d):
         """
         ダウンロード進捗を表示するフック関数
@@ -82,21 +268,19 @@ class VideoDownloader(BaseDownloader):
         Args:
             d (dict): 進捗情報
         """
-        if d['status'] == 'downloading':
-            percent = d.get('_percent_str', 'N/A')
-            speed = d.get('_speed_str', 'N/A')
-            eta = d.get('_eta_str', 'N/A')
-            self.logger.info(f"ダウンロード進捗: {percent} 速度: {speed} 残り時間: {eta}")
-        elif d['status'] == 'finished':
+        # 進捗は共有の表示に集計し、一定間隔でのみ表示する
+        get_progress_reporter().update(d)
+        if d['status'] == 'finished':
             self.logger.info(f"ダウンロード完了: {d['filename']}")
             self.logger.info("後処理を開始...")
             
-    def get_video_info(self, url):
+    def get_video_info(self, url, use_cache=True):
         """
         動画の情報を取得する
         
         Args:
             url (str): 情報を取得する動画のURL
+            use_cache (bool): メタデータキャッシュを使用するかどうか
             
         Returns:
             dict: 動画情報
@@ -107,14 +291,73 @@ class VideoDownloader(BaseDownloader):
         self.logger.info(f"動画情報の取得: {url}")
         
         ydl_opts = {
+            'quiet': True,
             'noplaylist': True,
             'skip_download': True,
         }
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                return info
+            return cached_extract_info(url, ydl_opts, use_cache=use_cache)
         except Exception as e:
             self.logger.error(f"動画情報の取得中にエラーが発生しました: {e}")
+            self._record_error(e)
+            return None
+    
+    def extract_metadata(self, url, subtitles=False, thumbnails=False, use_cache=True, **kwargs):
+        """
+        動画を転送せずにメタデータのみを取得する
+        字幕やサムネイルを指定した場合は、動画の代わりにそれらのファイルのみを出力ディレクトリに保存する
+        プレイリストのURLの場合は、各動画のメタデータを含むプレイリストの情報を返す
+        
+        Args:
+            url (str): 対象のURL
+            subtitles (bool): 字幕も保存するかどうか
+            thumbnails (bool): サムネイルも保存するかどうか
+            use_cache (bool): メタデータキャッシュを使用するかどうか（ファイルを保存しない場合のみ読み込む）
+            **kwargs: 追加のパラメータ
+                - progress_hooks (list): 追加の進捗フック
+                
+        Returns:
+            dict: JSONに変換可能なメタデータ
+        """
+        if not self.validate_url(url):
+            return None
+        
+        write_files = subtitles or thumbnails
+        cache = get_metadata_cache()
+        if use_cache and not write_files:
+            info = cache.get(url)
+            if info is not None:
+                return info
+        
+        ydl_opts = {
+            'outtmpl': os.path.join(self.output_dir, '%(title)s.%(ext)s'),
+            'quiet': True,
+            'noplaylist': True,
+            'skip_download': True,
+            # フォーマットを取得できない動画（DRMなど）もメタデータは記録する
+            'ignore_no_formats_error': True,
+            'progress_hooks': self._build_progress_hooks(kwargs),
+        }
+        if subtitles:
+            ydl_opts.update({
+                'writesubtitles': True,
+                'writeautomaticsub': True,
+                'subtitleslangs': ['en', 'ja'],
+                'subtitlesformat': 'srt',
+            })
+        if thumbnails:
+            ydl_opts['writethumbnail'] = True
+        
+        try:
+            with self._open_ydl(ydl_opts) as ydl:
+                # skip_downloadを指定しているため、download=Trueでも字幕とサムネイルのみを保存する
+                with get_metrics().stage(STAGE_EXTRACT, url=url):
+                    info = ydl.sanitize_info(ydl.extract_info(url, download=write_files))
+            if info.get('_type') not in ('playlist', 'multi_video'):
+                cache.set(url, info)
+            return info
+        except Exception as e:
+            self.logger.error(f"メタデータの取得中にエラーが発生しました: {e}")
+            self._record_error(e)
             return None
@@ -2,7 +2,85 @@
 プラットフォーム固有のダウンローダー - YouTube
 """
 import os
+from collections import deque
 from .video import VideoDownloader
+from ..utils.router import YOUTUBE_CHANNEL_RE
+from ..utils.sync_state import is_known_entry
+
+# プレイリスト内の動画を同時にダウンロードする数（デフォルト）
+DEFAULT_PLAYLIST_JOBS = 4
+
+def channel_videos_url(channel_url):
+    """
+    チャンネルのURLを動画タブのURLに変換する
+    チャンネルのトップページは複数のタブを含むため、新しい順に並ぶ動画タブを使用する
+    
+    Args:
+        channel_url (str): チャンネルのURL
+        
+    Returns:
+        str: 動画タブのURL（タブが指定されている場合はそのまま）
+    """
+    match = YOUTUBE_CHANNEL_RE.search(channel_url)
+    if match is None:
+        return channel_url
+    rest = channel_url[match.end():]
+    if rest.strip('/') and not rest.startswith(('?', '#')):
+        return channel_url
+    return channel_url[:match.end()] + '/videos'
+
+def new_channel_entries(entries, mark, max_videos=None):
+    """
+    新しい順に並んだエントリから、同期済みの動画より新しいものを取り出す
+    同期済みの動画に到達した時点で打ち切るため、残りのエントリ（ページ）は取得されない
+    
+    Args:
+        entries (iterable): フラット抽出したエントリ（新しい順）
+        mark (dict): チャンネルのハイウォーターマーク（未同期の場合はNone）
+        max_videos (int, optional): 取り出す最大数
+        
+    Yields:
+        dict: 新しい動画のエントリ
+    """
+    if max_videos is not None and max_videos <= 0:
+        return
+    count = 0
+    for entry in entries:
+        if not entry:
+            continue
+        if is_known_entry(entry, mark):
+            return
+        yield entry
+        count += 1
+        # 上限に達したら次のエントリを取得する前に打ち切る
+        if max_videos and count >= max_videos:
+            return
+
+def pending_channel_entries(entries, mark, max_videos=None):
+    """
+    同期で今回ダウンロードするエントリを取り出す
+    同期済みのチャンネルで新しい動画が上限より多い場合は、古い順に上限の数だけ取り出す
+    （ハイウォーターマークは取り出した中で最新の動画まで進むため、残りは次回の同期で取り出される）
+    初回の同期では最新の動画から上限の数だけ取り出し、それより前の動画は同期の対象にしない
+    
+    Args:
+        entries (iterable): フラット抽出したエントリ（新しい順）
+        mark (dict): チャンネルのハイウォーターマーク（未同期の場合はNone）
+        max_videos (int, optional): 取り出す最大数
+        
+    Returns:
+        tuple: (取り出したエントリのリスト（新しい順）, 次回以降に残した新しい動画の数)
+    """
+    if not mark or not max_videos or max_videos <= 0:
+        return list(new_channel_entries(entries, mark, max_videos)), 0
+    # 同期済みの動画までを列挙し、最も古いmax_videos件のみを保持する
+    oldest = deque(maxlen=max_videos)
+    remaining = 0
+    for entry in new_channel_entries(entries, mark):
+        if len(oldest) == max_videos:
+            remaining += 1
+        oldest.append(entry)
+    return list(oldest), remaining
 
 class YouTubeDownloader(VideoDownloader):
     """
@@ -10,44 +88,47 @@ class YouTubeDownloader(VideoDownloader):
     特定のYouTube固有の機能を提供する
     """
     
-    def __init__(self, output_dir="downloads/youtube", quality="best"):
+    def __init__(self, output_dir="downloads/youtube", quality="best", throughput_profile=None):
         """
         コンストラクタ
         
         Args:
             output_dir (str): ダウンロードした動画の保存先ディレクトリ
             quality (str): ダウンロードする動画の品質
+            throughput_profile (str, optional): 通信量に関するプロファイル
         """
-        super().__init__(output_dir, quality)
+        super().__init__(output_dir, quality, throughput_profile)
         self.logger.info("YouTube専用ダウンローダーを初期化しました")
         
-    def download_playlist(self, playlist_url, max_videos=None, start_at=1, **kwargs):
+    def download_playlist(self, playlist_url, max_videos=None, start_at=1, jobs=DEFAULT_PLAYLIST_JOBS, **kwargs):
         """
         YouTubeプレイリストをダウンロードする
+        プレイリストの動画一覧をフラット抽出で少しずつ取得し、各動画をワーカープールで並列にダウンロードする
+        動画一覧と各動画の情報はダウンロードの完了後に破棄するため、長いプレイリストでもメモリ使用量は一定
         
         Args:
             playlist_url (str): プレイリストのURL
             max_videos (int, optional): ダウンロードする最大動画数
             start_at (int): プレイリスト内の何番目の動画からダウンロードを開始するか
+            jobs (int): 同時にダウンロードする動画の数
             **kwargs: その他のダウンロードオプション
+                - archive (DownloadArchive or str): ダウンロード済みの動画をスキップするためのアーカイブ
             
         Returns:
-            list: ダウンロードした動画ファイルパスのリスト
+            list: ダウンロードした動画ファイルパスのリスト（プレイリストの順序）
         """
         if not self.validate_url(playlist_url):
             return []
             
         self.logger.info(f"YouTubeプレイリストのダウンロードを開始: {playlist_url}")
         
-        # プレイリスト用のオプションを設定
+        # プレイリスト用のオプションを設定（動画一覧はページごとに遅延して取得する）
         playlist_opts = {
             'extract_flat': 'in_playlist',
-            'playliststart': start_at,
+            'lazy_playlist': True,
             'noplaylist': False,  # プレイリストを処理する
         }
-        
-        if max_videos:
-            playlist_opts['playlistend'] = start_at + max_videos - 1
+        end_at = start_at + max_videos - 1 if max_videos else None
             
         # 基本オプションとマージ
         format_spec = kwargs.get('format', f'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/{self.quality}')
@@ -59,13 +140,10 @@ class YouTubeDownloader(VideoDownloader):
             '%(playlist_index)s-%(title)s.%(ext)s'
         )
             
-        import yt_dlp
-        
         ydl_opts = {
             'format': format_spec,
             'outtmpl': output_template,
-            'progress_hooks': [self._progress_hook],
-            **playlist_opts
+            'progress_hooks': self._build_progress_hooks(kwargs),
         }
         
         if subtitles:
@@ -75,39 +153,133 @@ class YouTubeDownloader(VideoDownloader):
                 'subtitleslangs': ['en', 'ja'],
                 'subtitlesformat': 'srt',
             })
+            
+        # アーカイブ済みの動画は個別の抽出を行わずにスキップされる
+        if kwargs.get('archive') is not None:
+            ydl_opts['download_archive'] = kwargs['archive']
         
         downloaded_files = []
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(playlist_url, download=True)
-                
-                if 'entries' in info:
-                    for entry in info['entries']:
-                        if entry:
-                            video_file = ydl.prepare_filename(entry)
-                            downloaded_files.append(video_file)
-                            self.logger.info(f"プレイリスト内の動画をダウンロードしました: {video_file}")
+            # process=Falseで抽出すると、動画一覧のページはダウンロードの進行に合わせて取得される
+            # 次のページの取得に同じインスタンスを使用するため、ダウンロードが終わるまで返却しない
+            with self._open_ydl(playlist_opts) as ydl:
+                info = self._extract_info(ydl, playlist_url, download=False, process=False)
+                while info.get('_type') in ('url', 'url_transparent'):
+                    info = self._extract_info(ydl, info['url'], download=False, process=False)
+                entries = self._iter_playlist_entries(info, start_at, end_at)
                 
-                self.logger.info(f"プレイリストのダウンロードが完了しました。{len(downloaded_files)}個の動画をダウンロードしました。")
-                return downloaded_files
+                self.logger.info(f"プレイリストの動画を順にダウンロードします (同時実行数: {jobs})")
+                downloaded_files, _ = self._download_entries(entries, ydl_opts, jobs)
+            self.logger.info(f"プレイリストのダウンロードが完了しました。{len(downloaded_files)}個の動画をダウンロードしました。")
+            return downloaded_files
         except Exception as e:
             self.logger.error(f"プレイリストのダウンロード中にエラーが発生しました: {e}")
+            self._record_error(e)
             return downloaded_files
-            
-    def download_channel(self, channel_url, max_videos=None, **kwargs):
+    
+    def download_channel(self, channel_url, max_videos=None, sync_state=None, **kwargs):
         """
         YouTubeチャンネルの動画をダウンロードする
         
         Args:
             channel_url (str): チャンネルのURL
             max_videos (int, optional): ダウンロードする最大動画数
+            sync_state (ChannelSyncState, optional): 指定した場合は前回の同期以降の動画のみをダウンロードする
             **kwargs: その他のダウンロードオプション
             
         Returns:
             list: ダウンロードした動画ファイルパスのリスト
         """
+        if sync_state is not None:
+            return self.sync_channel(channel_url, sync_state, max_videos=max_videos, **kwargs)
         # チャンネルのダウンロードはプレイリストのダウンロードと同様に処理できる
         return self.download_playlist(channel_url, max_videos, **kwargs)
+    
+    def sync_channel(self, channel_url, sync_state, max_videos=None, jobs=DEFAULT_PLAYLIST_JOBS, **kwargs):
+        """
+        チャンネルの新しい動画のみをダウンロードする（差分同期）
+        動画一覧を新しい順に少しずつ取得し、同期済みの動画に到達した時点で列挙を打ち切る
+        すべての新しい動画のダウンロードに成功した場合のみ、ハイウォーターマークを更新する
+        新しい動画がmax_videosより多い場合は古い順にダウンロードし、残りは次回の同期でダウンロードする
+        
+        Args:
+            channel_url (str): チャンネルのURL
+            sync_state (ChannelSyncState): チャンネルごとの同期の状態
+            max_videos (int, optional): 1回の同期でダウンロードする最大動画数
+            jobs (int): 同時にダウンロードする動画の数
+            **kwargs: その他のダウンロードオプション
+                - archive (DownloadArchive or str): ダウンロード済みの動画をスキップするためのアーカイブ
+            
+        Returns:
+            list: ダウンロードした動画ファイルパスのリスト（新しい順）。失敗した動画がある場合はNone
+        """
+        if not self.validate_url(channel_url):
+            return None
+        
+        videos_url = channel_videos_url(channel_url)
+        mark = sync_state.get(videos_url)
+        if mark:
+            self.logger.info(f"チャンネルの差分同期を開始: {videos_url} (同期済みの最新の動画: {mark.get('video_id')})")
+        else:
+            self.logger.info(f"チャンネルの初回の同期を開始: {videos_url}")
+        
+        # 投稿日はダウンロードした動画の情報から取得する
+        upload_dates = {}
+        
+        def record_upload_date(d):
+            info = d.get('info_dict') or {}
+            if d.get('status') == 'finished' and info.get('id'):
+                upload_dates[info['id']] = info.get('upload_date')
+        
+        ydl_opts = {
+            'format': kwargs.get('format', f'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/{self.quality}'),
+            'outtmpl': os.path.join(self.output_dir, '%(playlist_title)s', '%(upload_date)s-%(title)s [%(id)s].%(ext)s'),
+            'progress_hooks': [*self._build_progress_hooks(kwargs), record_upload_date],
+        }
+        if kwargs.get('subtitles', False):
+            ydl_opts.update({
+                'writesubtitles': True,
+                'writeautomaticsub': True,
+                'subtitleslangs': ['en', 'ja'],
+                'subtitlesformat': 'srt',
+            })
+        if kwargs.get('archive') is not None:
+            ydl_opts['download_archive'] = kwargs['archive']
+        
+        try:
+            # process=Falseで抽出すると、動画一覧のページは列挙した分だけ取得される
+            with self._open_ydl({'extract_flat': 'in_playlist', 'lazy_playlist': True}) as ydl:
+                info = self._extract_info(ydl, videos_url, download=False, process=False)
+                while info.get('_type') in ('url', 'url_transparent'):
+                    info = self._extract_info(ydl, info['url'], download=False, process=False)
+                new_entries, remaining = pending_channel_entries(info.get('entries') or [], mark, max_videos)
+                
+                info['entries'] = new_entries
+                info.pop('requested_entries', None)
+                entries = self._playlist_entries(info) if new_entries else []
+            
+            if not entries:
+                self.logger.info(f"新しい動画はありません: {videos_url}")
+                sync_state.update(videos_url, [])
+                return []
+            
+            self.logger.info(f"{len(entries)}個の新しい動画をダウンロードします (同時実行数: {jobs})")
+            if remaining:
+                self.logger.info(f"残りの{remaining}個の新しい動画は次回の同期でダウンロードします")
+            downloaded_files, failed = self._download_entries(entries, ydl_opts, jobs)
+            if failed:
+                self.logger.error(f"{failed}個の動画のダウンロードに失敗したため、同期の状態を更新しません")
+                return None
+            
+            # ハイウォーターマークはダウンロードした中で最新の動画まで進める
+            new_ids = [entry.get('id') for entry in new_entries if entry.get('id')]
+            sync_state.update(videos_url, new_ids, upload_dates.get(new_ids[0]) if new_ids else None)
+            self.logger.info(f"チャンネルの同期が完了しました。{len(downloaded_files)}個の動画をダウンロードしました。")
+            return downloaded_files
+        except Exception as e:
+            self.logger.error(f"チャンネルの同期中にエラーが発生しました: {e}")
+            self._record_error(e)
+            return None
         
     def download_with_chapters(self, url, filename=None, **kwargs):
         """
@@ -133,22 +305,20 @@ class YouTubeDownloader(VideoDownloader):
         if filename:
             output_template = os.path.join(self.output_dir, f"{filename}.%(ext)s")
             
-        import yt_dlp
-        
         ydl_opts = {
             'format': format_spec,
             'outtmpl': output_template,
             'noplaylist': True,
-            'progress_hooks': [self._progress_hook],
+            'progress_hooks': self._build_progress_hooks(kwargs),
             'writeinfojson': True,  # メタデータをJSONとして保存
             'writeannotations': True,  # アノテーション（チャプター情報など）を保存
             'writethumbnail': True,  # サムネイルを保存
         }
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                downloaded_file = ydl.prepare_filename(info)
+            with self._open_ydl(ydl_opts) as ydl:
+                info = self._extract_info(ydl, url)
+                downloaded_file = self._get_downloaded_filepath(ydl, info)
                 
                 # チャプター情報を表示
                 if 'chapters' in info and info['chapters']:
@@ -164,6 +334,7 @@ class YouTubeDownloader(VideoDownloader):
                 return downloaded_file
         except Exception as e:
             self.logger.error(f"動画のダウンロード中にエラーが発生しました: {e}")
+            self._record_error(e)
             return None
     
     def _format_time(self, seconds):
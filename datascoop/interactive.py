@@ -5,11 +5,12 @@
 import os
 import sys
 import logging
-import tkinter as tk
-from tkinter import filedialog
+from contextlib import ExitStack
 from .utils.config import ConfigManager
-from .downloaders import VideoDownloader, AudioDownloader, YouTubeDownloader, AbemaDownloader
-from .utils.helpers import setup_logger, get_platform_from_url, get_platform_specific_output_dir, verify_output_directory
+from .utils.helpers import setup_logger, get_platform_specific_output_dir, verify_output_directory
+from .utils import journal as job_journal
+from .utils.progress import configure_progress
+from .utils.bandwidth import configure_bandwidth, get_shared_state_path, parse_rate
 
 logger = setup_logger()
 
@@ -22,6 +23,9 @@ class InteractiveDownloader:
         """初期化"""
         self.config_manager = ConfigManager()
         self.first_run = not self.config_manager.load_config()
+        # 中断されたダウンロードを再開するためのジャーナル
+        self.journal_path = os.path.join(self.config_manager.config_dir, "journal", "interactive.jsonl")
+        self.resume_journal = False
         
     def start(self):
         """対話セッションを開始"""
@@ -47,8 +51,10 @@ class InteractiveDownloader:
             )
             self.config_manager.set("use_original_title", self.use_original_title)
         
-        # URLの取得
-        urls = self._get_download_urls()
+        # URLの取得（前回中断されたダウンロードがあれば再開を提案する）
+        urls = self._get_resumable_urls()
+        if not urls:
+            urls = self._get_download_urls()
         if not urls:
             print("ダウンロードするURLが指定されていません。終了します。")
             return
@@ -259,6 +265,10 @@ class InteractiveDownloader:
     def _select_directory_gui(self):
         """GUIでディレクトリを選択する"""
         try:
+            # tkinterはGUIを使用する時のみ読み込む
+            import tkinter as tk
+            from tkinter import filedialog
+            
             # GUIウィンドウを非表示にする
             root = tk.Tk()
             root.withdraw()
@@ -408,20 +418,55 @@ class InteractiveDownloader:
             print(f"\n{len(urls)}個のURLを受け付けました。ダウンロードを開始します...")
         return urls
         
+    def _get_resumable_urls(self):
+        """前回のセッションで完了しなかったURLを取得する"""
+        if not os.path.exists(self.journal_path):
+            return []
+            
+        with job_journal.JobJournal(self.journal_path, resume=True) as journal:
+            unfinished = journal.unfinished()
+            
+        if not unfinished:
+            return []
+            
+        print(f"\n前回のセッションで完了していないダウンロードが{len(unfinished)}件あります。")
+        if self._ask_yes_no("これらのダウンロードを再開しますか？", True):
+            self.resume_journal = True
+            return unfinished
+        return []
+        
     def _download_contents(self, urls):
         """コンテンツをダウンロード"""
         content_type = self.config_manager.get("content_type", "video")
         default_output_dir = self.config_manager.get("output_dir", "downloads")
         use_original_title = self.config_manager.get("use_original_title", True)
+        throughput_profile = self.config_manager.get("throughput_profile", "balanced")
         
         # デフォルト出力ディレクトリが存在しなければ作成
-        from .utils.helpers import verify_output_directory, get_platform_from_url, get_platform_specific_output_dir
+        from .utils.helpers import verify_output_directory, get_platform_specific_output_dir
+        from .utils.router import classify_url
+        from .downloaders import AudioDownloader
+        from .session import DownloadSession
         verify_output_directory(default_output_dir)
         
+        # 進行状況をジャーナルに記録し、中断しても次回再開できるようにする
+        journal = job_journal.JobJournal(self.journal_path, resume=self.resume_journal)
+        for url in urls:
+            journal.record(url, job_journal.QUEUED)
+        
+        # ダウンローダーとyt-dlpのインスタンスは全てのURLで使い回す
+        session = DownloadSession()
+        progress = configure_progress(interval=self.config_manager.get("progress_interval", 0.5))
+        bandwidth = self._configure_bandwidth()
+        
         # URLごとにダウンロード
         for i, url in enumerate(urls, 1):
             print(f"\n[{i}/{len(urls)}] {url} をダウンロード中...")
-            platform = get_platform_from_url(url)
+            journal.record(url, job_journal.EXTRACTING)
+            progress_hooks = [journal.progress_hook(url)]
+            failure_reason = None
+            route = classify_url(url)
+            platform = route.platform
             print(f"検出されたプラットフォーム: {platform}")
             
             # URLごとの個別設定を取得
@@ -475,6 +520,7 @@ class InteractiveDownloader:
             
             # コンテンツタイプに応じたダウンローダーを準備
             downloaders = {}
+            stack = ExitStack()
             
             if content_type in ["video", "both"]:
                 # output_dirを適切に調整
@@ -491,22 +537,12 @@ class InteractiveDownloader:
                 video_format = self.config_manager.get("video_format", "mp4")
                 
                 # プラットフォームに応じたダウンローダーを選択
-                if platform == 'youtube':
-                    downloaders["video"] = YouTubeDownloader(
-                        output_dir=video_dir,
-                        quality=video_quality
-                    )
-                elif platform == 'abema':
-                    downloaders["video"] = AbemaDownloader(
-                        output_dir=video_dir,
-                        quality=video_quality
-                    )
-                else:
-                    # その他のプラットフォームは一般的なVideoDownloaderを使用
-                    downloaders["video"] = VideoDownloader(
-                        output_dir=video_dir,
-                        quality=video_quality
-                    )
+                downloaders["video"] = stack.enter_context(session.downloader(
+                    route.downloader_class,
+                    output_dir=video_dir,
+                    quality=video_quality,
+                    throughput_profile=throughput_profile
+                ))
                 
             if content_type in ["audio", "both"]:
                 # output_dirを適切に調整
@@ -522,13 +558,16 @@ class InteractiveDownloader:
                 audio_quality = self.config_manager.get("audio_quality", "high")
                 audio_format = self.config_manager.get("audio_format", "mp3")
                 
-                downloaders["audio"] = AudioDownloader(
+                downloaders["audio"] = stack.enter_context(session.downloader(
+                    AudioDownloader,
                     output_dir=audio_dir,
                     audio_format=audio_format,
-                    quality=audio_quality
-                )
+                    quality=audio_quality,
+                    throughput_profile=throughput_profile
+                ))
             
             try:
+                video_file = None
                 if content_type in ["video", "both"]:
                     # 動画ダウンロード
                     format_spec = self.config_manager.get_format_spec("video")
@@ -544,15 +583,17 @@ class InteractiveDownloader:
                     if not url_use_original or custom_filename:
                         filename = custom_filename or f"video_{i}"
                     
-                    result = downloaders["video"].download(
+                    video_file = downloaders["video"].download(
                         url,
                         filename=filename,
                         format=format_spec,
-                        subtitles=subtitles
+                        subtitles=subtitles,
+                        progress_hooks=progress_hooks
                     )
                     
-                    if not result:
+                    if not video_file:
                         print(f"動画「{url}」のダウンロードに失敗しました。")
+                        failure_reason = "動画のダウンロードに失敗しました"
                 
                 if content_type in ["audio", "both"]:
                     # 音声ダウンロード
@@ -567,21 +608,69 @@ class InteractiveDownloader:
                     if not url_use_original or custom_filename:
                         filename = custom_filename or f"audio_{i}"
                     
-                    result = downloaders["audio"].download(
-                        url,
-                        filename=filename,
-                        bitrate=bitrate
-                    )
+                    result = None
+                    if video_file:
+                        # 取得済みの動画から音声をローカルで抽出する（再ダウンロードしない）
+                        journal.record(url, job_journal.POST_PROCESSING)
+                        result = downloaders["audio"].extract_audio(
+                            video_file,
+                            filename=filename,
+                            bitrate=bitrate
+                        )
+                        if not result:
+                            print("音声の抽出に失敗したため、音声を個別にダウンロードします。")
+                    
+                    if not result:
+                        result = downloaders["audio"].download(
+                            url,
+                            filename=filename,
+                            bitrate=bitrate,
+                            progress_hooks=progress_hooks
+                        )
                     
                     if not result:
                         print(f"音声「{url}」のダウンロードに失敗しました。")
+                        failure_reason = "音声のダウンロードに失敗しました"
                         
             except Exception as e:
                 logger.error(f"ダウンロード中にエラーが発生しました: {e}")
                 print(f"{url} のダウンロード中にエラーが発生しました。")
+                failure_reason = str(e)
+                
+            if failure_reason:
+                journal.record(url, job_journal.FAILED, reason=failure_reason)
+            else:
+                journal.record(url, job_journal.DONE)
+            stack.close()
+                
+        # 失敗したURLのみを含む再試行用のバッチファイルを書き出す
+        if journal.failures():
+            retry_path = os.path.splitext(self.journal_path)[0] + ".retry.txt"
+            count = journal.write_retry_file(retry_path)
+            print(f"\n失敗した{count}件のURLを再試行用ファイルに書き出しました: {retry_path}")
+        journal.close()
+        session.close()
+        progress.close()
+        bandwidth.log_report()
                 
         print("\nすべてのダウンロードが完了しました。")
         
+    def _configure_bandwidth(self):
+        """設定ファイルの速度の上限から帯域制御を設定"""
+        try:
+            limit = self.config_manager.get("bandwidth_limit")
+            return configure_bandwidth(
+                limit=parse_rate(limit) if limit is not None else None,
+                platform_limits={
+                    platform: parse_rate(rate)
+                    for platform, rate in self.config_manager.get("platform_bandwidth_limits", {}).items()
+                },
+                shared_path=get_shared_state_path() if self.config_manager.get("shared_bandwidth", False) else None
+            )
+        except ValueError as e:
+            logger.warning(f"{e}。速度を制限せずにダウンロードします")
+            return configure_bandwidth()
+    
     def _setup_platform_dirs(self, content_type):
         """各プラットフォームごとの保存先を設定する"""
         print("\n--- プラットフォーム別設定 ---")
@@ -0,0 +1,187 @@
+"""
+後処理（音声の変換）のパイプライン
+ダウンロードとffmpegによる変換を別の段階に分け、変換はCPUの数に合わせたプロセスプールで並列に行う
+変換待ちが上限に達した場合は、空きができるまで新しい変換の登録（＝次のダウンロード）を待たせる
+"""
+
+import os
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from .utils.metrics import get_metrics, STAGE_POSTPROCESS
+
+logger = logging.getLogger(__name__)
+
+# 変換前のファイルを一時的に保存するディレクトリ名（出力ディレクトリの下に作成する）
+STAGING_DIR = ".datascoop-staging"
+
+
+def _transcode(source_path, output_dir, audio_format, bitrate, filename, remove_source):
+    """
+    音声を変換する（ワーカープロセス内で呼ばれる）
+    計測はワーカープロセスでは集計されないため、変換にかかった時間も返す
+    """
+    from .downloaders.audio import convert_audio
+
+    started = time.monotonic()
+    output_path = convert_audio(source_path, output_dir, audio_format, bitrate, filename)
+    if remove_source and os.path.abspath(source_path) != os.path.abspath(output_path):
+        try:
+            os.remove(source_path)
+        except OSError:
+            pass
+    return output_path, time.monotonic() - started
+
+
+class TranscodePool:
+    """
+    音声の変換を行うプロセスプール
+    登録した変換はFutureとして返し、結果には変換後のファイルのパスが入る
+    """
+
+    def __init__(self, workers=None, queue_size=None):
+        """
+        コンストラクタ
+
+        Args:
+            workers (int, optional): 同時に変換するプロセスの数（省略時はCPUの数）
+            queue_size (int, optional): 実行中と待機中の変換の数の上限（省略時はプロセスの数の2倍）
+        """
+        self.workers = max(1, int(workers or os.cpu_count() or 1))
+        self.queue_size = max(self.workers, int(queue_size or self.workers * 2))
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._executor = None
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        """プロセスプールを取得する（最初の変換の時点で起動する）"""
+        with self._lock:
+            if self._executor is None:
+                # ダウンロード中のスレッドを複製しないよう、forkではなくspawnで起動する
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        """
+        関数をワーカープロセスで実行する
+        実行中と待機中の数が上限に達している場合は、空きができるまで待機する
+
+        Args:
+            func (callable): ワーカープロセスで実行する関数（モジュールの最上位で定義されたもの）
+            *args, **kwargs: 関数に渡す引数
+
+        Returns:
+            concurrent.futures.Future: 関数の戻り値を受け取るFuture
+        """
+        self._slots.acquire()
+        try:
+            future = self._get_executor().submit(func, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._release)
+        return future
+    
+    def _release(self, future):
+        """完了した変換の枠を空ける"""
+        with self._lock:
+            self._pending.discard(future)
+        self._slots.release()
+
+    def submit_audio(self, source_path, output_dir, audio_format="mp3", bitrate="192K", filename=None,
+                     remove_source=False, platform="unknown"):
+        """
+        音声の変換を登録する
+
+        Args:
+            source_path (str): 変換元のファイルパス
+            output_dir (str): 音声ファイルの保存先ディレクトリ
+            audio_format (str): 出力音声のフォーマット
+            bitrate (str): 音声のビットレート (例: '192K')
+            filename (str, optional): 保存するファイル名（拡張子なし）
+            remove_source (bool): 変換後に変換元のファイルを削除するかどうか
+            platform (str): 計測に記録するプラットフォーム名
+
+        Returns:
+            concurrent.futures.Future: 変換後の音声ファイルのパスを受け取るFuture
+        """
+        logger.info(f"音声の変換を登録しました: {source_path}")
+        future = self.submit(_transcode, source_path, output_dir, audio_format, bitrate, filename, remove_source)
+
+        def record(result):
+            output_path, duration = result
+            get_metrics().record(STAGE_POSTPROCESS, duration, platform, postprocessor="TranscodePool")
+            return output_path
+
+        def discard_source(error):
+            # 変換に失敗・キャンセルした場合も、一時的に保存した変換元のファイルは残さない
+            try:
+                os.remove(source_path)
+                logger.debug(f"変換できなかった変換元のファイルを削除しました: {source_path}")
+            except OSError:
+                pass
+
+        return then(future, record, on_error=discard_source if remove_source else None)
+
+    def close(self, wait=True):
+        """
+        プロセスプールを終了する
+
+        Args:
+            wait (bool): 登録済みの変換が終わるまで待つかどうか
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            pending = list(self._pending)
+        if executor is None:
+            return
+        if not wait:
+            # 開始していない変換を取り消す（shutdownのcancel_futuresはPython 3.9以降のため使用しない）
+            for future in pending:
+                future.cancel()
+        executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def then(future, func, on_error=None):
+    """
+    Futureの結果をfuncで変換した結果を受け取るFutureを作成する
+    funcはfutureの完了時に、結果を受け取って呼ばれる（futureが例外で終わった場合は呼ばれず、on_errorが例外を受け取って呼ばれる）
+
+    Args:
+        future (concurrent.futures.Future): 元のFuture
+        func (callable): 結果を変換する関数
+        on_error (callable, optional): futureが例外で終わった場合（キャンセルを含む）に呼ぶ関数
+
+    Returns:
+        concurrent.futures.Future: 変換した結果を受け取るFuture
+    """
+    chained = Future()
+
+    def done(f):
+        try:
+            result = f.result()
+        except BaseException as e:
+            if on_error is not None:
+                on_error(e)
+            chained.set_exception(e)
+            return
+        try:
+            chained.set_result(func(result))
+        except BaseException as e:
+            chained.set_exception(e)
+
+    future.add_done_callback(done)
+    return chained
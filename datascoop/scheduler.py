@@ -0,0 +1,160 @@
+"""
+バッチダウンロードのジョブの実行順序を決めるスケジューラー
+明示的な優先度、推定サイズの小さい順（最短ジョブ優先）、プラットフォームの順序で並べ替える
+並べ替えは読み込み済みで完了していないURL（BatchDownloaderのqueue_size件まで）の範囲で行う
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+# スケジューリングの方式
+FIFO = "fifo"
+PRIORITY = "priority"
+SJF = "sjf"
+PLATFORM = "platform"
+
+SCHEDULES = (FIFO, PRIORITY, SJF, PLATFORM)
+
+# ファイルサイズが分からない場合に、再生時間から推定するためのビットレート（バイト毎秒）
+DEFAULT_BYTES_PER_SECOND = 512 * 1024
+
+# プラットフォームの順序（デフォルト）
+DEFAULT_PLATFORM_ORDER = ("youtube", "niconico", "unknown", "abema")
+
+
+def estimate_size(info):
+    """
+    メタデータからダウンロードするサイズを推定する
+    filesize・filesize_approx を優先し、なければ再生時間から推定する
+
+    Args:
+        info (dict): extract_infoの結果
+
+    Returns:
+        float: 推定サイズ（バイト）。推定できない場合はNone
+    """
+    if not info:
+        return None
+    size = info.get("filesize") or info.get("filesize_approx")
+    if not size:
+        # 最も大きい映像と音声のフォーマットを合計する（bestを選んだ場合に近い値になる）
+        largest = {}
+        for fmt in info.get("formats") or []:
+            fmt_size = fmt.get("filesize") or fmt.get("filesize_approx")
+            if not fmt_size:
+                continue
+            kind = "audio" if fmt.get("vcodec") == "none" else "video"
+            largest[kind] = max(largest.get(kind, 0), fmt_size)
+        size = sum(largest.values())
+    if not size and info.get("duration"):
+        size = info["duration"] * DEFAULT_BYTES_PER_SECOND
+    return float(size) if size else None
+
+
+class FifoScheduler:
+    """読み込んだ順に実行するスケジューラー"""
+
+    name = FIFO
+
+    def key(self, index, url, platform):
+        """
+        ジョブの並べ替えに使用するキーを取得する（小さいものから実行する）
+
+        Args:
+            index (int): 読み込んだ順の番号（1から）
+            url (str): URL
+            platform (str): プラットフォーム名
+
+        Returns:
+            tuple: 並べ替えのキー
+        """
+        return (index,)
+
+
+class PriorityScheduler(FifoScheduler):
+    """明示的な優先度の高い順に実行するスケジューラー（同じ優先度は読み込んだ順）"""
+
+    name = PRIORITY
+
+    def __init__(self, priorities=None):
+        """
+        コンストラクタ
+
+        Args:
+            priorities (dict, optional): URLをキーとした優先度（大きいほど先に実行する。省略時は0）
+        """
+        self.priorities = priorities if priorities is not None else {}
+
+    def key(self, index, url, platform):
+        return (-self.priorities.get(url, 0), index)
+
+
+class ShortestJobFirstScheduler(FifoScheduler):
+    """
+    推定サイズの小さい順に実行するスケジューラー
+    サイズはメタデータキャッシュ（--list-formatsなどで取得済みの情報）から推定し、ネットワークにはアクセスしない
+    推定できないジョブは推定できたジョブの後に、読み込んだ順に実行する
+    """
+
+    name = SJF
+
+    def __init__(self, cache=None):
+        """
+        コンストラクタ
+
+        Args:
+            cache (MetadataCache, optional): 使用するメタデータキャッシュ（省略時は共有キャッシュ）
+        """
+        if cache is None:
+            from .utils.cache import get_metadata_cache
+            cache = get_metadata_cache()
+        self.cache = cache
+
+    def key(self, index, url, platform):
+        size = estimate_size(self.cache.get(url))
+        return (size is None, size or 0.0, index)
+
+
+class PlatformScheduler(FifoScheduler):
+    """プラットフォームの順序に従って実行するスケジューラー（同じプラットフォームは読み込んだ順）"""
+
+    name = PLATFORM
+
+    def __init__(self, order=DEFAULT_PLATFORM_ORDER):
+        """
+        コンストラクタ
+
+        Args:
+            order (iterable): 先に実行するプラットフォームの順序（含まれないものは最後）
+        """
+        self.ranks = {platform: rank for rank, platform in enumerate(order)}
+
+    def key(self, index, url, platform):
+        return (self.ranks.get(platform, len(self.ranks)), index)
+
+
+def create_scheduler(name=FIFO, priorities=None, platform_order=None):
+    """
+    スケジューリングの方式の名前からスケジューラーを作成する
+
+    Args:
+        name (str): fifo, priority, sjf, platform のいずれか
+        priorities (dict, optional): priorityの場合に使用するURLごとの優先度
+        platform_order (iterable, optional): platformの場合に使用するプラットフォームの順序
+
+    Returns:
+        FifoScheduler: スケジューラー
+
+    Raises:
+        ValueError: 不明な方式の場合
+    """
+    if name == FIFO:
+        return FifoScheduler()
+    if name == PRIORITY:
+        return PriorityScheduler(priorities)
+    if name == SJF:
+        return ShortestJobFirstScheduler()
+    if name == PLATFORM:
+        return PlatformScheduler(platform_order or DEFAULT_PLATFORM_ORDER)
+    raise ValueError(f"不明なスケジューリングの方式です: {name}")
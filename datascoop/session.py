@@ -0,0 +1,216 @@
+"""
+ダウンロードセッション
+ダウンローダーとyt-dlpのインスタンスをプールし、バッチ全体で再利用する
+"""
+
+import copy
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ジョブごとに上書きできるyt-dlpのオプション
+# これ以外のオプション（postprocessorsなど）はインスタンス生成時にしか反映されないため、
+# プールのキーとして扱う
+JOB_OPTIONS = frozenset({
+    'outtmpl',
+    'format',
+    'progress_hooks',
+    'noplaylist',
+    'playliststart',
+    'playlistend',
+    'extract_flat',
+    'skip_download',
+    'writesubtitles',
+    'writeautomaticsub',
+    'subtitleslangs',
+    'subtitlesformat',
+    'writeinfojson',
+    'writeannotations',
+    'writethumbnail',
+})
+
+
+def _freeze(value):
+    """オプションの値をプールのキーとして使える形に変換する"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, (str, int, float, bool, type(None))):
+        return value
+    # 関数やアーカイブなどのオブジェクトは同一性で区別する
+    return ('id', id(value))
+
+
+def _supports_reuse(ydl):
+    """
+    yt-dlpのインスタンスにジョブごとのオプションを適用して再利用できるかどうか判定する
+    （出力テンプレートが種類ごとの辞書に正規化され、フォーマットの選択を差し替えられること）
+    """
+    return (
+        isinstance(ydl.params.get('outtmpl'), dict)
+        and 'default' in ydl.params['outtmpl']
+        and hasattr(ydl, 'format_selector')
+        and callable(getattr(ydl, 'build_format_selector', None))
+        and callable(getattr(ydl, 'add_progress_hook', None))
+    )
+
+
+class DownloadSession:
+    """
+    ダウンローダーとyt-dlpのインスタンスを使い回すためのセッション
+    抽出器の初期化やHTTP接続（TCP/TLSハンドシェイク）のコストをバッチ全体で1回にする
+
+    使用例:
+        with DownloadSession() as session:
+            with session.downloader(VideoDownloader, output_dir="downloads") as downloader:
+                downloader.download(url)
+    """
+
+    def __init__(self):
+        """初期化"""
+        self._lock = threading.Lock()
+        self._idle_downloaders = {}
+        self._idle_ydls = {}
+        self._all_ydls = []
+        self._closed = False
+        # インスタンスを再利用できるyt-dlpかどうか（最初にインスタンスを作成した時に判定する）
+        self._reuse_supported = None
+
+    @contextmanager
+    def downloader(self, cls, **options):
+        """
+        ダウンローダーをプールから取り出す（なければ作成する）
+        取り出したダウンローダーは with ブロックの間、呼び出し元が専有する
+
+        Args:
+            cls (type): ダウンローダーのクラス
+            **options: コンストラクタの引数 (output_dir, quality など)
+
+        Yields:
+            BaseDownloader: セッションに紐付いたダウンローダー
+        """
+        key = (cls, _freeze(options))
+        with self._lock:
+            idle = self._idle_downloaders.get(key)
+            instance = idle.pop() if idle else None
+
+        if instance is None:
+            instance = cls(**options)
+            instance.session = self
+
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self._idle_downloaders.setdefault(key, []).append(instance)
+
+    @contextmanager
+    def acquire_ydl(self, ydl_opts):
+        """
+        yt-dlpのインスタンスをプールから取り出し、ジョブのオプションを適用する
+        インスタンスの再利用に必要な機能がないyt-dlpの場合は、ジョブごとに新しいインスタンスを作成する
+
+        Args:
+            ydl_opts (dict): yt-dlpのオプション
+
+        Yields:
+            yt_dlp.YoutubeDL: ジョブのオプションが適用されたインスタンス
+        """
+        base_opts = {k: v for k, v in ydl_opts.items() if k not in JOB_OPTIONS}
+        job_opts = {k: v for k, v in ydl_opts.items() if k in JOB_OPTIONS}
+        key = _freeze(base_opts)
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("セッションは既に閉じられています")
+            idle = self._idle_ydls.get(key)
+            entry = idle.pop() if idle else None
+
+        if entry is None:
+            import yt_dlp
+            if self._reuse_supported is False:
+                with yt_dlp.YoutubeDL(dict(ydl_opts)) as ydl:
+                    yield ydl
+                return
+            ydl = yt_dlp.YoutubeDL(dict(base_opts))
+            if self._reuse_supported is None:
+                self._reuse_supported = _supports_reuse(ydl)
+                if not self._reuse_supported:
+                    logger.debug("このバージョンのyt-dlpではインスタンスを再利用できないため、ジョブごとに作成します")
+            if not self._reuse_supported:
+                ydl.close()
+                with yt_dlp.YoutubeDL(dict(ydl_opts)) as ydl:
+                    yield ydl
+                return
+            # 進捗フックは公開APIで1つだけ登録し、ジョブごとのフックに振り分ける
+            hooks = []
+            ydl.add_progress_hook(lambda d: [hook(d) for hook in list(hooks)])
+            entry = (ydl, copy.copy(ydl.params), ydl.format_selector, hooks)
+            with self._lock:
+                self._all_ydls.append(ydl)
+            logger.debug("yt-dlpのインスタンスを作成しました")
+
+        ydl = entry[0]
+        self._apply_job_options(entry, job_opts)
+        try:
+            yield ydl
+        finally:
+            with self._lock:
+                self._idle_ydls.setdefault(key, []).append(entry)
+
+    def _apply_job_options(self, entry, job_opts):
+        """
+        プールしたインスタンスにジョブごとのオプションを適用する
+        前のジョブのオプションは引き継がない
+        yt-dlpの公開されている属性とメソッド（params、format_selector、build_format_selector）のみを使用する
+
+        Args:
+            entry (tuple): (インスタンス, 生成直後のparams, 生成直後のformat_selector, ジョブの進捗フックのリスト)
+            job_opts (dict): ジョブごとのオプション
+        """
+        ydl, base_params, base_selector, hooks = entry
+        params = copy.copy(base_params)
+        params.update(job_opts)
+
+        # 出力テンプレートはインスタンスの生成時と同じく、種類ごとの辞書にして既定値を補う
+        outtmpl = job_opts.get('outtmpl')
+        if isinstance(outtmpl, dict):
+            params['outtmpl'] = {**base_params['outtmpl'], **outtmpl}
+        elif outtmpl is not None:
+            params['outtmpl'] = {**base_params['outtmpl'], 'default': outtmpl}
+        else:
+            params['outtmpl'] = dict(base_params['outtmpl'])
+        ydl.params = params
+
+        fmt = job_opts.get('format')
+        if fmt is None:
+            ydl.format_selector = base_selector
+        elif fmt == '-' or callable(fmt):
+            ydl.format_selector = fmt
+        else:
+            ydl.format_selector = ydl.build_format_selector(fmt)
+
+        # 進捗フックはジョブごとに入れ替える
+        hooks[:] = job_opts.get('progress_hooks', [])
+
+    def close(self):
+        """プールしている全てのyt-dlpのインスタンスを閉じる"""
+        with self._lock:
+            ydls, self._all_ydls = self._all_ydls, []
+            self._idle_ydls.clear()
+            self._idle_downloaders.clear()
+            self._closed = True
+        for ydl in ydls:
+            try:
+                ydl.close()
+            except Exception as e:
+                logger.debug(f"yt-dlpのインスタンスを閉じる際にエラーが発生しました: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
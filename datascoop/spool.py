@@ -0,0 +1,522 @@
+"""
+複数のプロセス・ホストで共有するSQLiteのジョブキュー
+ワーカーはジョブにリース（有効期限付きの占有）を取得してから処理し、処理中はハートビートでリースを延長する
+ワーカーが停止してリースが期限切れになったジョブは、他のワーカーが回収して処理し直す
+結果の記録はリースを保持しているワーカーのみが行えるため、同じジョブを二重に完了させることはない
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import logging
+import threading
+from collections import namedtuple
+from concurrent.futures import Future
+from .aio import DownloadCancelled
+from .utils.config import get_config_dir
+from .utils.helpers import get_platform_from_url
+from .utils.journal import QUEUED, DONE, FAILED
+from .utils.retry import classify_error, clear_error, last_error
+
+logger = logging.getLogger(__name__)
+
+# リースを取得して処理中のジョブの状態
+LEASED = "leased"
+
+STATES = (QUEUED, LEASED, DONE, FAILED)
+
+# リースの有効期限（秒）
+DEFAULT_LEASE_SECONDS = 300.0
+
+# 空いているジョブがない場合に再確認するまでの間隔（秒）
+DEFAULT_POLL_INTERVAL = 5.0
+
+# リースの期限切れで回収されたジョブを含め、1件のジョブを試行する回数の上限
+DEFAULT_MAX_ATTEMPTS = 5
+
+# ジョブキューのファイル名（デフォルト）
+DEFAULT_FILENAME = "queue.db"
+
+# ワーカーが取得したジョブ
+SpoolJob = namedtuple("SpoolJob", ["id", "url", "options", "priority", "attempts"])
+
+# ジョブの追加結果（追加・待ち行列に戻した・登録済みのため追加しなかったURLの数）
+EnqueueResult = namedtuple("EnqueueResult", ["added", "requeued", "skipped"])
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL UNIQUE,
+    options TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_expires REAL,
+    available_at REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    finished_at REAL,
+    error TEXT,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (state, priority DESC, id);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT NOT NULL,
+    pid INTEGER NOT NULL,
+    started_at REAL NOT NULL,
+    heartbeat_at REAL NOT NULL,
+    stopped_at REAL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    reclaimed INTEGER NOT NULL DEFAULT 0,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    busy_seconds REAL NOT NULL DEFAULT 0
+);
+"""
+
+
+def get_default_spool_path():
+    """
+    ジョブキューのデフォルトのパスを取得する
+
+    Returns:
+        str: ~/.datascoop/queue.db
+    """
+    return os.path.join(get_config_dir(), DEFAULT_FILENAME)
+
+
+def default_worker_id():
+    """ホスト名とプロセスIDからワーカーのIDを作成する"""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class JobSpool:
+    """
+    SQLiteに保存するジョブキュー
+    共有ストレージ上で複数のホストから使用できるよう、WALではなく標準のロールバックジャーナルを使用する
+    （ファイルのロックが正しく動作するファイルシステムが必要）
+    """
+
+    def __init__(self, path=None, timeout=30.0):
+        """
+        コンストラクタ
+
+        Args:
+            path (str, optional): データベースのパス（省略時は ~/.datascoop/queue.db）
+            timeout (float): 他のプロセスのロックの解除を待つ時間（秒）
+        """
+        self.path = path or get_default_spool_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.executescript(_SCHEMA)
+
+    def _transaction(self, func):
+        """書き込みロックを取得してから関数を実行する（リースの取得を他のワーカーと競合させない）"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def add(self, urls, options=None, priorities=None, requeue_failed=False):
+        """
+        ジョブを追加する（既に登録されているURLは追加しない）
+
+        Args:
+            urls (iterable): URLのイテレータ
+            options (dict, optional): 全てのジョブに共通のオプション
+            priorities (dict, optional): URLをキーとした優先度（大きいほど先に処理する）
+            requeue_failed (bool): Trueの場合は失敗したジョブを試行回数を0に戻して待ち行列に戻す
+
+        Returns:
+            EnqueueResult: 追加・待ち行列に戻した・追加しなかったURLの数
+        """
+        options = json.dumps(options or {}, ensure_ascii=False)
+        now = time.time()
+
+        def insert(conn):
+            added = requeued = skipped = 0
+            for url in urls:
+                priority = (priorities or {}).get(url, 0)
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (url, options, priority, created_at) VALUES (?, ?, ?, ?)",
+                    (url, options, priority, now)
+                )
+                if cursor.rowcount:
+                    added += 1
+                    continue
+                if requeue_failed:
+                    cursor = conn.execute(
+                        "UPDATE jobs SET state = ?, options = ?, priority = ?, attempts = 0, available_at = 0, "
+                        "finished_at = NULL, error = NULL, category = NULL WHERE url = ? AND state = ?",
+                        (QUEUED, options, priority, url, FAILED)
+                    )
+                    if cursor.rowcount:
+                        requeued += 1
+                        continue
+                skipped += 1
+            return EnqueueResult(added, requeued, skipped)
+
+        return self._transaction(insert)
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """
+        処理できるジョブを1件取得し、リースを設定する
+        リースが期限切れになったジョブも回収して取得する
+
+        Args:
+            worker_id (str): ワーカーのID
+            lease_seconds (float): リースの有効期限（秒）
+            max_attempts (int): 期限切れのジョブを回収する試行回数の上限（超えた場合は失敗とする）
+
+        Returns:
+            SpoolJob: 取得したジョブ（ない場合はNone）
+        """
+        def claim(conn):
+            while True:
+                now = time.time()
+                row = conn.execute(
+                    "SELECT id, url, options, priority, state, attempts, worker FROM jobs "
+                    "WHERE (state = ? AND available_at <= ?) OR (state = ? AND lease_expires < ?) "
+                    "ORDER BY priority DESC, id LIMIT 1",
+                    (QUEUED, now, LEASED, now)
+                ).fetchone()
+                if row is None:
+                    return None
+                if row["state"] == LEASED:
+                    logger.warning(
+                        f"{row['worker']} のリースが期限切れのため回収しました: {row['url']} ({row['attempts']}回目の試行)"
+                    )
+                    conn.execute("UPDATE workers SET reclaimed = reclaimed + 1 WHERE worker_id = ?", (worker_id,))
+                    if row["attempts"] >= max_attempts:
+                        conn.execute(
+                            "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, finished_at = ?, "
+                            "error = ? WHERE id = ?",
+                            (FAILED, now, f"リースが{row['attempts']}回期限切れになりました", row["id"])
+                        )
+                        continue
+                conn.execute(
+                    "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    (LEASED, worker_id, now + lease_seconds, row["id"])
+                )
+                return SpoolJob(row["id"], row["url"], json.loads(row["options"]), row["priority"], row["attempts"] + 1)
+
+        return self._transaction(claim)
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """
+        リースを延長する
+
+        Returns:
+            bool: 延長できた場合はTrue（期限切れで他のワーカーに回収された場合はFalse）
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_expires = ? WHERE id = ? AND state = ? AND worker = ?",
+                (time.time() + lease_seconds, job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, success, error=None, category=None):
+        """
+        ジョブの結果を記録する（リースを保持している場合のみ）
+
+        Returns:
+            bool: 記録できた場合はTrue
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, finished_at = ?, error = ?, "
+                "category = ? WHERE id = ? AND state = ? AND worker = ?",
+                (DONE if success else FAILED, time.time(), error, category, job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, job_id, worker_id, delay=0.0, error=None, category=None):
+        """
+        リースを解除し、待機時間の経過後に再び処理できるようにする（再試行する場合）
+
+        Returns:
+            bool: 解除できた場合はTrue
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, available_at = ?, error = ?, "
+                "category = ? WHERE id = ? AND state = ? AND worker = ?",
+                (QUEUED, time.time() + delay, error, category, job_id, LEASED, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def is_drained(self):
+        """待機中・処理中のジョブが残っていないかどうか"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE state IN (?, ?)", (QUEUED, LEASED)
+            ).fetchone()
+        return row[0] == 0
+
+    def register_worker(self, worker_id):
+        """ワーカーを登録する（同じIDのワーカーの記録は引き継がない）"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)",
+                (worker_id, socket.gethostname(), os.getpid(), now, now)
+            )
+
+    def update_worker(self, worker_id, done=0, failed=0, nbytes=0, busy_seconds=0.0, stopped=False):
+        """ワーカーのハートビートの時刻と、前回からの処理件数・転送量・処理時間を記録する"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE workers SET heartbeat_at = ?, done = done + ?, failed = failed + ?, bytes = bytes + ?, "
+                "busy_seconds = busy_seconds + ?, stopped_at = ? WHERE worker_id = ?",
+                (now, done, failed, nbytes, busy_seconds, now if stopped else None, worker_id)
+            )
+
+    def stats(self):
+        """
+        ジョブキューとワーカーの統計を取得する
+
+        Returns:
+            dict: counts（状態ごとのジョブの数）と workers（ワーカーごとの統計のリスト）
+        """
+        with self._lock:
+            counts = {state: 0 for state in STATES}
+            for row in self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"):
+                counts[row[0]] = row[1]
+            workers = [dict(row) for row in self._conn.execute("SELECT * FROM workers ORDER BY started_at")]
+        return {"counts": counts, "workers": workers}
+
+    def close(self):
+        """データベースを閉じる"""
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class _LeaseJournal:
+    """
+    download_content の journal として渡し、リースを失ったジョブの処理を中断させる
+    転送量はワーカーの統計に加える
+    """
+
+    def __init__(self, lost, worker):
+        self.lost = lost
+        self.worker = worker
+
+    def record(self, url, state, reason=None):
+        logger.debug(f"{url}: {state}")
+
+    def progress_hook(self, url):
+        def hook(d):
+            if self.lost.is_set():
+                # 他のワーカーが処理し直すため、このワーカーでの処理は中断する
+                raise DownloadCancelled(url)
+            if d.get("status") == "finished":
+                self.worker._add_stats(nbytes=d.get("total_bytes") or d.get("downloaded_bytes") or 0)
+
+        return hook
+
+
+class SpoolWorker:
+    """
+    ジョブキューからジョブを取得して処理するワーカー
+    1つのプロセスで jobs 件のジョブを並列に処理し、保持しているリースをまとめてハートビートで延長する
+
+    使用例:
+        with JobSpool("/mnt/shared/queue.db") as spool:
+            SpoolWorker(spool, run_job, jobs=4).run()
+    """
+
+    def __init__(self, spool, run_job, jobs=1, worker_id=None, lease_seconds=DEFAULT_LEASE_SECONDS,
+                 retry_policy=None, max_attempts=DEFAULT_MAX_ATTEMPTS, poll_interval=DEFAULT_POLL_INTERVAL):
+        """
+        コンストラクタ
+
+        Args:
+            spool (JobSpool): ジョブキュー
+            run_job (callable): run_job(url, options, journal) で1件のジョブを実行する関数
+                （成功時にTrue、または成功したかどうかを受け取るFutureを返す）
+            jobs (int): 並列に処理するジョブの数
+            worker_id (str, optional): ワーカーのID（省略時は「ホスト名-プロセスID」）
+            lease_seconds (float): リースの有効期限（秒）。ハートビートはその1/3の間隔で行う
+            retry_policy (RetryPolicy, optional): 一時的なエラーで失敗したジョブを再試行する方針
+            max_attempts (int): 期限切れのジョブを回収する試行回数の上限
+            poll_interval (float): 空いているジョブがない場合に再確認するまでの間隔（秒）
+        """
+        self.spool = spool
+        self.run_job = run_job
+        self.jobs = max(1, int(jobs))
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = float(lease_seconds)
+        self.retry_policy = retry_policy
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self._stopped = threading.Event()
+        self._interrupted = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+        # 保持しているリース（ジョブIDをキーとした、リースを失ったことを通知するイベント）
+        self._leases = {}
+        # 前回のハートビート以降の統計
+        self._pending_stats = {"done": 0, "failed": 0, "nbytes": 0, "busy_seconds": 0.0}
+        self.totals = {"done": 0, "failed": 0, "retried": 0}
+
+    def stop(self):
+        """新しいジョブの取得をやめ、処理中のジョブの完了後に run() を終了させる"""
+        self._stopped.set()
+
+    def _add_stats(self, **values):
+        with self._lock:
+            for key, value in values.items():
+                self._pending_stats[key] += value
+
+    def _count(self, key):
+        with self._lock:
+            self.totals[key] += 1
+
+    def _flush_stats(self, stopped=False):
+        with self._lock:
+            stats = self._pending_stats
+            self._pending_stats = {"done": 0, "failed": 0, "nbytes": 0, "busy_seconds": 0.0}
+        self.spool.update_worker(self.worker_id, stopped=stopped, **stats)
+
+    def _heartbeat(self):
+        """保持しているリースを定期的に延長する（ハートビートのスレッド内で呼ばれる）"""
+        interval = self.lease_seconds / 3
+        while not self._finished.wait(interval):
+            with self._lock:
+                leases = list(self._leases.items())
+            for job_id, lost in leases:
+                if not self.spool.heartbeat(job_id, self.worker_id, self.lease_seconds):
+                    logger.warning(f"ジョブ {job_id} のリースを失ったため、処理を中断します")
+                    lost.set()
+            try:
+                self._flush_stats()
+            except sqlite3.Error as e:
+                logger.error(f"ワーカーの統計を記録できませんでした: {e}")
+
+    def _process(self, job):
+        """1件のジョブを処理し、結果をジョブキューに記録する（ワーカースレッド内で呼ばれる）"""
+        lost = threading.Event()
+        with self._lock:
+            self._leases[job.id] = lost
+        started = time.monotonic()
+        logger.info(f"ジョブを開始します: [{job.id}] {job.url} ({job.attempts}回目の試行)")
+        clear_error()
+        try:
+            outcome = self.run_job(job.url, job.options, _LeaseJournal(lost, self))
+            if isinstance(outcome, Future):
+                # 後処理の完了までリースを保持する
+                outcome = outcome.result()
+            success = bool(outcome)
+            cause = None if success else last_error()
+        except Exception as e:
+            logger.error(f"{job.url} の処理中にエラーが発生しました: {e}")
+            success, cause = False, e
+        finally:
+            with self._lock:
+                self._leases.pop(job.id, None)
+        elapsed = time.monotonic() - started
+        self._add_stats(busy_seconds=elapsed)
+
+        if lost.is_set():
+            if self._interrupted.is_set() and self.spool.release(job.id, self.worker_id):
+                logger.info(f"中断したジョブを待ち行列に戻しました: [{job.id}] {job.url}")
+            return
+        if success:
+            recorded = self.spool.complete(job.id, self.worker_id, True)
+            self._add_stats(done=1)
+            self._count("done")
+            logger.info(f"ジョブが完了しました: [{job.id}] {job.url} ({elapsed:.1f}秒)")
+        else:
+            error = str(cause) if cause else "ダウンロードに失敗しました"
+            category = classify_error(cause)
+            delay = None
+            if self.retry_policy is not None:
+                delay = self.retry_policy.next_delay(get_platform_from_url(job.url), job.attempts, category)
+            if delay is not None:
+                recorded = self.spool.release(job.id, self.worker_id, delay, error, category)
+                self._count("retried")
+                logger.warning(f"{job.url} を{delay:.1f}秒後に再試行します ({category}: {error})")
+            else:
+                recorded = self.spool.complete(job.id, self.worker_id, False, error, category)
+                self._add_stats(failed=1)
+                self._count("failed")
+                logger.error(f"ジョブが失敗しました: [{job.id}] {job.url} ({category}: {error})")
+        if not recorded:
+            logger.warning(f"ジョブ {job.id} のリースが期限切れのため、結果を記録しませんでした")
+
+    def _work(self, exit_when_empty):
+        """ジョブの取得と処理を繰り返す（ワーカースレッド内で呼ばれる）"""
+        while not self._stopped.is_set():
+            job = self.spool.claim(self.worker_id, self.lease_seconds, self.max_attempts)
+            if job is not None:
+                self._process(job)
+                continue
+            if exit_when_empty and self.spool.is_drained():
+                return
+            self._stopped.wait(self.poll_interval)
+
+    def run(self, exit_when_empty=False):
+        """
+        ジョブキューのジョブを処理する
+
+        Args:
+            exit_when_empty (bool): Trueの場合は待機中・処理中のジョブがなくなった時点で終了する
+                （Falseの場合は stop() が呼ばれるまで新しいジョブを待つ）
+
+        Returns:
+            dict: このワーカーで完了・失敗・再試行したジョブの数
+        """
+        self.spool.register_worker(self.worker_id)
+        logger.info(f"ワーカーを開始しました: {self.worker_id} (並列数: {self.jobs}, キュー: {self.spool.path})")
+        heartbeat = threading.Thread(target=self._heartbeat, name="datascoop-heartbeat", daemon=True)
+        heartbeat.start()
+        threads = [
+            threading.Thread(target=self._work, args=(exit_when_empty,), name=f"datascoop-worker-{i}", daemon=True)
+            for i in range(self.jobs)
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                # シグナル（Ctrl+C）を受け取れるよう、短い間隔で待機する
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            # 処理中のジョブを中断し、他のワーカーがすぐに処理できるよう待ち行列に戻す
+            logger.info("処理中のジョブを中断して終了します...")
+            self._interrupted.set()
+            with self._lock:
+                for lost in self._leases.values():
+                    lost.set()
+            raise
+        finally:
+            self._stopped.set()
+            for thread in threads:
+                thread.join()
+            self._finished.set()
+            heartbeat.join()
+            self._flush_stats(stopped=True)
+        logger.info(
+            f"ワーカーを終了しました: 完了 {self.totals['done']}件 / 失敗 {self.totals['failed']}件 / "
+            f"再試行 {self.totals['retried']}件"
+        )
+        return dict(self.totals)
@@ -6,7 +6,9 @@ from .helpers import (
     setup_logger, 
     sanitize_filename, 
     extract_video_id,
+    extract_content_id,
     get_platform_from_url,
     check_available_formats
 )
+from .router import classify_url, classify_many
 from .config import ConfigManager
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+ダウンロード済みのコンテンツを記録するアーカイブモジュール
+ファイル形式はyt-dlpの --download-archive と互換（1行に「抽出器名 ID」）
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from .config import get_config_dir
+from .helpers import extract_content_id
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# プラットフォーム名とyt-dlpの抽出器名（小文字）の対応表
+ARCHIVE_EXTRACTORS = {
+    "youtube": "youtube",
+    "niconico": "niconico",
+    "abema": "abematv",
+}
+
+# ファイル名からIDを推測するためのパターン
+_BRACKET_ID_RE = re.compile(r'\[([0-9A-Za-z_-]{11})\]')
+_NICONICO_ID_RE = re.compile(r'(?<![0-9A-Za-z])((?:sm|nm|so)\d+)(?![0-9A-Za-z])')
+
+
+def get_archive_id(url):
+    """
+    URLからアーカイブ用のIDを生成する
+
+    Args:
+        url (str): 動画URL
+
+    Returns:
+        str: 「抽出器名 ID」形式の文字列。IDを特定できない場合はNone
+    """
+    content = extract_content_id(url)
+    if not content:
+        return None
+    platform, content_id = content
+    return f"{ARCHIVE_EXTRACTORS.get(platform, platform)} {content_id}"
+
+
+class DownloadArchive:
+    """
+    ダウンロード済みコンテンツのIDを保持するアーカイブ
+    メモリ上のsetで O(1) の存在確認を行い、追加分はファイルに追記する
+    yt-dlpの download_archive オプションにそのまま渡すこともできる
+    """
+
+    DEFAULT_FILENAME = "archive.txt"
+
+    def __init__(self, path=None):
+        """
+        コンストラクタ
+
+        Args:
+            path (str, optional): アーカイブファイルのパス（省略時は ~/.datascoop/archive.txt）
+        """
+        self.path = path or os.path.join(get_config_dir(), self.DEFAULT_FILENAME)
+        self._ids = set()
+        self._offset = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._refresh()
+        logger.debug(f"ダウンロードアーカイブを読み込みました: {self.path} ({len(self._ids)}件)")
+
+    def _refresh(self):
+        """他のプロセスが追記した行を読み込む（ロック取得済みで呼ぶ）"""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        if size == self._offset:
+            return
+        if size < self._offset:
+            # ファイルが作り直された場合は最初から読み直す
+            self._ids.clear()
+            self._offset = 0
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        # 書き込み途中の最終行は次回に読み込む
+        complete = data[:data.rfind(b"\n") + 1]
+        for line in complete.decode("utf-8", errors="replace").splitlines():
+            line = line.strip()
+            if line:
+                self._ids.add(line)
+        self._offset += len(complete)
+
+    def __contains__(self, archive_id):
+        with self._lock:
+            self._refresh()
+            return archive_id in self._ids
+
+    def __len__(self):
+        with self._lock:
+            self._refresh()
+            return len(self._ids)
+
+    def __iter__(self):
+        with self._lock:
+            self._refresh()
+            return iter(list(self._ids))
+
+    def add(self, archive_id):
+        """
+        IDをアーカイブに追加する（既に存在する場合は何もしない）
+
+        Args:
+            archive_id (str): 「抽出器名 ID」形式の文字列
+        """
+        archive_id = archive_id.strip()
+        with self._lock:
+            self._refresh()
+            if archive_id in self._ids:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                if fcntl:
+                    # 同じファイルを共有する他のプロセスと書き込みが混ざらないようにする
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.write(archive_id + "\n")
+                    f.flush()
+                finally:
+                    if fcntl:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+            self._ids.add(archive_id)
+            self._refresh()
+
+    def contains_url(self, url):
+        """
+        URLのコンテンツがダウンロード済みかどうか確認する（ネットワークにはアクセスしない）
+
+        Args:
+            url (str): 動画URL
+
+        Returns:
+            bool: アーカイブに記録されている場合はTrue
+        """
+        archive_id = get_archive_id(url)
+        return archive_id is not None and archive_id in self
+
+    def record_url(self, url):
+        """
+        URLのコンテンツをダウンロード済みとして記録する
+
+        Args:
+            url (str): 動画URL
+
+        Returns:
+            bool: 記録できた場合はTrue（IDを特定できないURLはFalse）
+        """
+        archive_id = get_archive_id(url)
+        if archive_id is None:
+            return False
+        self.add(archive_id)
+        return True
+
+    def import_directory(self, directory):
+        """
+        既存のダウンロードディレクトリからIDを取り込む
+        yt-dlpの .info.json と、ファイル名中の [動画ID] やニコニコ動画のIDを使用する
+
+        Args:
+            directory (str): ダウンロード済みファイルのあるディレクトリ
+
+        Returns:
+            int: 新たに追加したIDの数
+        """
+        found = set()
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith(".info.json"):
+                    archive_id = self._id_from_info_json(os.path.join(root, name))
+                    if archive_id:
+                        found.add(archive_id)
+                    continue
+                for video_id in _BRACKET_ID_RE.findall(name):
+                    found.add(f"youtube {video_id}")
+                for video_id in _NICONICO_ID_RE.findall(name):
+                    found.add(f"niconico {video_id}")
+
+        added = 0
+        for archive_id in sorted(found):
+            if archive_id not in self:
+                self.add(archive_id)
+                added += 1
+        logger.info(f"{directory} から{added}件のIDをアーカイブに取り込みました")
+        return added
+
+    def _id_from_info_json(self, path):
+        """yt-dlpの .info.json からアーカイブ用のIDを取得する"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.debug(f"{path} を読み込めませんでした: {e}")
+            return None
+        extractor = info.get("extractor_key") or info.get("extractor")
+        video_id = info.get("id")
+        if not extractor or not video_id:
+            return None
+        return f"{extractor.lower()} {video_id}"
@@ -0,0 +1,392 @@
+"""
+帯域の制御モジュール
+全体とプラットフォームごとのトークンバケットでダウンロード速度を制限する
+yt-dlpの進捗フックで受け取ったバイト数の増分だけトークンを消費し、不足する場合はフックの中で待機する
+プロセス内の全てのダウンロードで共有し、必要であれば同じホストの複数のプロセスでも共有できる
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from .config import get_config_dir
+from .progress import format_bytes
+from .router import classify_url
+
+try:
+    import fcntl
+except ImportError:  # Windowsではプロセス間の共有は使用できない
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 全体の上限を表すバケット名
+GLOBAL_BUCKET = "global"
+
+# バケットに貯められるトークンの量（上限の何秒分か）
+DEFAULT_BURST_SECONDS = 1.0
+
+# 速度の単位
+_RATE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMG]?)(?:i?B)?(?:/s)?\s*$", re.IGNORECASE)
+_RATE_UNITS = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_rate(value):
+    """
+    "5M" や "500K" のような文字列をバイト毎秒に変換する
+
+    Args:
+        value (str): 速度の文字列（単位はK, M, G。1024倍単位。"0"は無制限）
+
+    Returns:
+        int: バイト毎秒（無制限の場合は0）
+
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    match = _RATE_RE.match(str(value))
+    if not match:
+        raise ValueError(f"速度の指定が正しくありません: {value}")
+    return int(float(match.group(1)) * _RATE_UNITS[match.group(2).upper()])
+
+
+def parse_platform_rates(values):
+    """
+    "platform=RATE" 形式の文字列のリストをプラットフォームごとの速度の上限に変換する
+
+    Args:
+        values (list): "youtube=2M" のような文字列のリスト（カンマ区切りも可）
+
+    Returns:
+        dict: プラットフォーム名をキーとした速度の上限（バイト毎秒）
+
+    Raises:
+        ValueError: 形式が正しくない場合
+    """
+    rates = {}
+    for value in values or []:
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            platform, sep, rate = item.partition("=")
+            if not sep:
+                raise ValueError(f"速度の指定が正しくありません: {item}")
+            rates[platform.strip().lower()] = parse_rate(rate)
+    return rates
+
+
+def get_shared_state_path():
+    """
+    プロセス間で帯域を共有するための状態ファイルのパスを取得する
+
+    Returns:
+        str: ~/.datascoop/bandwidth.json
+    """
+    return os.path.join(get_config_dir(), "bandwidth.json")
+
+
+def _refill(state, rate, now, burst_seconds):
+    """トークンを補充したバケットの状態を返す"""
+    capacity = rate * burst_seconds
+    if state is None:
+        return capacity, now
+    tokens, updated = state
+    return min(capacity, tokens + max(0.0, now - updated) * rate), now
+
+
+class LocalBucketStore:
+    """プロセス内で共有するトークンバケットの状態"""
+
+    def __init__(self, burst_seconds=DEFAULT_BURST_SECONDS):
+        self.burst_seconds = burst_seconds
+        self._lock = threading.Lock()
+        self._rates = {}
+        self._states = {}
+
+    def set_rate(self, name, rate):
+        """バケットの速度の上限を設定する（Noneの場合は無制限）"""
+        with self._lock:
+            if rate:
+                self._rates[name] = rate
+            else:
+                self._rates.pop(name, None)
+            self._states.pop(name, None)
+
+    def rates(self):
+        """速度の上限が設定されているバケットと上限の辞書を取得する"""
+        with self._lock:
+            return dict(self._rates)
+
+    def consume(self, names, nbytes):
+        """
+        バケットからトークンを消費し、待機する必要がある秒数を返す
+        不足分は借りとして記録し、後続の消費を待たせる
+        """
+        now = time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for name in names:
+                rate = self._rates.get(name)
+                if not rate:
+                    continue
+                tokens, updated = _refill(self._states.get(name), rate, now, self.burst_seconds)
+                tokens -= nbytes
+                self._states[name] = (tokens, updated)
+                if tokens < 0:
+                    wait = max(wait, -tokens / rate)
+        return wait
+
+
+class SharedBucketStore:
+    """
+    同じホストの複数のプロセスで共有するトークンバケットの状態
+    状態はファイルに保存し、更新のたびにファイルをロックする
+    """
+
+    def __init__(self, path, burst_seconds=DEFAULT_BURST_SECONDS):
+        self.path = path
+        self.burst_seconds = burst_seconds
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _update(self, func):
+        """ファイルをロックして状態を読み込み、funcで更新して書き戻す"""
+        with self._lock, open(self.path, "a+", encoding="utf-8") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    data = json.loads(f.read() or "{}")
+                except ValueError:
+                    data = {}
+                data.setdefault("rates", {})
+                data.setdefault("states", {})
+                result = func(data)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(data))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def set_rate(self, name, rate):
+        """バケットの速度の上限を設定する（他のプロセスにも反映される）"""
+        def update(data):
+            if rate:
+                data["rates"][name] = rate
+            else:
+                data["rates"].pop(name, None)
+            data["states"].pop(name, None)
+        self._update(update)
+
+    def rates(self):
+        """速度の上限が設定されているバケットと上限の辞書を取得する"""
+        return self._update(lambda data: dict(data["rates"]))
+
+    def consume(self, names, nbytes):
+        """バケットからトークンを消費し、待機する必要がある秒数を返す"""
+        def update(data):
+            # プロセス間で比較できる時刻を使用する
+            now = time.time()
+            wait = 0.0
+            for name in names:
+                rate = data["rates"].get(name)
+                if not rate:
+                    continue
+                state = data["states"].get(name)
+                tokens, updated = _refill(tuple(state) if state else None, rate, now, self.burst_seconds)
+                tokens -= nbytes
+                data["states"][name] = [tokens, updated]
+                if tokens < 0:
+                    wait = max(wait, -tokens / rate)
+            return wait
+        return self._update(update)
+
+
+class BandwidthScheduler:
+    """
+    ダウンロード速度を制限するクラス
+    全体の上限とプラットフォームごとの上限を、それぞれトークンバケットで管理する
+    """
+
+    def __init__(self, limit=None, platform_limits=None, shared_path=None, burst_seconds=DEFAULT_BURST_SECONDS):
+        """
+        コンストラクタ
+
+        Args:
+            limit (int, optional): 全体の速度の上限（バイト毎秒、0の場合は無制限、Noneの場合は変更しない）
+            platform_limits (dict, optional): プラットフォーム名をキーとした速度の上限（バイト毎秒）
+            shared_path (str, optional): 複数のプロセスで上限を共有する場合の状態ファイルのパス
+                （設定した上限は同じファイルを使用する全てのプロセスに反映される）
+            burst_seconds (float): バケットに貯められるトークンの量（上限の何秒分か）
+        """
+        if shared_path and fcntl is None:
+            logger.warning("この環境ではプロセス間で帯域を共有できないため、プロセス内でのみ制限します")
+            shared_path = None
+        self.shared_path = shared_path
+        if shared_path:
+            self._store = SharedBucketStore(shared_path, burst_seconds)
+        else:
+            self._store = LocalBucketStore(burst_seconds)
+        self._lock = threading.Lock()
+        self._positions = {}
+        self._bytes = {}
+        self._started_at = None
+        self._limited = False
+
+        if limit is not None:
+            self.set_limit(limit)
+        for platform, rate in (platform_limits or {}).items():
+            self.set_limit(rate, platform=platform)
+        if shared_path:
+            # 他のプロセスが設定した上限も対象にする
+            self._limited = bool(self._store.rates())
+
+    def set_limit(self, rate, platform=None):
+        """
+        速度の上限を変更する（ダウンロード中でも次の進捗通知から反映される）
+
+        Args:
+            rate (int): 速度の上限（バイト毎秒、Noneまたは0の場合は無制限）
+            platform (str, optional): プラットフォーム名（省略時は全体の上限）
+        """
+        self._store.set_rate(platform or GLOBAL_BUCKET, rate)
+        self._limited = bool(self._store.rates())
+        scope = platform or "全体"
+        if rate:
+            logger.info(f"帯域の上限を設定しました: {scope} {format_bytes(rate)}/s")
+        else:
+            logger.info(f"帯域の上限を解除しました: {scope}")
+
+    def limits(self):
+        """
+        現在の速度の上限を取得する
+
+        Returns:
+            dict: バケット名（"global" またはプラットフォーム名）をキーとした上限（バイト毎秒）
+        """
+        return self._store.rates()
+
+    def throttle(self, platform, nbytes):
+        """
+        ダウンロードしたバイト数を記録し、上限を超えている場合は待機する
+
+        Args:
+            platform (str): プラットフォーム名
+            nbytes (int): 前回の呼び出しからダウンロードしたバイト数
+
+        Returns:
+            float: 待機した秒数
+        """
+        if nbytes <= 0:
+            return 0.0
+        with self._lock:
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            for name in (GLOBAL_BUCKET, platform):
+                self._bytes[name] = self._bytes.get(name, 0) + nbytes
+        if not self._limited and not self.shared_path:
+            return 0.0
+        wait = self._store.consume((GLOBAL_BUCKET, platform), nbytes)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def progress_hook(self, d):
+        """
+        yt-dlpの進捗フック
+        ダウンロード済みバイト数の増分だけトークンを消費する（ダウンロードを行うスレッドで待機する）
+
+        Args:
+            d (dict): yt-dlpの進捗フックに渡される進捗情報
+        """
+        # 完了の通知にはtmpfilenameが含まれないため、すべての通知に含まれる最終的なファイル名で識別する
+        key = d.get("filename")
+        status = d.get("status")
+        if status == "downloading":
+            downloaded = d.get("downloaded_bytes") or 0
+            with self._lock:
+                previous = self._positions.get(key, 0)
+                self._positions[key] = downloaded
+            info = d.get("info_dict") or {}
+            url = info.get("webpage_url") or info.get("original_url") or info.get("url") or ""
+            # 再開などでバイト数が減った場合は消費しない
+            self.throttle(classify_url(url).platform, downloaded - previous)
+        elif status in ("finished", "error"):
+            with self._lock:
+                self._positions.pop(key, None)
+
+    def report(self):
+        """
+        許可された速度と実際の速度を取得する（実際の速度はこのプロセスでの値）
+
+        Returns:
+            dict: バケット名をキーとし、allowed（上限、バイト毎秒またはNone）、
+                achieved（最初のダウンロードからの平均速度）、bytes（ダウンロードしたバイト数）を持つ辞書
+        """
+        limits = self.limits()
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at if self._started_at is not None else 0.0
+            counts = dict(self._bytes)
+        names = [GLOBAL_BUCKET, *sorted((set(counts) | set(limits)) - {GLOBAL_BUCKET})]
+        return {
+            name: {
+                "allowed": limits.get(name),
+                "achieved": counts.get(name, 0) / elapsed if elapsed > 0 else 0.0,
+                "bytes": counts.get(name, 0),
+            }
+            for name in names
+        }
+
+    def log_report(self, log=None):
+        """許可された速度と実際の速度をログに出力する"""
+        log = log or logger
+        # 上限を設定していない場合は詳細ログにのみ出力する
+        emit = log.info if self.limits() else log.debug
+        for name, stats in self.report().items():
+            if not stats["bytes"] and not stats["allowed"]:
+                continue
+            allowed = f"{format_bytes(stats['allowed'])}/s" if stats["allowed"] else "無制限"
+            scope = "全体" if name == GLOBAL_BUCKET else name
+            emit(
+                f"帯域: {scope} 実際 {format_bytes(stats['achieved'])}/s / 上限 {allowed} "
+                f"({format_bytes(stats['bytes'])})"
+            )
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_bandwidth_scheduler():
+    """
+    共有の帯域制御を取得する
+
+    Returns:
+        BandwidthScheduler: プロセス内で共有される帯域制御（未設定の場合は無制限）
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = BandwidthScheduler()
+        return _default_scheduler
+
+
+def configure_bandwidth(**kwargs):
+    """
+    共有の帯域制御を設定し直す
+
+    Args:
+        **kwargs: BandwidthSchedulerのコンストラクタの引数 (limit, platform_limits, shared_path など)
+
+    Returns:
+        BandwidthScheduler: 新しく設定した帯域制御
+    """
+    global _default_scheduler
+    with _default_scheduler_lock:
+        _default_scheduler = BandwidthScheduler(**kwargs)
+        return _default_scheduler
@@ -0,0 +1,217 @@
+"""
+yt-dlpのメタデータ（extract_infoの結果）をディスクにキャッシュするモジュール
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from .config import get_config_dir
+from .helpers import get_platform_from_url, extract_content_id
+from .metrics import get_metrics, STAGE_EXTRACT
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataCache:
+    """
+    extract_infoの結果を ~/.datascoop/cache/metadata 配下に保存するクラス
+    エントリはプラットフォームと動画IDをキーとし、有効期限（TTL）と合計サイズの上限を持つ
+    """
+
+    DEFAULT_TTL = 6 * 60 * 60  # 6時間
+    DEFAULT_MAX_BYTES = 128 * 1024 * 1024  # 128MB
+
+    def __init__(self, cache_dir=None, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        コンストラクタ
+
+        Args:
+            cache_dir (str, optional): キャッシュの保存先ディレクトリ
+            ttl (float): エントリの有効期限（秒）
+            max_bytes (int): キャッシュ全体の最大サイズ（バイト）
+        """
+        self.cache_dir = cache_dir or os.path.join(get_config_dir(), "cache", "metadata")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, url, variant=None):
+        """
+        URLからキャッシュキーを生成する
+
+        Args:
+            url (str): 動画URL
+            variant (str, optional): 抽出オプションの違いを区別するための識別子
+
+        Returns:
+            str: ファイル名として使用できるキャッシュキー
+        """
+        content = extract_content_id(url)
+        if content:
+            platform, video_id = content
+        else:
+            # IDを取り出せないURLはURL全体のハッシュで識別する
+            platform = get_platform_from_url(url)
+            video_id = hashlib.sha1(url.strip().encode("utf-8")).hexdigest()[:20]
+        key = f"{platform}-{video_id}"
+        if variant:
+            key += f"-{variant}"
+        return key
+
+    def _path_for(self, key):
+        """キャッシュキーに対応するファイルパスを取得"""
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url, variant=None):
+        """
+        キャッシュからメタデータを取得する
+
+        Args:
+            url (str): 動画URL
+            variant (str, optional): 抽出オプションの識別子
+
+        Returns:
+            dict: キャッシュされたメタデータ。存在しないか期限切れの場合はNone
+        """
+        path = self._path_for(self.make_key(url, variant))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.debug(f"キャッシュの読み込みに失敗しました: {path}: {e}")
+            return None
+
+        if time.time() - entry.get("cached_at", 0) > self.ttl:
+            logger.debug(f"キャッシュの有効期限が切れています: {url}")
+            self._remove(path)
+            return None
+
+        # 最近使用したエントリが削除されにくいように更新日時を更新する
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        logger.debug(f"キャッシュからメタデータを取得しました: {url}")
+        return entry.get("info")
+
+    def set(self, url, info, variant=None):
+        """
+        メタデータをキャッシュに保存する
+
+        Args:
+            url (str): 動画URL
+            info (dict): JSONに変換可能なメタデータ
+            variant (str, optional): 抽出オプションの識別子
+        """
+        path = self._path_for(self.make_key(url, variant))
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entry = {"url": url, "cached_at": time.time(), "info": info}
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False, default=str)
+            # 書き込み途中のファイルを読まれないよう、アトミックに置き換える
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"キャッシュの保存に失敗しました: {path}: {e}")
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    def invalidate(self, url, variant=None):
+        """指定したURLのエントリを削除する"""
+        self._remove(self._path_for(self.make_key(url, variant)))
+
+    def clear(self):
+        """全てのエントリを削除する"""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".json"):
+                self._remove(os.path.join(self.cache_dir, name))
+
+    def _evict(self):
+        """合計サイズが上限を超えた場合、最も長く使われていないエントリから削除する"""
+        with self._lock:
+            entries = []
+            total = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            for _, size, path in sorted(entries):
+                self._remove(path)
+                total -= size
+                if total <= self.max_bytes:
+                    break
+
+    def _remove(self, path):
+        """ファイルを削除する（存在しない場合は無視）"""
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_metadata_cache():
+    """
+    共有のメタデータキャッシュを取得する
+
+    Returns:
+        MetadataCache: プロセス内で共有されるキャッシュ
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MetadataCache()
+        return _default_cache
+
+
+def cached_extract_info(url, ydl_opts=None, use_cache=True, variant=None, cache=None):
+    """
+    キャッシュを利用してyt-dlpのextract_info(download=False)を実行する
+
+    Args:
+        url (str): 動画URL
+        ydl_opts (dict, optional): yt-dlpのオプション
+        use_cache (bool): Falseの場合はキャッシュを読まずに再取得する（結果はキャッシュに保存される）
+        variant (str, optional): 抽出オプションの識別子
+        cache (MetadataCache, optional): 使用するキャッシュ（省略時は共有キャッシュ）
+
+    Returns:
+        dict: JSONに変換可能なメタデータ
+
+    Raises:
+        yt_dlp.utils.DownloadError: メタデータの取得に失敗した場合
+    """
+    cache = cache or get_metadata_cache()
+    if use_cache:
+        info = cache.get(url, variant)
+        if info is not None:
+            return info
+
+    import yt_dlp
+
+    with get_metrics().stage(STAGE_EXTRACT, url=url), yt_dlp.YoutubeDL(ydl_opts or {}) as ydl:
+        info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+
+    if info is not None:
+        cache.set(url, info, variant)
+    return info
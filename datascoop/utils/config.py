@@ -9,6 +9,17 @@ from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+def get_config_dir():
+    """
+    設定ディレクトリを取得する（なければ作成）
+    
+    Returns:
+        str: ホームディレクトリ配下の .datascoop ディレクトリのパス
+    """
+    config_dir = os.path.join(str(Path.home()), ".datascoop")
+    os.makedirs(config_dir, exist_ok=True)
+    return config_dir
+
 class ConfigManager:
     """設定の保存・読み込みを管理するクラス"""
     
@@ -21,6 +32,11 @@ class ConfigManager:
         "audio_format": "mp3",     # mp3, m4a, wav, flac
         "subtitles": False,
         "verbose": False,
+        "progress_interval": 0.5,  # 進捗表示を更新する最短間隔（秒）
+        "throughput_profile": "balanced",  # conservative, balanced, datacenter
+        "bandwidth_limit": None,   # 全体の速度の上限 (例: "5M"、Noneの場合は無制限)
+        "platform_bandwidth_limits": {},  # プラットフォームごとの速度の上限 (例: {"youtube": "2M"})
+        "shared_bandwidth": False, # 同じホストの他のプロセスと速度の上限を共有するか
         "use_original_title": True, # コンテンツ元のタイトルをそのまま使用するか
         "file_organization": "none", # none, platform, format, both
         "use_platform_subdirs": False, # プラットフォームごとのサブディレクトリを使用するか
@@ -61,6 +77,32 @@ class ConfigManager:
         }
     }
     
+    # 通信量に関するプロファイル（HLS/DASHの断片の同時取得数、チャンクサイズなど）
+    THROUGHPUT_PROFILES = {
+        "conservative": {  # 回線や配信元への負荷を抑える
+            "concurrent_fragment_downloads": 1,
+            "http_chunk_size": 10 * 1024 * 1024,
+            "buffersize": 16 * 1024,
+            "fragment_retries": 10,
+            "retries": 10,
+        },
+        "balanced": {  # 一般的な家庭用回線向け
+            "concurrent_fragment_downloads": 4,
+            "http_chunk_size": 10 * 1024 * 1024,
+            "buffersize": 64 * 1024,
+            "fragment_retries": 10,
+            "retries": 10,
+        },
+        "datacenter": {  # 高速・低遅延な回線向け
+            "concurrent_fragment_downloads": 16,
+            "http_chunk_size": 50 * 1024 * 1024,
+            "buffersize": 1024 * 1024,
+            "noresizebuffer": True,
+            "fragment_retries": 20,
+            "retries": 20,
+        },
+    }
+    
     def __init__(self):
         """初期化"""
         self.config = self.DEFAULT_CONFIG.copy()
@@ -70,9 +112,7 @@ class ConfigManager:
     def _get_config_dir(self):
         """設定ディレクトリを取得（なければ作成）"""
         # ホームディレクトリ配下の .datascoop ディレクトリ
-        config_dir = os.path.join(str(Path.home()), ".datascoop")
-        os.makedirs(config_dir, exist_ok=True)
-        return config_dir
+        return get_config_dir()
         
     def load_config(self):
         """設定ファイルからロード"""
@@ -121,6 +161,19 @@ class ConfigManager:
             return self.QUALITY_MAP["audio"].get(quality, "192K")
         return "best"
         
+    def get_throughput_options(self, profile=None):
+        """
+        通信量に関するプロファイルからyt-dlpのオプションを取得
+        
+        Args:
+            profile (str, optional): プロファイル名（省略時は設定値）
+            
+        Returns:
+            dict: yt-dlpのオプション
+        """
+        profile = profile or self.config.get("throughput_profile", "balanced")
+        return dict(self.THROUGHPUT_PROFILES.get(profile, self.THROUGHPUT_PROFILES["balanced"]))
+        
     def print_current_config(self):
         """現在の設定を表示"""
         print("\n設定:")
@@ -137,6 +190,8 @@ class ConfigManager:
             
         print(f"- 字幕ダウンロード: {'はい' if self.config['subtitles'] else 'いいえ'}")
         print(f"- オリジナルタイトル使用: {'はい' if self.config.get('use_original_title', True) else 'いいえ'}")
+        print(f"- 通信プロファイル: {self.config.get('throughput_profile', 'balanced')}")
+        print(f"- 帯域の上限: {self.config.get('bandwidth_limit') or '無制限'}")
         
         # ファイル整理方法の表示
         file_organization = self.config.get('file_organization', 'none')
@@ -4,10 +4,14 @@
 import os
 import re
 import logging
-from urllib.parse import urlparse, parse_qs
+from .router import classify_url, extract_youtube_video_id, KIND_VIDEO
 
 logger = logging.getLogger(__name__)
 
+# ファイル名に使用できない文字と連続する空白
+_INVALID_FILENAME_CHARS_RE = re.compile(r'[\\/*?:"<>|]')
+_WHITESPACE_RE = re.compile(r'\s+')
+
 def setup_logger():
     """
     ロガーの設定
@@ -37,8 +41,8 @@ def sanitize_filename(filename):
         str: 有効なファイル名
     """
     # ファイルシステムで無効な文字を削除または置換
-    s = re.sub(r'[\\/*?:"<>|]', "", filename)
-    s = re.sub(r'\s+', '_', s)  # スペースをアンダースコアに置換
+    s = _INVALID_FILENAME_CHARS_RE.sub("", filename)
+    s = _WHITESPACE_RE.sub('_', s)  # スペースをアンダースコアに置換
     return s
 
 def extract_video_id(url):
@@ -51,33 +55,23 @@ def extract_video_id(url):
     Returns:
         str: 動画ID、または抽出できない場合はNone
     """
-    # YouTubeショートを先に判定
-    shorts_regex = r'(https?://)?(www\.)?youtube\.com/shorts/([^&=%\?]{11})'
-    shorts_match = re.search(shorts_regex, url) # re.search を使用
-    if shorts_match:
-        return shorts_match.group(3) # VIDEO_ID は3番目のキャプチャグループ
-    
-    # 通常のYouTube動画
-    youtube_regex = (
-        r'(https?://)?(www\.)?'
-        r'(youtube|youtu|youtube-nocookie)\.(com|be)/'
-        r'(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-    )
-    
-    youtube_match = re.match(youtube_regex, url)
-    if youtube_match:
-        return youtube_match.group(6)
-    
-    # URLからshortsパターンを検出できない場合のフォールバック
-    if '/shorts/' in url:
-        parts = url.split('/shorts/')
-        if len(parts) > 1:
-            # パラメータがある場合は除去
-            video_id = parts[1].split('?')[0].split('&')[0]
-            if len(video_id) == 11:  # YouTubeのIDは11文字
-                return video_id
+    return extract_youtube_video_id(url)
+
+def extract_content_id(url):
+    """
+    URLからプラットフォーム固有のコンテンツIDを抽出する
     
-    return None
+    Args:
+        url (str): 動画URL
+        
+    Returns:
+        tuple: (プラットフォーム名, コンテンツID)。IDを特定できない場合はNone
+    """
+    # 再生リストや作品のURLは1件のコンテンツを表さないため対象外
+    route = classify_url(url)
+    if route.kind != KIND_VIDEO or not route.content_id:
+        return None
+    return route.platform, route.content_id
 
 def get_platform_from_url(url):
     """
@@ -89,42 +83,32 @@ def get_platform_from_url(url):
     Returns:
         str: プラットフォーム名 (例: 'youtube', 'niconico', 'unknown')
     """
-    parsed_url = urlparse(url)
-    domain = parsed_url.netloc.lower()
-    
-    if 'youtube' in domain or 'youtu.be' in domain:
-        return 'youtube'
-    elif 'nicovideo' in domain or 'nico.ms' in domain:
-        return 'niconico'
-    elif 'abema' in domain:
-        return 'abema'
-    else:
-        return 'unknown'
+    return classify_url(url).platform
 
-def check_available_formats(url):
+def check_available_formats(url, use_cache=True):
     """
     利用可能なフォーマット一覧を取得する
     
     Args:
         url (str): 動画URL
+        use_cache (bool): メタデータキャッシュを使用するかどうか
         
     Returns:
         list: 利用可能なフォーマット情報のリスト
     """
-    import yt_dlp
+    from .cache import cached_extract_info
     
     ydl_opts = {
-        'listformats': True,
         'quiet': True,
+        'noplaylist': True,
         'skip_download': True,
     }
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            if 'formats' in info:
-                return info['formats']
-            return []
+        info = cached_extract_info(url, ydl_opts, use_cache=use_cache)
+        if info and 'formats' in info:
+            return info['formats']
+        return []
     except Exception as e:
         logger.error(f"フォーマット一覧の取得中にエラーが発生しました: {e}")
         return []
@@ -0,0 +1,163 @@
+"""
+バッチ処理・対話モードの進行状況を記録するジョブジャーナル
+1行に1件のJSONを追記する形式で、処理が中断されても途中から再開できる
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# URLごとの状態
+QUEUED = "queued"
+EXTRACTING = "extracting"
+DOWNLOADING = "downloading"
+POST_PROCESSING = "post-processing"
+DONE = "done"
+FAILED = "failed"
+
+STATES = (QUEUED, EXTRACTING, DOWNLOADING, POST_PROCESSING, DONE, FAILED)
+
+
+class JobJournal:
+    """
+    URLごとの状態遷移を追記専用のJSON Linesファイルに記録するクラス
+    """
+
+    def __init__(self, path, resume=False):
+        """
+        コンストラクタ
+
+        Args:
+            path (str): ジャーナルファイルのパス
+            resume (bool): Trueの場合は既存の記録を引き継ぐ。Falseの場合は新しく記録を始める
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._states = {}
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        if resume:
+            self._replay()
+        mode = "a" if resume else "w"
+        self._file = open(path, mode, encoding="utf-8")
+
+    def _replay(self):
+        """既存のジャーナルを読み込み、URLごとの最新の状態を復元する"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # 異常終了時に書きかけになった行は無視する
+                    continue
+                if entry.get("url") and entry.get("state") in STATES:
+                    self._states[entry["url"]] = (entry["state"], entry.get("reason"))
+        logger.debug(f"ジャーナルを読み込みました: {self.path} ({len(self._states)}件)")
+
+    def record(self, url, state, reason=None):
+        """
+        URLの状態を記録する
+
+        Args:
+            url (str): 対象のURL
+            state (str): 状態 (queued, extracting, downloading, post-processing, done, failed)
+            reason (str, optional): 失敗した理由など
+        """
+        if state not in STATES:
+            raise ValueError(f"不明な状態です: {state}")
+        entry = {"time": time.time(), "url": url, "state": state}
+        if reason:
+            entry["reason"] = reason
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self._states[url] = (state, reason)
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            if state in (DONE, FAILED):
+                # 完了・失敗は再開時の判断に使うため、確実にディスクへ書き出す
+                os.fsync(self._file.fileno())
+
+    def state_of(self, url):
+        """URLの最新の状態を取得する（記録がない場合はNone）"""
+        with self._lock:
+            entry = self._states.get(url)
+        return entry[0] if entry else None
+
+    def is_done(self, url):
+        """URLの処理が完了しているかどうか"""
+        return self.state_of(url) == DONE
+
+    def unfinished(self):
+        """完了していないURLのリストを記録順に取得する"""
+        with self._lock:
+            return [url for url, (state, _) in self._states.items() if state != DONE]
+
+    def failures(self):
+        """失敗したURLと理由のリストを取得する"""
+        with self._lock:
+            return [(url, reason) for url, (state, reason) in self._states.items() if state == FAILED]
+
+    def write_retry_file(self, path):
+        """
+        失敗したURLのみを含むバッチファイルを書き出す
+
+        Args:
+            path (str): 書き出すバッチファイルのパス
+
+        Returns:
+            int: 書き出したURLの数
+        """
+        failures = self.failures()
+        with open(path, "w", encoding="utf-8") as f:
+            for url, reason in failures:
+                if reason:
+                    f.write(f"# {reason}\n")
+                f.write(f"{url}\n")
+        return len(failures)
+
+    def progress_hook(self, url):
+        """
+        yt-dlpの進捗フックから状態を記録する関数を作成する
+
+        Args:
+            url (str): 対象のURL
+
+        Returns:
+            callable: progress_hooksに渡すフック関数
+        """
+        last = {"state": None}
+
+        def hook(d):
+            if d.get("status") == "downloading":
+                state = DOWNLOADING
+            elif d.get("status") == "finished":
+                state = POST_PROCESSING
+            else:
+                return
+            # 進捗フックは何度も呼ばれるため、状態が変わった時のみ記録する
+            if last["state"] != state:
+                last["state"] = state
+                self.record(url, state)
+
+        return hook
+
+    def close(self):
+        """ジャーナルを閉じる"""
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,147 @@
+"""
+メタデータのみを取得するモード（--metadata-only）の記録を作成・出力するモジュール
+yt-dlpのメタデータからタイトル・再生時間・チャプター・フォーマット・字幕などを抜き出し、
+1行に1件のJSONとして書き出す
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 標準出力に書き出すことを示すファイル名
+STDOUT_FILE = "-"
+
+# 出力ファイルのデフォルト名（出力ディレクトリ内に作成する）
+DEFAULT_FILENAME = "metadata.jsonl"
+
+# 記録に含める動画の項目
+VIDEO_FIELDS = (
+    "id", "title", "webpage_url", "channel", "channel_id", "uploader", "uploader_id",
+    "upload_date", "timestamp", "duration", "view_count", "like_count", "live_status", "thumbnail",
+)
+
+# 記録に含めるフォーマットの項目（記録内の名前, yt-dlpの項目）
+FORMAT_FIELDS = (
+    ("id", "format_id"), ("ext", "ext"), ("width", "width"), ("height", "height"), ("fps", "fps"),
+    ("vcodec", "vcodec"), ("acodec", "acodec"), ("tbr", "tbr"), ("protocol", "protocol"),
+)
+
+
+def _compact(values):
+    """値がNoneの項目を除いた辞書を返す"""
+    return {key: value for key, value in values.items() if value is not None}
+
+
+def compact_record(info, url=None):
+    """
+    yt-dlpのメタデータから、1件の動画の記録を作成する
+    フォーマットのURLやHTTPヘッダーなど、ダウンロードにのみ使用する情報は含めない
+
+    Args:
+        info (dict): 1件の動画のメタデータ
+        url (str, optional): 取得に使用したURL
+
+    Returns:
+        dict: JSONに変換可能な記録
+    """
+    record = {"url": url or info.get("webpage_url") or info.get("url"), "extractor": info.get("extractor_key")}
+    record.update((field, info.get(field)) for field in VIDEO_FIELDS)
+    if info.get("playlist_index") is not None:
+        record.update(playlist=info.get("playlist"), playlist_index=info.get("playlist_index"))
+
+    record["chapters"] = [
+        _compact({"start": c.get("start_time"), "end": c.get("end_time"), "title": c.get("title")})
+        for c in info.get("chapters") or []
+    ]
+    record["formats"] = [
+        _compact({
+            **{name: fmt.get(field) for name, field in FORMAT_FIELDS},
+            "filesize": fmt.get("filesize") or fmt.get("filesize_approx"),
+        })
+        for fmt in info.get("formats") or []
+    ]
+    record["subtitles"] = sorted(info.get("subtitles") or {})
+    record["automatic_captions"] = sorted(info.get("automatic_captions") or {})
+
+    # 字幕やサムネイルを保存した場合はファイルパスを記録する
+    files = [sub["filepath"] for sub in (info.get("requested_subtitles") or {}).values() if sub.get("filepath")]
+    files += [thumb["filepath"] for thumb in info.get("thumbnails") or [] if thumb.get("filepath")]
+    if files:
+        record["files"] = files
+    return _compact(record)
+
+
+def iter_records(info, url=None):
+    """
+    メタデータから記録を作成する。プレイリストの場合は動画ごとの記録を返す
+
+    Args:
+        info (dict): extract_infoの戻り値
+        url (str, optional): 取得に使用したURL
+
+    Yields:
+        dict: 1件の動画の記録
+    """
+    if info.get("_type") in ("playlist", "multi_video"):
+        for entry in info.get("entries") or []:
+            if entry:
+                # 動画ごとの記録には動画自身のURLを使用する
+                yield from iter_records(entry)
+        return
+    yield compact_record(info, url)
+
+
+class MetadataWriter:
+    """
+    記録をJSON Linesファイルに1行ずつ書き出すクラス
+    複数のワーカースレッドから同時に書き込んでも行が混ざらないようにする
+    """
+
+    def __init__(self, path, append=False):
+        """
+        コンストラクタ
+
+        Args:
+            path (str): 出力ファイルのパス（"-"の場合は標準出力）
+            append (bool): Trueの場合は既存のファイルに追記する
+        """
+        self.path = path
+        self.count = 0
+        self._lock = threading.Lock()
+        if path == STDOUT_FILE:
+            self._file = sys.stdout
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._file = open(path, "a" if append else "w", encoding="utf-8")
+
+    def write(self, record):
+        """
+        記録を1行書き出す
+
+        Args:
+            record (dict): 書き出す記録
+        """
+        line = json.dumps({**record, "fetched_at": time.time()}, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.count += 1
+
+    def close(self):
+        """出力ファイルを閉じる（標準出力は閉じない）"""
+        with self._lock:
+            if self._file is not sys.stdout and not self._file.closed:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
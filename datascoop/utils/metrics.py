@@ -0,0 +1,361 @@
+"""
+処理の段階ごとの計測モジュール
+抽出・転送・後処理（ffmpeg）・ディレクトリの準備の所要時間、転送量、平均と最大の速度、再試行の回数を記録し、
+JSON Lines と Prometheus の textfile 形式で書き出す
+"""
+
+import os
+import json
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from .router import classify_url
+
+logger = logging.getLogger(__name__)
+
+# 段階の名前
+STAGE_SETUP = "setup"              # 出力ディレクトリの準備
+STAGE_EXTRACT = "extract"          # メタデータの抽出（ダウンロード開始までの時間を含む）
+STAGE_TRANSFER = "transfer"        # ファイルの転送
+STAGE_POSTPROCESS = "postprocess"  # ffmpegによる結合・変換などの後処理
+STAGE_DOWNLOAD = "download"        # 1件のダウンロード全体
+
+# 集計結果に表示するパーセンタイル
+QUANTILES = (0.5, 0.95)
+
+
+def percentile(values, q):
+    """
+    パーセンタイルを計算する（最近傍順位法）
+
+    Args:
+        values (list): 昇順に並んだ値のリスト
+        q (float): 0から1の割合
+
+    Returns:
+        float: パーセンタイルの値（値がなければNone）
+    """
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(q * len(values)) - 1))
+    return values[index]
+
+
+def _platform_of(url):
+    """URLからプラットフォーム名を取得する（URLがなければunknown）"""
+    return classify_url(url).platform if url else "unknown"
+
+
+class MetricsRecorder:
+    """
+    段階ごとの所要時間と転送量を記録するクラス
+    記録した計測値はメモリ上で集計し、JSON Linesのファイルが指定されていれば1件ずつ追記する
+    """
+
+    def __init__(self, jsonl_path=None):
+        """
+        コンストラクタ
+
+        Args:
+            jsonl_path (str, optional): 計測値を1件ずつ追記するJSON Linesファイルのパス
+        """
+        self.jsonl_path = jsonl_path
+        self._lock = threading.Lock()
+        self._file = None
+        if jsonl_path:
+            os.makedirs(os.path.dirname(os.path.abspath(jsonl_path)), exist_ok=True)
+            self._file = open(jsonl_path, "a", encoding="utf-8")
+        # (段階, プラットフォーム) ごとの所要時間のリストと失敗の回数
+        self._durations = {}
+        self._failures = {}
+        # プラットフォームごとの転送量・最大の速度・再試行の回数
+        self._bytes = {}
+        self._peak_speeds = {}
+        self._retries = {}
+        # 転送中のファイルごとの状態: filename -> [開始時刻, バイト数, 最大の速度, プラットフォーム, URL]
+        self._transfers = {}
+        # ダウンロードを開始して、まだ転送が始まっていないURLと開始時刻
+        self._awaiting_transfer = {}
+        # 実行中の後処理の開始時刻
+        self._postprocessors = {}
+
+    def record(self, stage, duration, platform="unknown", url=None, ok=True, **fields):
+        """
+        計測値を記録する
+
+        Args:
+            stage (str): 段階の名前
+            duration (float): 所要時間（秒）
+            platform (str): プラットフォーム名
+            url (str, optional): 対象のURL
+            ok (bool): 成功したかどうか
+            **fields: 転送量 (bytes) や速度などの追加の項目
+        """
+        event = {"time": time.time(), "stage": stage, "platform": platform, "duration": round(duration, 6), "ok": ok}
+        if url:
+            event["url"] = url
+        event.update(fields)
+        key = (stage, platform)
+        with self._lock:
+            self._durations.setdefault(key, []).append(duration)
+            if not ok:
+                self._failures[key] = self._failures.get(key, 0) + 1
+            if self._file is not None:
+                self._file.write(json.dumps(event, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    @contextmanager
+    def stage(self, stage, url=None, platform=None):
+        """
+        with文の中の処理の所要時間を記録する（例外が発生した場合は失敗として記録する）
+
+        Args:
+            stage (str): 段階の名前
+            url (str, optional): 対象のURL
+            platform (str, optional): プラットフォーム名（省略時はURLから判定する）
+        """
+        platform = platform or _platform_of(url)
+        started = time.monotonic()
+        if stage == STAGE_DOWNLOAD and url:
+            with self._lock:
+                self._awaiting_transfer[url] = started
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            if stage == STAGE_DOWNLOAD and url:
+                with self._lock:
+                    self._awaiting_transfer.pop(url, None)
+            self.record(stage, time.monotonic() - started, platform, url, ok)
+
+    def record_retries(self, platform, count):
+        """
+        再試行の回数を記録する
+
+        Args:
+            platform (str): プラットフォーム名
+            count (int): 再試行の回数
+        """
+        if count <= 0:
+            return
+        with self._lock:
+            self._retries[platform] = self._retries.get(platform, 0) + count
+
+    def progress_hook(self, d):
+        """
+        yt-dlpの進捗フック
+        ダウンロードの開始から最初の進捗までを抽出、最初の進捗から完了までを転送として記録する
+
+        Args:
+            d (dict): yt-dlpの進捗フックに渡される進捗情報
+        """
+        status = d.get("status")
+        # 完了の通知にはtmpfilenameが含まれないため、すべての通知に含まれる最終的なファイル名で識別する
+        key = d.get("filename")
+        if not key or status not in ("downloading", "finished", "error"):
+            return
+        now = time.monotonic()
+        info = d.get("info_dict") or {}
+        url = info.get("original_url") or info.get("webpage_url")
+        extracted = None
+        with self._lock:
+            state = self._transfers.get(key)
+            if state is None:
+                state = self._transfers[key] = [now, 0, 0.0, _platform_of(url), url]
+                started = self._awaiting_transfer.pop(url, None) if url else None
+                if started is not None:
+                    extracted = now - started
+            downloaded = d.get("downloaded_bytes") or d.get("total_bytes") or 0
+            state[1] = max(state[1], downloaded)
+            state[2] = max(state[2], d.get("speed") or 0.0)
+            if status != "downloading":
+                del self._transfers[key]
+        if extracted is not None:
+            self.record(STAGE_EXTRACT, extracted, state[3], url)
+        if status == "downloading":
+            return
+        started_at, nbytes, peak, platform, url = state
+        duration = d.get("elapsed") or (now - started_at)
+        with self._lock:
+            self._bytes[platform] = self._bytes.get(platform, 0) + nbytes
+            self._peak_speeds[platform] = max(self._peak_speeds.get(platform, 0.0), peak)
+        self.record(
+            STAGE_TRANSFER, duration, platform, url, status == "finished",
+            bytes=nbytes, avg_speed=round(nbytes / duration, 1) if duration > 0 else None, peak_speed=round(peak, 1)
+        )
+
+    def postprocessor_hook(self, d):
+        """
+        yt-dlpの後処理フック
+        ffmpegによる結合や音声の抽出などの所要時間を記録する
+
+        Args:
+            d (dict): yt-dlpの後処理フックに渡される情報
+        """
+        info = d.get("info_dict") or {}
+        url = info.get("original_url") or info.get("webpage_url")
+        key = (threading.get_ident(), d.get("postprocessor"), info.get("id"))
+        now = time.monotonic()
+        with self._lock:
+            if d.get("status") == "started":
+                self._postprocessors[key] = now
+                return
+            started = self._postprocessors.pop(key, None)
+        if started is not None:
+            self.record(STAGE_POSTPROCESS, now - started, _platform_of(url), url, d.get("status") == "finished",
+                        postprocessor=d.get("postprocessor"))
+
+    def summary(self):
+        """
+        段階とプラットフォームごとの集計結果を取得する
+
+        Returns:
+            dict: (段階, プラットフォーム) をキーとし、count, failures, total, p50, p95 を持つ辞書
+        """
+        with self._lock:
+            durations = {key: sorted(values) for key, values in self._durations.items()}
+            failures = dict(self._failures)
+        return {
+            key: {
+                "count": len(values),
+                "failures": failures.get(key, 0),
+                "total": sum(values),
+                **{f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES},
+            }
+            for key, values in durations.items()
+        }
+
+    def totals(self):
+        """
+        プラットフォームごとの転送量・最大の速度・再試行の回数を取得する
+
+        Returns:
+            dict: プラットフォーム名をキーとし、bytes, peak_speed, retries を持つ辞書
+        """
+        with self._lock:
+            platforms = set(self._bytes) | set(self._retries)
+            return {
+                platform: {
+                    "bytes": self._bytes.get(platform, 0),
+                    "peak_speed": self._peak_speeds.get(platform, 0.0),
+                    "retries": self._retries.get(platform, 0),
+                }
+                for platform in platforms
+            }
+
+    def log_summary(self, log=None):
+        """集計結果をログに出力する"""
+        log = log or logger
+        summary = self.summary()
+        if not summary:
+            return
+        log.info("段階ごとの所要時間 (p50 / p95 / 合計):")
+        for (stage, platform), stats in sorted(summary.items()):
+            failures = f", 失敗 {stats['failures']}件" if stats["failures"] else ""
+            log.info(
+                f"  {stage:<11} {platform:<9} {stats['p50']:.2f}秒 / {stats['p95']:.2f}秒 / "
+                f"{stats['total']:.1f}秒 ({stats['count']}件{failures})"
+            )
+        for platform, totals in sorted(self.totals().items()):
+            duration = summary.get((STAGE_TRANSFER, platform), {}).get("total", 0.0)
+            average = totals["bytes"] / duration / 1024 / 1024 if duration > 0 else 0.0
+            log.info(
+                f"  {platform}: 転送量 {totals['bytes'] / 1024 / 1024:.1f}MiB, 平均 {average:.2f}MiB/s, "
+                f"最大 {totals['peak_speed'] / 1024 / 1024:.2f}MiB/s, 再試行 {totals['retries']}回"
+            )
+
+    def write_prometheus(self, path):
+        """
+        Prometheusのnode_exporterのtextfileコレクター形式で書き出す
+
+        Args:
+            path (str): 書き出すファイルのパス（.promで終わるもの）
+        """
+        lines = [
+            "# HELP datascoop_stage_duration_seconds Duration of each download stage.",
+            "# TYPE datascoop_stage_duration_seconds summary",
+        ]
+        failure_lines = [
+            "# HELP datascoop_stage_failures_total Number of failed stages.",
+            "# TYPE datascoop_stage_failures_total counter",
+        ]
+        for (stage, platform), stats in sorted(self.summary().items()):
+            labels = f'stage="{stage}",platform="{platform}"'
+            for q in QUANTILES:
+                lines.append(f'datascoop_stage_duration_seconds{{{labels},quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f"datascoop_stage_duration_seconds_sum{{{labels}}} {stats['total']:.6f}")
+            lines.append(f"datascoop_stage_duration_seconds_count{{{labels}}} {stats['count']}")
+            failure_lines.append(f"datascoop_stage_failures_total{{{labels}}} {stats['failures']}")
+        lines.extend(failure_lines)
+
+        totals = sorted(self.totals().items())
+        for name, key, kind, help_text in (
+            ("datascoop_transfer_bytes_total", "bytes", "counter", "Bytes transferred."),
+            ("datascoop_transfer_peak_speed_bytes", "peak_speed", "gauge", "Peak transfer speed in bytes per second."),
+            ("datascoop_retries_total", "retries", "counter", "Number of retried jobs."),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for platform, values in totals:
+                lines.append(f'{name}{{platform="{platform}"}} {values[key]:g}')
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        # 収集中に書きかけのファイルを読まれないよう、アトミックに置き換える
+        os.replace(tmp_path, path)
+
+    def close(self):
+        """JSON Linesのファイルを閉じる"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def postprocessor_hook(d):
+    """
+    共有の計測に後処理を記録するyt-dlpの後処理フック
+    yt-dlpのインスタンスのプールでキーが変わらないよう、モジュールの関数として渡す
+    """
+    get_metrics().postprocessor_hook(d)
+
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+
+def get_metrics():
+    """
+    共有の計測を取得する
+
+    Returns:
+        MetricsRecorder: プロセス内で共有される計測
+    """
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = MetricsRecorder()
+        return _default_metrics
+
+
+def configure_metrics(**kwargs):
+    """
+    共有の計測を設定し直す
+
+    Args:
+        **kwargs: MetricsRecorderのコンストラクタの引数 (jsonl_path)
+
+    Returns:
+        MetricsRecorder: 新しく設定した計測
+    """
+    global _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is not None:
+            _default_metrics.close()
+        _default_metrics = MetricsRecorder(**kwargs)
+        return _default_metrics
@@ -0,0 +1,216 @@
+"""
+ダウンロード進捗の表示モジュール
+yt-dlpの進捗フックを間引いて集計し、並列ダウンロードも1つの表示にまとめる
+"""
+
+import sys
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 表示を更新する最短間隔（秒）
+DEFAULT_INTERVAL = 0.5
+# 端末以外に出力する場合に集計結果をログに書き出す間隔（秒）
+DEFAULT_SUMMARY_INTERVAL = 10.0
+
+
+def format_bytes(num):
+    """
+    バイト数を読みやすい単位に変換する
+
+    Args:
+        num (float): バイト数
+
+    Returns:
+        str: "12.3MiB" のような文字列
+    """
+    if abs(num) < 1024:
+        return f"{int(num)}B"
+    for unit in ("KiB", "MiB"):
+        num /= 1024
+        if abs(num) < 1024:
+            return f"{num:.1f}{unit}"
+    return f"{num / 1024:.1f}GiB"
+
+
+class ProgressReporter:
+    """
+    複数のダウンロードの進捗を集計して表示するクラス
+    端末ではtqdmのプログレスバーを1本だけ表示し、それ以外では一定間隔で要約をログに出力する
+    フックは頻繁に呼ばれるため、状態の記録のみを行い、表示は間隔を空けて更新する
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, summary_interval=DEFAULT_SUMMARY_INTERVAL,
+                 stream=None, use_tty=None, enabled=True):
+        """
+        コンストラクタ
+
+        Args:
+            interval (float): 表示を更新する最短間隔（秒）
+            summary_interval (float): 端末以外で要約をログに出力する間隔（秒）
+            stream (file, optional): プログレスバーの出力先（省略時は標準エラー出力）
+            use_tty (bool, optional): プログレスバーを使用するかどうか（省略時は出力先が端末かどうかで判定）
+            enabled (bool): Falseの場合は進捗を表示しない（完了時のログのみ出力する）
+        """
+        self.interval = max(0.0, float(interval))
+        self.summary_interval = max(self.interval, float(summary_interval))
+        self.stream = stream or sys.stderr
+        if use_tty is None:
+            use_tty = hasattr(self.stream, "isatty") and self.stream.isatty()
+        self.use_tty = use_tty
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._active = {}
+        self._finished = 0
+        self._finished_bytes = 0
+        self._last_render = 0.0
+        self._last_summary = time.monotonic()
+        self._bar = None
+
+    def update(self, d):
+        """
+        yt-dlpの進捗情報を記録し、必要であれば表示を更新する
+
+        Args:
+            d (dict): yt-dlpの進捗フックに渡される進捗情報
+        """
+        status = d.get("status")
+        # 完了の通知にはtmpfilenameが含まれないため、すべての通知に含まれる最終的なファイル名で識別する
+        key = d.get("filename")
+        if status == "downloading":
+            total = d.get("total_bytes") or d.get("total_bytes_estimate") or 0
+            with self._lock:
+                self._active[key] = (d.get("downloaded_bytes") or 0, total, d.get("speed") or 0)
+        elif status in ("finished", "error"):
+            with self._lock:
+                downloaded = self._active.pop(key, (d.get("downloaded_bytes") or 0,))[0]
+                if status == "finished":
+                    self._finished += 1
+                    self._finished_bytes += d.get("total_bytes") or downloaded
+            self.render(force=True)
+            return
+        else:
+            return
+
+        now = time.monotonic()
+        if now - self._last_render >= self.interval:
+            self.render(now=now)
+
+    def snapshot(self):
+        """
+        現在の集計値を取得する
+
+        Returns:
+            dict: 実行中の件数、完了件数、ダウンロード済みバイト数、合計バイト数、速度
+        """
+        with self._lock:
+            active = list(self._active.values())
+            finished = self._finished
+            finished_bytes = self._finished_bytes
+        return {
+            "active": len(active),
+            "finished": finished,
+            "downloaded_bytes": finished_bytes + sum(a[0] for a in active),
+            "total_bytes": finished_bytes + sum(a[1] for a in active),
+            "speed": sum(a[2] for a in active),
+        }
+
+    def render(self, now=None, force=False):
+        """
+        表示を更新する
+
+        Args:
+            now (float, optional): 現在時刻（time.monotonic()の値）
+            force (bool): Trueの場合は間隔に関係なく更新する
+        """
+        if not self.enabled:
+            return
+        now = now or time.monotonic()
+        with self._lock:
+            if not force and now - self._last_render < self.interval:
+                return
+            self._last_render = now
+        stats = self.snapshot()
+
+        if self.use_tty:
+            if stats["active"]:
+                self._render_bar(stats)
+            else:
+                # 実行中のダウンロードがなければバーを消し、ログの出力を妨げないようにする
+                self.close()
+            return
+
+        with self._lock:
+            if not stats["active"] or now - self._last_summary < self.summary_interval:
+                return
+            self._last_summary = now
+        logger.info(self._format_summary(stats))
+
+    def _render_bar(self, stats):
+        """tqdmのプログレスバーを更新する"""
+        with self._lock:
+            if self._bar is None:
+                from tqdm import tqdm
+                self._bar = tqdm(
+                    total=0, unit="B", unit_scale=True, unit_divisor=1024,
+                    file=self.stream, leave=False, dynamic_ncols=True, mininterval=self.interval
+                )
+            bar = self._bar
+            bar.total = stats["total_bytes"] or None
+            bar.n = stats["downloaded_bytes"]
+            bar.set_description(f"{stats['active']}件ダウンロード中", refresh=False)
+            bar.set_postfix_str(f"完了 {stats['finished']}件 {format_bytes(stats['speed'])}/s", refresh=False)
+            bar.refresh()
+
+    def _format_summary(self, stats):
+        """端末以外に出力する要約を作成する"""
+        total = format_bytes(stats["total_bytes"]) if stats["total_bytes"] else "N/A"
+        return (
+            f"ダウンロード進捗: {stats['active']}件ダウンロード中 / 完了 {stats['finished']}件 "
+            f"{format_bytes(stats['downloaded_bytes'])}/{total} 速度: {format_bytes(stats['speed'])}/s"
+        )
+
+    def close(self):
+        """プログレスバーを閉じる"""
+        with self._lock:
+            bar, self._bar = self._bar, None
+        if bar is not None:
+            bar.close()
+
+
+_default_reporter = None
+_default_reporter_lock = threading.Lock()
+
+
+def get_progress_reporter():
+    """
+    共有の進捗表示を取得する
+
+    Returns:
+        ProgressReporter: プロセス内で共有される進捗表示
+    """
+    global _default_reporter
+    with _default_reporter_lock:
+        if _default_reporter is None:
+            _default_reporter = ProgressReporter()
+        return _default_reporter
+
+
+def configure_progress(**kwargs):
+    """
+    共有の進捗表示を設定し直す
+
+    Args:
+        **kwargs: ProgressReporterのコンストラクタの引数 (interval, enabled など)
+
+    Returns:
+        ProgressReporter: 新しく設定した進捗表示
+    """
+    global _default_reporter
+    with _default_reporter_lock:
+        if _default_reporter is not None:
+            _default_reporter.close()
+        _default_reporter = ProgressReporter(**kwargs)
+        return _default_reporter
@@ -0,0 +1,239 @@
+"""
+再試行の管理モジュール
+yt-dlpのエラーを分類し、一時的なエラーのみを指数バックオフとジッターで再試行する
+再試行の回数はジョブごとの上限と、プラットフォームごとの予算で制限する
+"""
+
+import re
+import time
+import random
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# エラーの分類
+TRANSIENT = "transient"    # 接続の切断・タイムアウト・5xxなど。再試行する
+THROTTLED = "throttled"    # 429などの速度制限。間隔を長めに空けて再試行する
+GEO_AUTH = "geo_auth"      # 地域制限・ログインや会員限定・403など。再試行しない
+PERMANENT = "permanent"    # 存在しない・非対応のURLなど。再試行しない
+
+RETRYABLE = frozenset({TRANSIENT, THROTTLED})
+
+# 1件のジョブで行う再試行の回数（デフォルト）
+DEFAULT_RETRIES = 2
+# プラットフォームごとの再試行の回数の合計の上限（デフォルト）
+DEFAULT_PLATFORM_BUDGET = 20
+# 再試行までの待機時間（秒）
+DEFAULT_BASE_DELAY = 2.0
+DEFAULT_MAX_DELAY = 120.0
+# 速度制限の場合に待機時間を何倍にするか
+DEFAULT_THROTTLE_FACTOR = 5.0
+
+# 例外のクラス名による分類（yt-dlpを読み込まずに判定するため名前で比較する）
+_CLASS_CATEGORIES = (
+    ("GeoRestrictedError", GEO_AUTH),
+    ("UnsupportedError", PERMANENT),
+    ("TransportError", TRANSIENT),
+    ("IncompleteRead", TRANSIENT),
+    ("ContentTooShortError", TRANSIENT),
+    ("TimeoutError", TRANSIENT),
+    ("ConnectionError", TRANSIENT),
+)
+
+# エラーメッセージによる分類（上から順に判定する）
+_MESSAGE_CATEGORIES = (
+    (THROTTLED, re.compile(r"HTTP Error 429|Too Many Requests|rate.?limit|slow down", re.IGNORECASE)),
+    (PERMANENT, re.compile(r"HTTP Error 404|HTTP Error 410|Unsupported URL|does not exist|has been removed", re.IGNORECASE)),
+    (GEO_AUTH, re.compile(
+        r"geo.?restrict|available in your (country|region)|HTTP Error 40[13]|Forbidden|Unauthorized|"
+        r"sign in|log ?in|login required|members.only|premium|private video|age.restricted|"
+        r"このコンテンツは.*地域|ログイン",
+        re.IGNORECASE,
+    )),
+    (TRANSIENT, re.compile(
+        r"HTTP Error 5\d\d|timed? ?out|connection (reset|refused|aborted)|reset by peer|broken pipe|"
+        r"temporary failure|temporarily unavailable|incomplete ?read|remote end closed|network is unreachable|"
+        r"name or service not known|getaddrinfo|errno (104|110|111|113)|ssl|eof occurred|"
+        r"did not get any data|content too short|fragment",
+        re.IGNORECASE,
+    )),
+)
+
+_local = threading.local()
+
+
+def classify_error(error):
+    """
+    エラーを分類する
+
+    Args:
+        error (Exception or str): 例外またはエラーメッセージ
+
+    Returns:
+        str: transient, throttled, geo_auth, permanent のいずれか
+    """
+    if error is None:
+        return PERMANENT
+    if isinstance(error, BaseException):
+        # yt-dlpのDownloadErrorは元の例外を保持している
+        original = getattr(error, "exc_info", None)
+        if original and original[1] is not None and original[1] is not error:
+            category = classify_error(original[1])
+            if category != PERMANENT:
+                return category
+        names = {cls.__name__ for cls in type(error).__mro__}
+        for name, category in _CLASS_CATEGORIES:
+            if name in names:
+                return category
+    message = str(error)
+    for category, pattern in _MESSAGE_CATEGORIES:
+        if pattern.search(message):
+            return category
+    return PERMANENT
+
+
+def record_error(error):
+    """
+    現在のスレッドで最後に発生したダウンロードのエラーを記録する
+    ダウンローダーはエラー時にNoneを返すため、呼び出し側はlast_errorで原因を確認する
+
+    Args:
+        error (Exception or str): 例外またはエラーメッセージ
+    """
+    _local.error = error
+
+
+def last_error():
+    """
+    現在のスレッドで最後に記録されたエラーを取得する
+
+    Returns:
+        Exception or str: 記録されたエラー（なければNone）
+    """
+    return getattr(_local, "error", None)
+
+
+def clear_error():
+    """現在のスレッドで記録されたエラーを消去する"""
+    _local.error = None
+
+
+class RetryPolicy:
+    """
+    再試行の方針を管理するクラス
+    再試行できるエラーかどうかを判定し、次の試行までの待機時間を決める
+    """
+
+    def __init__(self, retries=DEFAULT_RETRIES, platform_budget=DEFAULT_PLATFORM_BUDGET,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 throttle_factor=DEFAULT_THROTTLE_FACTOR, rng=None):
+        """
+        コンストラクタ
+
+        Args:
+            retries (int): 1件のジョブで行う再試行の回数の上限
+            platform_budget (int or dict): プラットフォームごとの再試行の回数の合計の上限
+                （辞書の場合はプラットフォーム名をキーとし、"unknown"の値をその他に使用する）
+            base_delay (float): 1回目の再試行までの待機時間（秒）
+            max_delay (float): 待機時間の上限（秒）
+            throttle_factor (float): 速度制限の場合に待機時間を何倍にするか
+            rng (random.Random, optional): ジッターに使用する乱数生成器
+        """
+        self.retries = max(0, int(retries))
+        if isinstance(platform_budget, dict):
+            self.platform_budgets = dict(platform_budget)
+            self.default_budget = self.platform_budgets.get("unknown", DEFAULT_PLATFORM_BUDGET)
+        else:
+            self.platform_budgets = {}
+            self.default_budget = max(0, int(platform_budget))
+        self.base_delay = max(0.0, float(base_delay))
+        self.max_delay = max(self.base_delay, float(max_delay))
+        self.throttle_factor = max(1.0, float(throttle_factor))
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._spent = {}
+
+    def delay_for(self, attempt, category):
+        """
+        次の試行までの待機時間を計算する（指数バックオフ、待機時間の後半をランダムにする）
+
+        Args:
+            attempt (int): 失敗した試行の回数（1から）
+            category (str): エラーの分類
+
+        Returns:
+            float: 待機時間（秒）
+        """
+        delay = self.base_delay * (2 ** (attempt - 1))
+        if category == THROTTLED:
+            delay *= self.throttle_factor
+        delay = min(self.max_delay, delay)
+        return delay / 2 + self._rng.uniform(0, delay / 2)
+
+    def next_delay(self, platform, attempt, category):
+        """
+        再試行するかどうかを判定し、再試行する場合は予算を消費して待機時間を返す
+
+        Args:
+            platform (str): プラットフォーム名
+            attempt (int): 失敗した試行の回数（1から）
+            category (str): エラーの分類
+
+        Returns:
+            float: 待機時間（秒）。再試行しない場合はNone
+        """
+        if category not in RETRYABLE or attempt > self.retries:
+            return None
+        with self._lock:
+            budget = self.platform_budgets.get(platform, self.default_budget)
+            spent = self._spent.get(platform, 0)
+            if spent >= budget:
+                logger.warning(f"{platform} の再試行の予算（{budget}回）を使い切ったため、再試行しません")
+                return None
+            self._spent[platform] = spent + 1
+        return self.delay_for(attempt, category)
+
+    def remaining_budget(self, platform):
+        """
+        プラットフォームの残りの再試行の回数を取得する
+
+        Args:
+            platform (str): プラットフォーム名
+
+        Returns:
+            int: 残りの再試行の回数
+        """
+        with self._lock:
+            budget = self.platform_budgets.get(platform, self.default_budget)
+            return max(0, budget - self._spent.get(platform, 0))
+
+    def call(self, func, platform, sleep=time.sleep):
+        """
+        関数を実行し、再試行できるエラーで失敗した場合は待機してから再実行する
+
+        Args:
+            func (callable): 引数なしで呼び出し、成功時にTrueを返す関数
+            platform (str): プラットフォーム名
+            sleep (callable): 待機に使用する関数
+
+        Returns:
+            tuple: (成功したかどうか, 試行回数, 最後のエラーの分類（成功時はNone）, 最後のエラー)
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            clear_error()
+            try:
+                success = bool(func())
+                error = None if success else last_error()
+            except Exception as e:
+                success, error = False, e
+            if success:
+                return True, attempt, None, None
+            category = classify_error(error)
+            delay = self.next_delay(platform, attempt, category)
+            if delay is None:
+                return False, attempt, category, error
+            logger.warning(f"{attempt}回目の試行に失敗しました（{category}）。{delay:.1f}秒後に再試行します: {error}")
+            sleep(delay)
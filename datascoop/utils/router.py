@@ -0,0 +1,182 @@
+"""
+URLの振り分け
+URLからプラットフォーム・コンテンツの種類・正規化したコンテンツID・使用するダウンローダーを1回の走査で判定する
+正規表現はモジュールの読み込み時に一度だけコンパイルし、判定結果はLRUキャッシュに保持する
+"""
+
+import re
+from functools import lru_cache
+from collections import namedtuple
+
+# 判定結果をキャッシュするURLの数
+ROUTE_CACHE_SIZE = 65536
+
+# コンテンツの種類
+KIND_VIDEO = "video"        # 1件の動画（YouTubeショート、Abemaのエピソード・放送枠を含む）
+KIND_PLAYLIST = "playlist"  # 再生リスト・マイリスト
+KIND_CHANNEL = "channel"    # チャンネル・ユーザー
+KIND_SERIES = "series"      # 作品・シリーズ
+KIND_UNKNOWN = "unknown"    # 判定できないURL
+
+# URLのドメイン部分（スキームのないURLはドメインなしとして扱う）
+NETLOC_RE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)")
+
+# ドメインからプラットフォームを判定するパターン（上から順に判定する）
+PLATFORM_HOSTS = (
+    ("youtube", re.compile(r"youtube|youtu\.be")),
+    ("niconico", re.compile(r"nicovideo|nico\.ms")),
+    ("abema", re.compile(r"abema")),
+)
+
+# YouTube
+YOUTUBE_SHORTS_RE = re.compile(r"(https?://)?(www\.)?youtube\.com/shorts/([^&=%\?]{11})")
+YOUTUBE_VIDEO_RE = re.compile(
+    r"(https?://)?(www\.)?"
+    r"(youtube|youtu|youtube-nocookie)\.(com|be)/"
+    r"(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})"
+)
+YOUTUBE_PLAYLIST_RE = re.compile(r"[?&]list=([\w-]+)")
+YOUTUBE_CHANNEL_RE = re.compile(r"youtube\.com/(@[^/?#&]+|(?:channel|c|user)/[^/?#&]+)")
+
+# ニコニコ動画
+NICONICO_VIDEO_RE = re.compile(r"/((?:sm|nm|so)\d+)")
+NICONICO_PLAYLIST_RE = re.compile(r"/(mylist/\d+)")
+NICONICO_SERIES_RE = re.compile(r"/(series/\d+)")
+NICONICO_CHANNEL_RE = re.compile(r"/(user/\d+)")
+
+# Abema
+ABEMA_VIDEO_RE = re.compile(r"abema\.tv/(?:video/episode|channels/[^/]+/slots)/([^/?#&]+)")
+ABEMA_SERIES_RE = re.compile(r"https?://(?:www\.)?abema\.tv/video/title/([^/?#&]+)")
+
+# プラットフォームごとに使用するダウンローダーのクラス名（datascoop.downloadersから読み込む）
+DOWNLOADER_CLASSES = {
+    "youtube": "YouTubeDownloader",
+    "abema": "AbemaDownloader",
+}
+DEFAULT_DOWNLOADER = "VideoDownloader"
+
+
+class Route(namedtuple("Route", ["platform", "kind", "content_id", "downloader_name"])):
+    """
+    URLの判定結果
+    platform, kind, content_id, downloader_name の4つの値を持つ
+    """
+
+    __slots__ = ()
+
+    @property
+    def downloader_class(self):
+        """
+        使用するダウンローダーのクラス
+        yt-dlpの読み込みを必要になるまで遅らせるため、参照した時点でダウンローダーを読み込む
+        """
+        from .. import downloaders
+        return getattr(downloaders, self.downloader_name)
+
+
+def extract_youtube_video_id(url):
+    """YouTubeの動画IDを抽出する（ショートを先に判定する）"""
+    match = YOUTUBE_SHORTS_RE.search(url)
+    if match:
+        return match.group(3)
+    match = YOUTUBE_VIDEO_RE.match(url)
+    if match:
+        return match.group(6)
+    # URLからshortsパターンを検出できない場合のフォールバック
+    if "/shorts/" in url:
+        video_id = url.split("/shorts/", 1)[1].split("?")[0].split("&")[0]
+        if len(video_id) == 11:
+            return video_id
+    return None
+
+
+def _route_youtube(url):
+    """YouTubeのURLを判定する"""
+    if "/playlist" not in url:
+        match = YOUTUBE_CHANNEL_RE.search(url)
+        if match:
+            return KIND_CHANNEL, match.group(1)
+        video_id = extract_youtube_video_id(url)
+        if video_id:
+            return KIND_VIDEO, video_id
+    match = YOUTUBE_PLAYLIST_RE.search(url)
+    if match:
+        return KIND_PLAYLIST, match.group(1)
+    return KIND_UNKNOWN, None
+
+
+def _route_niconico(url):
+    """ニコニコ動画のURLを判定する"""
+    for kind, pattern in ((KIND_VIDEO, NICONICO_VIDEO_RE), (KIND_PLAYLIST, NICONICO_PLAYLIST_RE),
+                          (KIND_SERIES, NICONICO_SERIES_RE), (KIND_CHANNEL, NICONICO_CHANNEL_RE)):
+        match = pattern.search(url)
+        if match:
+            return kind, match.group(1)
+    return KIND_UNKNOWN, None
+
+
+def _route_abema(url):
+    """AbemaのURLを判定する"""
+    match = ABEMA_SERIES_RE.search(url)
+    if match:
+        return KIND_SERIES, match.group(1)
+    match = ABEMA_VIDEO_RE.search(url)
+    if match:
+        return KIND_VIDEO, match.group(1)
+    return KIND_UNKNOWN, None
+
+
+_PLATFORM_ROUTERS = {
+    "youtube": _route_youtube,
+    "niconico": _route_niconico,
+    "abema": _route_abema,
+}
+
+
+def detect_platform(url):
+    """
+    URLのドメインからプラットフォーム名を判定する
+
+    Args:
+        url (str): 動画URL
+
+    Returns:
+        str: プラットフォーム名 (例: 'youtube', 'niconico', 'unknown')
+    """
+    match = NETLOC_RE.match(url.lstrip())
+    domain = match.group(1).lower() if match else ""
+    for platform, pattern in PLATFORM_HOSTS:
+        if pattern.search(domain):
+            return platform
+    return "unknown"
+
+
+@lru_cache(maxsize=ROUTE_CACHE_SIZE)
+def classify_url(url):
+    """
+    URLからプラットフォーム・コンテンツの種類・コンテンツID・ダウンローダーを判定する
+
+    Args:
+        url (str): 動画URL
+
+    Returns:
+        Route: 判定結果（判定できない値はplatform='unknown', kind='unknown', content_id=None）
+    """
+    platform = detect_platform(url)
+    router = _PLATFORM_ROUTERS.get(platform)
+    kind, content_id = router(url) if router else (KIND_UNKNOWN, None)
+    return Route(platform, kind, content_id, DOWNLOADER_CLASSES.get(platform, DEFAULT_DOWNLOADER))
+
+
+def classify_many(urls):
+    """
+    複数のURLをまとめて判定する
+    入力を順に読みながら判定するため、大きなURLリストでもメモリ使用量は増えない
+
+    Args:
+        urls (iterable): 動画URLのリストまたはイテレータ
+
+    Returns:
+        iterator: URLと同じ順序のRouteを返すイテレータ
+    """
+    return map(classify_url, urls)
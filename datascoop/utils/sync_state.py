@@ -0,0 +1,144 @@
+"""
+チャンネルの差分同期の状態を記録するモジュール
+チャンネルごとに、同期済みの最新の動画のIDと投稿日（ハイウォーターマーク）を保存する
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from .config import get_config_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 最新の動画が削除された場合にも列挙を打ち切れるよう、同期済みの新しい順の動画IDを保持する数
+RECENT_IDS = 50
+
+
+class ChannelSyncState:
+    """
+    チャンネルごとの同期の状態を保持するクラス
+    状態はJSONファイルに保存し、他のプロセスが更新したチャンネルの状態は上書きしない
+    """
+
+    DEFAULT_FILENAME = "sync_state.json"
+
+    def __init__(self, path=None):
+        """
+        コンストラクタ
+
+        Args:
+            path (str, optional): 状態ファイルのパス（省略時は ~/.datascoop/sync_state.json）
+        """
+        self.path = path or os.path.join(get_config_dir(), self.DEFAULT_FILENAME)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+    def _load(self):
+        """状態ファイルを読み込む"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"同期の状態を読み込めませんでした: {self.path}: {e}")
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    @contextmanager
+    def _locked(self):
+        """
+        他のスレッド・プロセスと排他して状態ファイルを読み書きする
+        状態ファイルはos.replaceで置き換えるため、ロックは別のファイル（<状態ファイル>.lock）で取得する
+        """
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.path}.lock", "a", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def get(self, channel_url):
+        """
+        チャンネルのハイウォーターマークを取得する
+
+        Args:
+            channel_url (str): チャンネルのURL
+
+        Returns:
+            dict: video_id, upload_date, recent_ids, synced_at を持つ辞書（未同期の場合はNone）
+        """
+        with self._lock:
+            return self._load().get(channel_url)
+
+    def channels(self):
+        """
+        同期したことのあるチャンネルのURLのリストを取得する
+
+        Returns:
+            list: チャンネルのURLのリスト
+        """
+        with self._lock:
+            return sorted(self._load())
+
+    def update(self, channel_url, new_ids, upload_date=None):
+        """
+        新しく同期した動画でハイウォーターマークを更新する
+
+        Args:
+            channel_url (str): チャンネルのURL
+            new_ids (list): 新しく同期した動画のID（新しい順）
+            upload_date (str, optional): 最新の動画の投稿日 (YYYYMMDD)
+
+        Returns:
+            dict: 更新後のハイウォーターマーク
+        """
+        # 読み込みから置き換えまでを排他し、同時に同期した他のチャンネルの状態を失わないようにする
+        with self._locked():
+            data = self._load()
+            previous = data.get(channel_url) or {}
+            recent_ids = list(dict.fromkeys([*new_ids, *previous.get("recent_ids", [])]))[:RECENT_IDS]
+            mark = {
+                "video_id": recent_ids[0] if recent_ids else None,
+                "upload_date": (upload_date if new_ids else None) or previous.get("upload_date"),
+                "recent_ids": recent_ids,
+                "synced_at": time.time(),
+            }
+            data[channel_url] = mark
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            # 書き込み途中のファイルを読まれないよう、アトミックに置き換える
+            os.replace(tmp_path, self.path)
+            return mark
+
+
+def is_known_entry(entry, mark):
+    """
+    フラット抽出したエントリが同期済みの範囲に入っているかどうか判定する
+
+    Args:
+        entry (dict): フラット抽出したエントリ
+        mark (dict): チャンネルのハイウォーターマーク（未同期の場合はNone）
+
+    Returns:
+        bool: 同期済みの動画、または最新の同期済みの動画より前に投稿された動画の場合はTrue
+    """
+    if not mark:
+        return False
+    if entry.get("id") in mark.get("recent_ids", ()):
+        return True
+    upload_date = entry.get("upload_date")
+    return bool(upload_date and mark.get("upload_date") and upload_date < mark["upload_date"])
@@ -0,0 +1,114 @@
+"""
+asyncio向けのダウンロードAPIのテスト
+"""
+
+import os
+import time
+import asyncio
+import threading
+import pytest
+from datascoop.aio import AsyncDownloader
+from datascoop.downloaders.base import BaseDownloader
+
+
+class FakeDownloader(BaseDownloader):
+    """yt-dlpの代わりに進捗フックを呼び出しながら一時ファイルを書き込むダウンローダー"""
+
+    def __init__(self, output_dir, chunks=5, delay=0.01):
+        super().__init__(output_dir)
+        self.chunks = chunks
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def _progress_hook(self, d):
+        pass
+
+    def download(self, url, filename="video", **kwargs):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        path = os.path.join(self.output_dir, f"{filename}.mp4")
+        tmp_path = f"{path}.part"
+        try:
+            with open(tmp_path, "wb") as f:
+                for i in range(1, self.chunks + 1):
+                    f.write(b"x" * 10)
+                    f.flush()
+                    for hook in self._build_progress_hooks(kwargs):
+                        hook({
+                            'status': 'downloading', 'filename': path, 'tmpfilename': tmp_path,
+                            'downloaded_bytes': i * 10, 'total_bytes': self.chunks * 10,
+                            'info_dict': {'id': 'x'},
+                        })
+                    time.sleep(self.delay)
+            os.replace(tmp_path, path)
+            for hook in self._build_progress_hooks(kwargs):
+                hook({'status': 'finished', 'filename': path, 'total_bytes': self.chunks * 10})
+            return path
+        except Exception as e:
+            self.logger.error(f"ダウンロード中にエラーが発生しました: {e}")
+            return None
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+class TestAsyncDownloader:
+    """AsyncDownloaderのテストクラス"""
+
+    def test_download_and_events(self, tmp_path):
+        """ダウンロードの完了を待ち、進捗イベントを受け取れること"""
+        async def run():
+            async with AsyncDownloader(FakeDownloader(str(tmp_path))) as downloader:
+                task = downloader.submit("https://example.com/a", filename="a")
+                events = [event async for event in task.events()]
+                return await task, events
+
+        path, events = asyncio.run(run())
+        assert path == str(tmp_path / "a.mp4")
+        assert os.path.exists(path)
+        assert [e['downloaded_bytes'] for e in events if e['status'] == 'downloading'] == [10, 20, 30, 40, 50]
+        assert events[-1]['status'] == 'finished'
+        assert all(e['url'] == "https://example.com/a" and 'info_dict' not in e for e in events)
+
+    def test_bounded_concurrency(self, tmp_path):
+        """同時実行数が上限を超えないこと"""
+        fake = FakeDownloader(str(tmp_path), delay=0.02)
+
+        async def run():
+            async with AsyncDownloader(fake, max_concurrency=2) as downloader:
+                return await asyncio.gather(*[
+                    downloader.download(f"https://example.com/{i}", filename=str(i)) for i in range(6)
+                ])
+
+        results = asyncio.run(run())
+        assert results == [str(tmp_path / f"{i}.mp4") for i in range(6)]
+        assert fake.max_running == 2
+
+    def test_cancel_removes_partial_files(self, tmp_path):
+        """キャンセルすると途中まで書き込まれたファイルが削除されること"""
+        async def run():
+            async with AsyncDownloader(FakeDownloader(str(tmp_path), chunks=100, delay=0.01)) as downloader:
+                task = downloader.submit("https://example.com/a", filename="a")
+                async for event in task.events():
+                    if event['downloaded_bytes'] >= 30:
+                        task.cancel()
+                        break
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+                return task
+
+        task = asyncio.run(run())
+        assert task.cancelled()
+        assert os.listdir(tmp_path) == []
+
+    def test_unknown_method(self, tmp_path):
+        """存在しないメソッドを指定した場合はエラーになること"""
+        async def run():
+            async with AsyncDownloader(FakeDownloader(str(tmp_path))) as downloader:
+                downloader.submit("https://example.com/a", method="download_playlist")
+
+        with pytest.raises(AttributeError):
+            asyncio.run(run())
@@ -0,0 +1,61 @@
+"""
+ダウンロードアーカイブのテスト
+"""
+
+import json
+from datascoop.utils.archive import DownloadArchive, get_archive_id
+from datascoop.utils.helpers import extract_content_id
+
+
+class TestDownloadArchive:
+    """DownloadArchiveのテストクラス"""
+
+    def test_extract_content_id(self):
+        """extract_content_id関数のテスト"""
+        assert extract_content_id('https://youtu.be/dQw4w9WgXcQ') == ('youtube', 'dQw4w9WgXcQ')
+        assert extract_content_id('https://www.nicovideo.jp/watch/sm12345678') == ('niconico', 'sm12345678')
+        assert extract_content_id('https://abema.tv/video/episode/90-1_s1_p1') == ('abema', '90-1_s1_p1')
+        assert extract_content_id('https://abema.tv/video/title/90-1') is None
+        assert extract_content_id('https://example.com/video') is None
+
+    def test_get_archive_id(self):
+        """yt-dlpと同じ形式のIDが生成されること"""
+        assert get_archive_id('https://www.youtube.com/watch?v=dQw4w9WgXcQ') == 'youtube dQw4w9WgXcQ'
+        assert get_archive_id('https://nico.ms/sm12345678') == 'niconico sm12345678'
+        assert get_archive_id('https://abema.tv/video/episode/90-1_s1_p1') == 'abematv 90-1_s1_p1'
+        assert get_archive_id('https://example.com/video') is None
+
+    def test_record_and_reload(self, tmp_path):
+        """記録したURLが別のインスタンスからも確認できること"""
+        path = str(tmp_path / 'archive.txt')
+        archive = DownloadArchive(path)
+        url = 'https://youtu.be/dQw4w9WgXcQ'
+        assert archive.contains_url(url) is False
+        assert archive.record_url(url) is True
+        assert archive.record_url('https://example.com/video') is False
+        assert archive.contains_url('https://www.youtube.com/watch?v=dQw4w9WgXcQ') is True
+
+        # 同じファイルを共有する別のアーカイブからの追記を読み込む
+        other = DownloadArchive(path)
+        other.add('niconico sm1')
+        assert 'niconico sm1' in archive
+        assert len(archive) == 2
+
+        with open(path, encoding='utf-8') as f:
+            assert f.read().splitlines() == ['youtube dQw4w9WgXcQ', 'niconico sm1']
+
+    def test_import_directory(self, tmp_path):
+        """既存のダウンロードディレクトリからIDを取り込めること"""
+        downloads = tmp_path / 'downloads'
+        downloads.mkdir()
+        (downloads / 'title [dQw4w9WgXcQ].mp4').write_bytes(b'')
+        (downloads / 'sm12345678_title.mp4').write_bytes(b'')
+        with open(downloads / 'other.info.json', 'w', encoding='utf-8') as f:
+            json.dump({'id': 'abc', 'extractor_key': 'AbemaTV'}, f)
+
+        archive = DownloadArchive(str(tmp_path / 'archive.txt'))
+        assert archive.import_directory(str(downloads)) == 3
+        assert 'youtube dQw4w9WgXcQ' in archive
+        assert 'niconico sm12345678' in archive
+        assert 'abematv abc' in archive
+        assert archive.import_directory(str(downloads)) == 0
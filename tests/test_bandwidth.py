@@ -0,0 +1,83 @@
+"""
+帯域制御のテスト
+"""
+
+import time
+import pytest
+from datascoop.utils.bandwidth import BandwidthScheduler, parse_rate, parse_platform_rates, fcntl
+
+
+class TestBandwidthScheduler:
+    """BandwidthSchedulerのテストクラス"""
+
+    def test_parse_rate(self):
+        """速度の文字列をバイト毎秒に変換できること"""
+        assert parse_rate('500K') == 500 * 1024
+        assert parse_rate('1.5M') == int(1.5 * 1024 * 1024)
+        assert parse_rate('2MiB/s') == 2 * 1024 * 1024
+        assert parse_rate('0') == 0
+        assert parse_platform_rates(['youtube=2M,abema=1M']) == {'youtube': 2 * 1024 * 1024, 'abema': 1024 * 1024}
+        with pytest.raises(ValueError):
+            parse_rate('fast')
+        with pytest.raises(ValueError):
+            parse_platform_rates(['youtube'])
+
+    def test_global_and_platform_limits(self):
+        """全体とプラットフォームごとの上限を超えた分だけ待機すること"""
+        scheduler = BandwidthScheduler(limit=100_000, platform_limits={'youtube': 10_000})
+        # 最初はバケットに1秒分のトークンがある
+        assert scheduler.throttle('unknown', 50_000) == 0
+        # プラットフォームの上限（1万バイト毎秒）を2千バイト超えるため、0.2秒待機する
+        waited = scheduler.throttle('youtube', 12_000)
+        assert waited == pytest.approx(0.2, abs=0.05)
+
+    def test_set_limit_at_runtime(self):
+        """上限を実行中に変更・解除できること"""
+        scheduler = BandwidthScheduler()
+        assert scheduler.throttle('youtube', 10 ** 9) == 0
+        scheduler.set_limit(1000)
+        assert scheduler.limits() == {'global': 1000}
+        assert scheduler.throttle('youtube', 1100) == pytest.approx(0.1, abs=0.05)
+        scheduler.set_limit(0)
+        assert scheduler.limits() == {}
+        assert scheduler.throttle('youtube', 10 ** 9) == 0
+
+    def test_progress_hook_and_report(self):
+        """進捗フックのバイト数の増分を集計し、上限と実際の速度を報告すること"""
+        scheduler = BandwidthScheduler(platform_limits={'youtube': 10 ** 9})
+        info = {'webpage_url': 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'}
+        for downloaded in (1000, 3000, 6000):
+            # yt-dlpの実際の通知: 転送中はtmpfilenameも含み、完了時はfilenameのみを含む
+            scheduler.progress_hook({'status': 'downloading', 'filename': 'a.mp4', 'tmpfilename': 'a.mp4.part',
+                                     'downloaded_bytes': downloaded, 'info_dict': info})
+        scheduler.progress_hook({'status': 'finished', 'filename': 'a.mp4', 'downloaded_bytes': 6000,
+                                 'total_bytes': 6000, 'info_dict': info})
+        scheduler.progress_hook({'status': 'downloading', 'filename': 'b.mp4', 'tmpfilename': 'b.mp4.part',
+                                 'downloaded_bytes': 0, 'info_dict': info})
+        scheduler.progress_hook({'status': 'error', 'filename': 'b.mp4', 'info_dict': info})
+        # 完了・失敗したダウンロードの位置は破棄する
+        assert scheduler._positions == {}
+        time.sleep(0.01)
+
+        report = scheduler.report()
+        assert report['global']['bytes'] == 6000
+        assert report['global']['allowed'] is None
+        assert report['youtube']['bytes'] == 6000
+        assert report['youtube']['allowed'] == 10 ** 9
+        assert report['youtube']['achieved'] > 0
+
+    @pytest.mark.skipif(fcntl is None, reason="プロセス間の共有にはfcntlが必要")
+    def test_shared_between_processes(self, tmp_path):
+        """同じ状態ファイルを使用する帯域制御で上限とトークンを共有すること"""
+        path = str(tmp_path / 'bandwidth.json')
+        first = BandwidthScheduler(limit=10_000, shared_path=path)
+        # 後から起動したプロセスは上限を指定しなくても共有の上限に従う
+        second = BandwidthScheduler(shared_path=path)
+        assert second.limits() == {'global': 10_000}
+
+        assert first.throttle('unknown', 10_000) == 0
+        assert second.throttle('unknown', 2_000) == pytest.approx(0.2, abs=0.05)
+
+        # 一方で変更した上限は他方にも反映される
+        second.set_limit(0)
+        assert first.limits() == {}
@@ -0,0 +1,209 @@
+"""
+バッチダウンロードエンジンのテスト
+"""
+
+import io
+import sys
+import threading
+import time
+import pytest
+from concurrent.futures import Future
+from datascoop.utils.retry import RetryPolicy, record_error
+from datascoop.batch import (
+    BatchDownloader,
+    BatchSummary,
+    parse_platform_limits,
+    read_batch_urls,
+    unique_urls,
+)
+
+
+class TestBatchDownloader:
+    """BatchDownloaderのテストクラス"""
+
+    def test_results_and_summary(self):
+        """全てのジョブの結果が返され、集計されること"""
+        urls = [
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ',
+            'https://example.com/fail',
+            'https://www.nicovideo.jp/watch/sm12345678',
+        ]
+
+        def download(url):
+            if 'fail' in url:
+                return False
+            return True
+
+        summary = BatchSummary()
+        for result in BatchDownloader(download, jobs=2).run(urls):
+            summary.add(result)
+        summary.finish()
+
+        assert sorted(r.index for r in summary.results) == [1, 2, 3]
+        assert len(summary.succeeded) == 2
+        assert [r.url for r in summary.failed] == ['https://example.com/fail']
+
+    def test_exception_is_reported_as_failure(self):
+        """ダウンロード関数の例外が失敗として扱われること"""
+        def download(url):
+            raise RuntimeError('boom')
+
+        results = list(BatchDownloader(download).run(['https://example.com/a']))
+        assert results[0].success is False
+        assert results[0].error == 'boom'
+
+    def test_platform_limit(self):
+        """プラットフォームごとの同時実行数が上限を超えないこと"""
+        lock = threading.Lock()
+        active = {'youtube': 0, 'unknown': 0}
+        peak = {'youtube': 0, 'unknown': 0}
+
+        def download(url):
+            platform = 'youtube' if 'youtube' in url else 'unknown'
+            with lock:
+                active[platform] += 1
+                peak[platform] = max(peak[platform], active[platform])
+            time.sleep(0.02)
+            with lock:
+                active[platform] -= 1
+            return True
+
+        urls = [f'https://www.youtube.com/watch?v={i:011d}' for i in range(6)]
+        urls += [f'https://example.com/{i}' for i in range(6)]
+        batch = BatchDownloader(download, jobs=4, platform_limits={'youtube': 1})
+        results = list(batch.run(urls))
+
+        assert len(results) == 12
+        assert peak['youtube'] == 1
+        assert peak['unknown'] <= 4
+
+    def test_retry_transient_errors(self):
+        """一時的なエラーは再試行し、試行回数と分類を結果に記録すること"""
+        calls = {}
+        lock = threading.Lock()
+
+        def download(url):
+            with lock:
+                calls[url] = calls.get(url, 0) + 1
+                count = calls[url]
+            if 'flaky' in url and count < 3:
+                record_error('HTTP Error 503: Service Unavailable')
+                return False
+            if 'private' in url:
+                record_error('ERROR: Private video')
+                return False
+            return True
+
+        urls = ['https://example.com/flaky', 'https://example.com/private', 'https://example.com/ok']
+        policy = RetryPolicy(retries=3, base_delay=0.01, max_delay=0.02)
+        summary = BatchSummary()
+        for result in BatchDownloader(download, jobs=2, retry_policy=policy).run(urls):
+            summary.add(result)
+        summary.finish()
+
+        results = {r.url: r for r in summary.results}
+        assert results['https://example.com/flaky'].success
+        assert results['https://example.com/flaky'].attempts == 3
+        assert results['https://example.com/private'].attempts == 1
+        assert results['https://example.com/private'].category == 'geo_auth'
+        assert results['https://example.com/private'].error == 'ERROR: Private video'
+        assert [r.url for r in summary.retried] == ['https://example.com/flaky']
+        assert summary.failure_categories() == {'geo_auth': 1}
+
+    def test_downloads_start_before_input_ends(self):
+        """入力を最後まで読み込む前に最初のダウンロードが始まること"""
+        started = threading.Event()
+
+        def urls():
+            yield 'https://example.com/1'
+            # 1件目のダウンロードが始まるまで次のURLを渡さない
+            assert started.wait(timeout=5)
+            yield 'https://example.com/2'
+
+        def download(url):
+            started.set()
+            return True
+
+        results = list(BatchDownloader(download, jobs=2).run(urls()))
+        assert sorted(r.url for r in results) == ['https://example.com/1', 'https://example.com/2']
+
+    def test_bounded_queue(self):
+        """読み込み済みで完了していないURLの数がqueue_sizeを超えないこと"""
+        read = []
+        lock = threading.Lock()
+        peak = [0]
+        done = [0]
+
+        def urls():
+            for i in range(20):
+                read.append(i)
+                yield f'https://example.com/{i}'
+
+        def download(url):
+            time.sleep(0.005)
+            with lock:
+                done[0] += 1
+            return True
+
+        def observe():
+            while len(read) < 20:
+                with lock:
+                    peak[0] = max(peak[0], len(read) - done[0])
+                time.sleep(0.001)
+
+        observer = threading.Thread(target=observe)
+        observer.start()
+        results = list(BatchDownloader(download, jobs=2, queue_size=4).run(urls()))
+        observer.join()
+        assert len(results) == 20
+        # 読み込みスレッドは完了を待ってから次のURLを読むため、先読みは上限+1件まで
+        assert peak[0] <= 5
+
+    def test_deferred_post_processing_releases_worker(self):
+        """ダウンロード関数がFutureを返した場合、後処理の完了を待たずに次のジョブを実行すること"""
+        release = threading.Event()
+        futures = {}
+
+        def download(url):
+            # 1つのワーカーで全てのダウンロードが終わるまで、どの後処理も完了させない
+            futures[url] = Future()
+            if len(futures) == 3:
+                release.set()
+            return futures[url]
+
+        def finish():
+            assert release.wait(timeout=5)
+            futures['https://example.com/1'].set_result(True)
+            futures['https://example.com/2'].set_result(False)
+            futures['https://example.com/3'].set_exception(RuntimeError('ffmpeg failed'))
+
+        finisher = threading.Thread(target=finish)
+        finisher.start()
+        urls = [f'https://example.com/{i}' for i in range(1, 4)]
+        results = {r.url: r for r in BatchDownloader(download, jobs=1).run(urls)}
+        finisher.join()
+
+        assert results['https://example.com/1'].success
+        assert not results['https://example.com/2'].success
+        assert results['https://example.com/3'].error == 'ffmpeg failed'
+
+    def test_read_batch_urls_and_unique_urls(self, tmp_path, monkeypatch):
+        """コメントと空行を無視し、重複したURLを取り除くこと"""
+        batch_file = tmp_path / 'urls.txt'
+        batch_file.write_text('# comment\nhttps://example.com/a\n\nhttps://example.com/b\nhttps://example.com/a\n', encoding='utf-8')
+        assert list(unique_urls(read_batch_urls(str(batch_file)))) == ['https://example.com/a', 'https://example.com/b']
+
+        # "-"の場合は標準入力から読み込む
+        monkeypatch.setattr(sys, 'stdin', io.StringIO('https://example.com/c\n#x\n'))
+        assert list(read_batch_urls('-')) == ['https://example.com/c']
+
+    def test_parse_platform_limits(self):
+        """parse_platform_limits関数のテスト"""
+        assert parse_platform_limits(['youtube=2,abema=1', 'niconico=3']) == {
+            'youtube': 2, 'abema': 1, 'niconico': 3
+        }
+        assert parse_platform_limits(None) == {}
+        with pytest.raises(ValueError):
+            parse_platform_limits(['youtube'])
+        with pytest.raises(ValueError):
+            parse_platform_limits(['youtube=0'])
@@ -0,0 +1,53 @@
+"""
+メタデータキャッシュのテスト
+"""
+
+import os
+import time
+from datascoop.utils.cache import MetadataCache
+
+
+class TestMetadataCache:
+    """MetadataCacheのテストクラス"""
+
+    def test_make_key(self, tmp_path):
+        """キーがプラットフォームと動画IDから生成されること"""
+        cache = MetadataCache(cache_dir=str(tmp_path))
+        assert cache.make_key('https://youtu.be/dQw4w9WgXcQ') == 'youtube-dQw4w9WgXcQ'
+        assert cache.make_key('https://www.youtube.com/watch?v=dQw4w9WgXcQ') == 'youtube-dQw4w9WgXcQ'
+        assert cache.make_key('https://youtu.be/dQw4w9WgXcQ', 'flat') == 'youtube-dQw4w9WgXcQ-flat'
+        assert cache.make_key('https://example.com/a').startswith('unknown-')
+        assert cache.make_key('https://example.com/a') != cache.make_key('https://example.com/b')
+
+    def test_set_and_get(self, tmp_path):
+        """保存したメタデータを取得できること"""
+        cache = MetadataCache(cache_dir=str(tmp_path))
+        url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+        assert cache.get(url) is None
+        cache.set(url, {'id': 'dQw4w9WgXcQ', 'title': 'テスト'})
+        assert cache.get(url) == {'id': 'dQw4w9WgXcQ', 'title': 'テスト'}
+        assert cache.get(url, 'flat') is None
+        cache.invalidate(url)
+        assert cache.get(url) is None
+
+    def test_ttl(self, tmp_path):
+        """有効期限切れのエントリが返されないこと"""
+        cache = MetadataCache(cache_dir=str(tmp_path), ttl=0.01)
+        cache.set('https://example.com/a', {'id': 'a'})
+        time.sleep(0.05)
+        assert cache.get('https://example.com/a') is None
+
+    def test_eviction(self, tmp_path):
+        """合計サイズが上限を超えると古いエントリから削除されること"""
+        cache = MetadataCache(cache_dir=str(tmp_path), max_bytes=3000)
+        for i in range(5):
+            cache.set(f'https://example.com/{i}', {'data': 'x' * 900})
+            # 更新日時の順序を確定させる
+            path = os.path.join(str(tmp_path), cache.make_key(f'https://example.com/{i}') + '.json')
+            os.utime(path, (i, i))
+
+        cache.set('https://example.com/new', {'data': 'x' * 900})
+        sizes = [os.path.getsize(os.path.join(str(tmp_path), n)) for n in os.listdir(str(tmp_path))]
+        assert sum(sizes) <= 3000
+        assert cache.get('https://example.com/0') is None
+        assert cache.get('https://example.com/new') is not None
@@ -0,0 +1,38 @@
+"""
+設定管理のテスト
+"""
+
+from datascoop.utils.config import ConfigManager
+from datascoop.downloaders import VideoDownloader
+
+
+class TestThroughputProfiles:
+    """通信プロファイルのテストクラス"""
+
+    def test_get_throughput_options(self, tmp_path, monkeypatch):
+        """プロファイル名からyt-dlpのオプションを取得できること"""
+        monkeypatch.setenv('HOME', str(tmp_path))
+        config = ConfigManager()
+        assert config.get_throughput_options() == ConfigManager.THROUGHPUT_PROFILES['balanced']
+        assert config.get_throughput_options('datacenter')['concurrent_fragment_downloads'] == 16
+
+        config.set('throughput_profile', 'conservative')
+        assert config.get_throughput_options()['concurrent_fragment_downloads'] == 1
+        # 不明なプロファイルはbalancedとして扱う
+        assert config.get_throughput_options('unknown') == ConfigManager.THROUGHPUT_PROFILES['balanced']
+
+    def test_downloader_applies_profile(self, tmp_path):
+        """ダウンローダーがプロファイルのオプションをyt-dlpに渡すこと"""
+        downloader = VideoDownloader(output_dir=str(tmp_path), throughput_profile='datacenter')
+        with downloader._open_ydl({'quiet': True}) as ydl:
+            assert ydl.params['concurrent_fragment_downloads'] == 16
+            assert ydl.params['http_chunk_size'] == 50 * 1024 * 1024
+
+        # 個別に指定したオプションが優先されること
+        with downloader._open_ydl({'quiet': True, 'concurrent_fragment_downloads': 2}) as ydl:
+            assert ydl.params['concurrent_fragment_downloads'] == 2
+
+        # プロファイル未指定の場合はyt-dlpのデフォルト値を使用する
+        downloader = VideoDownloader(output_dir=str(tmp_path))
+        with downloader._open_ydl({'quiet': True}) as ydl:
+            assert 'concurrent_fragment_downloads' not in ydl.params
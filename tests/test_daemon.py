@@ -0,0 +1,116 @@
+"""
+常駐モードのテスト
+"""
+
+import os
+import sys
+import threading
+import pytest
+from datascoop import cli
+from datascoop.daemon import DownloadDaemon, DaemonClient, DaemonError, CANCELLED
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+@pytest.fixture
+def start_daemon(tmp_path):
+    """空いているポートで常駐プロセスを起動し、テストの終了時に停止する"""
+    daemons = []
+
+    def start(run_job, **kwargs):
+        daemon = DownloadDaemon(run_job, port=0, state_path=str(tmp_path / 'daemon.json'), **kwargs)
+        daemon.start()
+        daemons.append(daemon)
+        return daemon, DaemonClient.find(str(tmp_path / 'daemon.json'))
+
+    yield start
+    for daemon in daemons:
+        daemon.stop()
+
+
+class TestDownloadDaemon:
+    """DownloadDaemonとDaemonClientのテストクラス"""
+
+    def test_submit_and_wait(self, start_daemon, tmp_path):
+        """投入したジョブをオプションとともに実行し、状態を取得できること"""
+        calls = []
+
+        def run_job(url, options, journal):
+            calls.append((url, options))
+            return url != 'https://example.com/broken'
+
+        daemon, client = start_daemon(run_job)
+        assert client is not None
+        assert oct(os.stat(tmp_path / 'daemon.json').st_mode & 0o777) == '0o600'
+
+        job = client.submit(URL, {'type': 'audio'})
+        assert client.wait(job['id'], interval=0.01)['state'] == 'done'
+        assert calls == [(URL, {'type': 'audio'})]
+
+        job = client.submit('https://example.com/broken')
+        job = client.wait(job['id'], interval=0.01)
+        assert job['state'] == 'failed' and job['error']
+        assert [j['url'] for j in client.list()] == [URL, 'https://example.com/broken']
+
+    def test_rejects_invalid_requests(self, start_daemon):
+        """トークンが正しくないリクエストや不明なオプションを拒否すること"""
+        daemon, client = start_daemon(lambda url, options, journal: True)
+        with pytest.raises(DaemonError) as e:
+            client.submit(URL, {'limit_rate': '1M'})
+        assert e.value.status == 400
+        with pytest.raises(DaemonError) as e:
+            DaemonClient(daemon.url, 'wrong-token').list()
+        assert e.value.status == 401
+        with pytest.raises(DaemonError) as e:
+            client.status('missing')
+        assert e.value.status == 404
+
+    def test_cancel(self, start_daemon):
+        """待機中のジョブはすぐに、実行中のジョブは進捗通知の時点でキャンセルすること"""
+        started = threading.Event()
+        ran = []
+
+        def run_job(url, options, journal):
+            ran.append(url)
+            started.set()
+            hook = journal.progress_hook(url)
+            while True:
+                # キャンセルされると進捗フックが例外を送出する
+                hook({'status': 'downloading', 'downloaded_bytes': 10, 'total_bytes': 100})
+                threading.Event().wait(0.01)
+
+        daemon, client = start_daemon(run_job, jobs=1)
+        running = client.submit(URL)
+        assert started.wait(timeout=5)
+        queued = client.submit('https://www.youtube.com/watch?v=queued')
+        # 同じURLのジョブが処理中の場合は既存のジョブを返す
+        assert client.submit(URL)['id'] == running['id']
+        assert client.status(running['id'])['downloaded_bytes'] == 10
+
+        assert client.cancel(queued['id'])['state'] == CANCELLED
+        client.cancel(running['id'])
+        assert client.wait(running['id'], interval=0.01)['state'] == CANCELLED
+        assert ran == [URL]
+
+
+def test_find_without_daemon(tmp_path):
+    """常駐プロセスが起動していない場合はNoneを返すこと"""
+    assert DaemonClient.find(str(tmp_path / 'missing.json')) is None
+
+
+@pytest.mark.parametrize('options, forwarded', [
+    ([], True),
+    (['--retries', '0'], False),
+    (['--archive'], False),
+    (['--limit-rate', '1M'], False),
+])
+def test_forward_only_supported_options(tmp_path, monkeypatch, options, forwarded):
+    """常駐プロセスに反映できないオプションが指定された場合は転送せず、このプロセスでダウンロードすること"""
+    monkeypatch.setenv('HOME', str(tmp_path))
+    calls = []
+    monkeypatch.setattr(DaemonClient, 'find', classmethod(lambda cls, state_path=None: object()))
+    monkeypatch.setattr(cli, 'forward_to_daemon', lambda client, args: calls.append('daemon') or True)
+    monkeypatch.setattr(cli, 'download_content', lambda url, args, archive=None: calls.append('local') or True)
+    monkeypatch.setattr(sys, 'argv', ['datascoop', URL, '-o', str(tmp_path), '--no-progress'] + options)
+    cli.main()
+    assert calls == (['daemon'] if forwarded else ['local'])
@@ -0,0 +1,67 @@
+"""
+ジョブジャーナルのテスト
+"""
+
+import pytest
+from datascoop.utils import journal as job_journal
+from datascoop.utils.journal import JobJournal
+
+
+class TestJobJournal:
+    """JobJournalのテストクラス"""
+
+    def test_resume(self, tmp_path):
+        """再開時に最新の状態が復元されること"""
+        path = str(tmp_path / 'batch.journal.jsonl')
+        with JobJournal(path) as journal:
+            for url in ['https://example.com/a', 'https://example.com/b', 'https://example.com/c']:
+                journal.record(url, job_journal.QUEUED)
+            journal.record('https://example.com/a', job_journal.DONE)
+            journal.record('https://example.com/b', job_journal.FAILED, reason='HTTP Error 503')
+
+        # 異常終了で書きかけになった行を追加
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write('{"url": "https://example.com/c", "sta')
+
+        with JobJournal(path, resume=True) as journal:
+            assert journal.is_done('https://example.com/a')
+            assert journal.state_of('https://example.com/b') == job_journal.FAILED
+            assert journal.unfinished() == ['https://example.com/b', 'https://example.com/c']
+            assert journal.failures() == [('https://example.com/b', 'HTTP Error 503')]
+
+        # resume=Falseの場合は新しく記録を始める
+        with JobJournal(path) as journal:
+            assert journal.unfinished() == []
+
+    def test_progress_hook(self, tmp_path):
+        """進捗フックから状態の変化のみが記録されること"""
+        path = str(tmp_path / 'journal.jsonl')
+        url = 'https://example.com/a'
+        with JobJournal(path) as journal:
+            hook = journal.progress_hook(url)
+            hook({'status': 'downloading'})
+            assert journal.state_of(url) == job_journal.DOWNLOADING
+            hook({'status': 'downloading'})
+            hook({'status': 'finished'})
+            assert journal.state_of(url) == job_journal.POST_PROCESSING
+
+        with open(path, encoding='utf-8') as f:
+            assert len(f.readlines()) == 2
+
+    def test_write_retry_file(self, tmp_path):
+        """失敗したURLのみが再試行用ファイルに書き出されること"""
+        with JobJournal(str(tmp_path / 'journal.jsonl')) as journal:
+            journal.record('https://example.com/a', job_journal.DONE)
+            journal.record('https://example.com/b', job_journal.FAILED, reason='timeout')
+            retry_path = str(tmp_path / 'retry.txt')
+            assert journal.write_retry_file(retry_path) == 1
+
+        with open(retry_path, encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        assert lines == ['https://example.com/b']
+
+    def test_invalid_state(self, tmp_path):
+        """不明な状態を記録しようとするとエラーになること"""
+        with JobJournal(str(tmp_path / 'journal.jsonl')) as journal:
+            with pytest.raises(ValueError):
+                journal.record('https://example.com/a', 'unknown')
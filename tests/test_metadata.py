@@ -0,0 +1,164 @@
+"""
+メタデータのみを取得するモードのテスト
+"""
+
+import sys
+import json
+import threading
+from contextlib import contextmanager
+from datascoop import cli
+from datascoop.downloaders import video
+from datascoop.downloaders.video import VideoDownloader
+from datascoop.utils.cache import MetadataCache
+from datascoop.utils.metadata import MetadataWriter, compact_record, iter_records
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+def _video_info(video_id='dQw4w9WgXcQ', **fields):
+    """yt-dlpが返す1件の動画のメタデータを作成する"""
+    return {
+        'id': video_id,
+        'title': 'テスト動画',
+        'webpage_url': f'https://www.youtube.com/watch?v={video_id}',
+        'extractor_key': 'Youtube',
+        'duration': 212,
+        'description': '説明文',
+        'chapters': [{'start_time': 0.0, 'end_time': 30.0, 'title': 'イントロ'}],
+        'formats': [
+            {'format_id': '18', 'ext': 'mp4', 'height': 360, 'vcodec': 'avc1', 'acodec': 'mp4a',
+             'url': 'https://rr1.googlevideo.com/videoplayback', 'http_headers': {'User-Agent': 'x'},
+             'filesize_approx': 1000},
+        ],
+        'subtitles': {'ja': [{'ext': 'vtt'}], 'en': [{'ext': 'vtt'}]},
+        'automatic_captions': {},
+        **fields,
+    }
+
+
+class TestRecords:
+    """記録の作成のテストクラス"""
+
+    def test_compact_record(self):
+        """必要な項目のみを抜き出し、ダウンロードにのみ使用する情報は含めないこと"""
+        info = _video_info(
+            requested_subtitles={'ja': {'ext': 'srt', 'filepath': 'テスト動画.ja.srt'}},
+            thumbnails=[{'url': 'https://i.ytimg.com/a.jpg'}, {'url': 'https://i.ytimg.com/b.jpg', 'filepath': 'テスト動画.jpg'}],
+        )
+        record = compact_record(info, URL)
+        assert record['url'] == URL and record['extractor'] == 'Youtube'
+        assert record['duration'] == 212 and 'description' not in record
+        assert record['chapters'] == [{'start': 0.0, 'end': 30.0, 'title': 'イントロ'}]
+        assert record['formats'] == [{'id': '18', 'ext': 'mp4', 'height': 360, 'vcodec': 'avc1',
+                                      'acodec': 'mp4a', 'filesize': 1000}]
+        assert record['subtitles'] == ['en', 'ja'] and record['automatic_captions'] == []
+        assert record['files'] == ['テスト動画.ja.srt', 'テスト動画.jpg']
+
+    def test_playlist_records(self):
+        """プレイリストの場合は動画ごとの記録を作成すること"""
+        info = {
+            '_type': 'playlist',
+            'entries': [
+                _video_info('a', playlist='テスト', playlist_index=1),
+                None,
+                _video_info('b', playlist='テスト', playlist_index=2),
+            ],
+        }
+        records = list(iter_records(info, 'https://www.youtube.com/playlist?list=PLtest'))
+        assert [r['id'] for r in records] == ['a', 'b']
+        assert records[1]['url'] == 'https://www.youtube.com/watch?v=b' and records[1]['playlist_index'] == 2
+
+    def test_writer(self, tmp_path):
+        """複数のスレッドから書き込んでも1行に1件の記録になること"""
+        path = tmp_path / 'out' / 'metadata.jsonl'
+        with MetadataWriter(str(path)) as writer:
+            threads = [
+                threading.Thread(target=lambda i=i: [writer.write({'id': f'{i}-{n}'}) for n in range(50)])
+                for i in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        lines = path.read_text(encoding='utf-8').splitlines()
+        assert writer.count == len(lines) == 200
+        assert all('fetched_at' in json.loads(line) for line in lines)
+
+
+class FakeYoutubeDL:
+    """渡されたオプションを記録し、固定のメタデータを返すyt-dlpのインスタンス"""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def extract_info(self, url, download=True):
+        self.calls.append(download)
+        return _video_info()
+
+    def sanitize_info(self, info):
+        return info
+
+
+class TestExtractMetadata:
+    """VideoDownloader.extract_metadataのテストクラス"""
+
+    def _downloader(self, tmp_path, monkeypatch):
+        downloader = VideoDownloader(output_dir=str(tmp_path))
+        cache = MetadataCache(cache_dir=str(tmp_path / 'cache'))
+        monkeypatch.setattr(video, 'get_metadata_cache', lambda: cache)
+        options = []
+        calls = []
+
+        @contextmanager
+        def open_ydl(ydl_opts):
+            options.append(ydl_opts)
+            yield FakeYoutubeDL(calls)
+
+        monkeypatch.setattr(downloader, '_open_ydl', open_ydl)
+        return downloader, options, calls
+
+    def test_metadata_only(self, tmp_path, monkeypatch):
+        """動画を転送せずに取得し、2回目はキャッシュを使用すること"""
+        downloader, options, calls = self._downloader(tmp_path, monkeypatch)
+        assert downloader.extract_metadata(URL)['title'] == 'テスト動画'
+        assert downloader.extract_metadata(URL)['title'] == 'テスト動画'
+        assert calls == [False]
+        assert options[0]['skip_download'] and 'writethumbnail' not in options[0]
+
+    def test_subtitles_and_thumbnails(self, tmp_path, monkeypatch):
+        """字幕やサムネイルを保存する場合は、キャッシュを使わずに動画以外のファイルを保存すること"""
+        downloader, options, calls = self._downloader(tmp_path, monkeypatch)
+        downloader.extract_metadata(URL)
+        downloader.extract_metadata(URL, subtitles=True, thumbnails=True)
+        assert calls == [False, True]
+        assert options[1]['skip_download'] and options[1]['writesubtitles'] and options[1]['writethumbnail']
+
+
+def test_batch_metadata_only(tmp_path, monkeypatch):
+    """バッチファイルのURLのメタデータを並列に取得し、失敗したURLはジャーナルに記録すること"""
+    urls = [f'https://www.youtube.com/watch?v=video{i:05d}' for i in range(6)]
+    batch_file = tmp_path / 'urls.txt'
+    batch_file.write_text('\n'.join(urls + ['https://www.youtube.com/watch?v=broken']), encoding='utf-8')
+
+    def extract_metadata(self, url, subtitles=False, thumbnails=False, use_cache=True, **kwargs):
+        if 'broken' in url:
+            return None
+        return _video_info(url.rsplit('=', 1)[1])
+
+    monkeypatch.setattr(VideoDownloader, 'extract_metadata', extract_metadata)
+    output = tmp_path / 'metadata.jsonl'
+    monkeypatch.setattr(sys, 'argv', [
+        'datascoop', '--batch-file', str(batch_file), '--metadata-only', '--metadata-file', str(output),
+        '-j', '3', '-o', str(tmp_path / 'downloads'), '--retries', '0', '--no-progress',
+    ])
+    args = cli.parse_arguments()
+    with cli.open_metadata_writer(args) as writer:
+        summary = cli.process_batch_file(str(batch_file), args, metadata_writer=writer)
+
+    records = [json.loads(line) for line in output.read_text(encoding='utf-8').splitlines()]
+    assert sorted(r['url'] for r in records) == urls
+    assert [r.url for r in summary.failed] == ['https://www.youtube.com/watch?v=broken']
+    retry_lines = (tmp_path / 'urls.txt.retry.txt').read_text(encoding='utf-8').splitlines()
+    assert [line for line in retry_lines if not line.startswith('#')] == ['https://www.youtube.com/watch?v=broken']
+    # 動画は転送していない
+    assert not (tmp_path / 'downloads').exists() or not any((tmp_path / 'downloads').iterdir())
@@ -0,0 +1,78 @@
+"""
+段階ごとの計測のテスト
+"""
+
+import json
+import pytest
+from datascoop.utils.metrics import MetricsRecorder, percentile, STAGE_DOWNLOAD, STAGE_EXTRACT, STAGE_TRANSFER
+
+URL = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+
+
+class TestMetricsRecorder:
+    """MetricsRecorderのテストクラス"""
+
+    def test_percentile(self):
+        """最近傍順位法でパーセンタイルを計算すること"""
+        values = list(range(1, 101))
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.95) == 95
+        assert percentile([3.0], 0.95) == 3.0
+        assert percentile([], 0.5) is None
+
+    def test_download_stages(self, tmp_path):
+        """ダウンロード中の進捗から抽出と転送の所要時間・転送量・速度を記録すること"""
+        path = tmp_path / 'metrics.jsonl'
+        metrics = MetricsRecorder(jsonl_path=str(path))
+        info = {'original_url': URL}
+        with metrics.stage(STAGE_DOWNLOAD, url=URL):
+            for downloaded, speed in ((1000, 100.0), (5000, 400.0), (8000, 300.0)):
+                # yt-dlpの実際の通知: 転送中はtmpfilenameも含み、完了時はfilenameのみを含む
+                metrics.progress_hook({'status': 'downloading', 'filename': 'a.mp4', 'tmpfilename': 'a.mp4.part',
+                                       'info_dict': info, 'downloaded_bytes': downloaded, 'total_bytes': 8000,
+                                       'speed': speed})
+            metrics.progress_hook({'status': 'finished', 'filename': 'a.mp4', 'info_dict': info,
+                                   'downloaded_bytes': 8000, 'total_bytes': 8000, 'elapsed': 2.0})
+            assert not metrics._transfers
+        with pytest.raises(RuntimeError):
+            with metrics.stage(STAGE_DOWNLOAD, url=URL):
+                raise RuntimeError('failed')
+        metrics.record_retries('youtube', 2)
+        metrics.close()
+
+        summary = metrics.summary()
+        assert summary[(STAGE_DOWNLOAD, 'youtube')]['count'] == 2
+        assert summary[(STAGE_DOWNLOAD, 'youtube')]['failures'] == 1
+        assert summary[(STAGE_EXTRACT, 'youtube')]['count'] == 1
+        assert summary[(STAGE_TRANSFER, 'youtube')]['total'] == 2.0
+        assert metrics.totals()['youtube'] == {'bytes': 8000, 'peak_speed': 400.0, 'retries': 2}
+
+        events = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+        transfer = next(e for e in events if e['stage'] == STAGE_TRANSFER)
+        assert transfer['bytes'] == 8000
+        assert transfer['avg_speed'] == 4000.0
+        assert transfer['peak_speed'] == 400.0
+        assert [e['ok'] for e in events if e['stage'] == STAGE_DOWNLOAD] == [True, False]
+
+    def test_postprocessor_hook(self):
+        """yt-dlpの後処理フックから後処理の所要時間を記録すること"""
+        metrics = MetricsRecorder()
+        d = {'postprocessor': 'Merger', 'info_dict': {'id': 'dQw4w9WgXcQ', 'webpage_url': URL}}
+        metrics.postprocessor_hook({**d, 'status': 'started'})
+        metrics.postprocessor_hook({**d, 'status': 'finished'})
+        assert metrics.summary()[('postprocess', 'youtube')]['count'] == 1
+
+    def test_write_prometheus(self, tmp_path):
+        """Prometheusのtextfile形式で書き出すこと"""
+        metrics = MetricsRecorder()
+        for duration in (1.0, 2.0, 3.0):
+            metrics.record(STAGE_TRANSFER, duration, 'niconico')
+        metrics.record_retries('niconico', 1)
+        path = tmp_path / 'datascoop.prom'
+        metrics.write_prometheus(str(path))
+
+        text = path.read_text(encoding='utf-8')
+        assert '# TYPE datascoop_stage_duration_seconds summary' in text
+        assert 'datascoop_stage_duration_seconds{stage="transfer",platform="niconico",quantile="0.5"} 2.000000' in text
+        assert 'datascoop_stage_duration_seconds_count{stage="transfer",platform="niconico"} 3' in text
+        assert 'datascoop_retries_total{platform="niconico"} 1' in text
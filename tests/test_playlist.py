@@ -0,0 +1,218 @@
+"""
+プレイリストの並列ダウンロードのテスト
+"""
+
+import threading
+import yt_dlp
+from datascoop.downloaders import abema
+from datascoop.downloaders.abema import AbemaDownloader
+from datascoop.downloaders.video import LAST_PLAYLIST_INDEX_KEY
+from datascoop.downloaders.youtube import YouTubeDownloader
+from datascoop.utils.archive import DownloadArchive
+
+
+def _flat_playlist(count, requested=None):
+    """フラット抽出したプレイリストの情報を作成する"""
+    info = {
+        '_type': 'playlist',
+        'id': 'PLtest',
+        'title': 'テスト',
+        'extractor': 'youtube:tab',
+        'extractor_key': 'YoutubeTab',
+        'entries': [
+            {'_type': 'url', 'url': f'https://www.youtube.com/watch?v=video{i:05d}', 'title': f'動画{i}'}
+            for i in range(count)
+        ],
+    }
+    if requested:
+        info['requested_entries'] = requested
+    return info
+
+
+class TestPlaylistEntries:
+    """YouTubeDownloader._playlist_entriesのテストクラス"""
+
+    def test_indices_and_padding(self, tmp_path):
+        """playlist_indexとゼロ埋めがyt-dlpの逐次処理と同じになること"""
+        downloader = YouTubeDownloader(output_dir=str(tmp_path))
+        with yt_dlp.YoutubeDL({'outtmpl': '%(playlist_title)s/%(playlist_index)s-%(title)s.%(ext)s'}) as ydl:
+            entries = downloader._playlist_entries(_flat_playlist(12))
+            assert [extra['playlist_index'] for _, extra in entries] == list(range(1, 13))
+
+            _, extra = entries[0]
+            filename = ydl.prepare_filename({'title': '動画0', 'ext': 'mp4', **extra})
+            assert filename == 'テスト/01-動画0.mp4'
+
+    def test_start_at(self, tmp_path):
+        """開始位置を指定した場合にプレイリスト内の番号が維持されること"""
+        downloader = YouTubeDownloader(output_dir=str(tmp_path))
+        entries = downloader._playlist_entries(_flat_playlist(3), start_at=5)
+        assert [extra['playlist_index'] for _, extra in entries] == [5, 6, 7]
+        assert [extra['playlist_autonumber'] for _, extra in entries] == [1, 2, 3]
+
+        entries = downloader._playlist_entries(_flat_playlist(2, requested=[3, 9]))
+        assert [extra['playlist_index'] for _, extra in entries] == [3, 9]
+        assert entries[0][1][LAST_PLAYLIST_INDEX_KEY] == 9
+
+    def test_last_playlist_index_key(self):
+        """インストールされているyt-dlpが、ゼロ埋めの桁数をLAST_PLAYLIST_INDEX_KEYの項目から決めること"""
+        version = yt_dlp.version.__version__
+        with yt_dlp.YoutubeDL({'outtmpl': '%(playlist_index)s.%(ext)s'}) as ydl:
+            assert ydl.prepare_filename({'playlist_index': 7, 'ext': 'mp4'}) == '7.mp4'
+            filename = ydl.prepare_filename({'playlist_index': 7, 'ext': 'mp4', LAST_PLAYLIST_INDEX_KEY: 150})
+        assert filename == '007.mp4', f"yt-dlp {version} では {LAST_PLAYLIST_INDEX_KEY} が使用されていません"
+
+    def test_matches_yt_dlp_filenames(self, tmp_path):
+        """インストールされているyt-dlpがプレイリストを順に処理した場合と同じファイル名になること"""
+        outtmpl = '%(playlist_title)s/%(playlist_index)s-%(playlist_autonumber)s-%(title)s.%(ext)s'
+        info = _flat_playlist(12)
+        videos = [
+            {'id': f'video{i:05d}', 'title': f'動画{i}', 'ext': 'mp4', 'url': f'http://127.0.0.1:9/{i}.mp4',
+             'extractor': 'youtube', 'extractor_key': 'Youtube'}
+            for i in range(12)
+        ]
+        expected = []
+        with yt_dlp.YoutubeDL({'simulate': True, 'quiet': True, 'outtmpl': outtmpl}) as ydl:
+            class RecordFilename(yt_dlp.postprocessor.PostProcessor):
+                def run(self, video):
+                    expected.append(ydl.prepare_filename(video))
+                    return [], video
+
+            ydl.add_post_processor(RecordFilename(), when='video')
+            ydl.process_ie_result({**info, 'entries': videos}, download=True)
+
+            downloader = YouTubeDownloader(output_dir=str(tmp_path))
+            actual = [
+                ydl.prepare_filename({**videos[extra['playlist_index'] - 1], **extra})
+                for _, extra in downloader._playlist_entries(info)
+            ]
+        assert actual == expected
+
+
+class TestStreamingPlaylist:
+    """プレイリストを逐次処理するダウンロードのテストクラス"""
+
+    def test_download_entries_bounded(self, tmp_path, monkeypatch):
+        """エントリを同時実行数の2倍までしか先に取り出さないこと"""
+        downloader = YouTubeDownloader(output_dir=str(tmp_path))
+        lock = threading.Lock()
+        state = {'produced': 0, 'completed': 0, 'ahead': 0}
+
+        def entries():
+            for i in range(1, 201):
+                with lock:
+                    state['produced'] += 1
+                    state['ahead'] = max(state['ahead'], state['produced'] - state['completed'])
+                yield {'url': f'video{i}'}, {'playlist_index': i}
+
+        def download_entry(entry, extra_info, ydl_opts):
+            with lock:
+                state['completed'] += 1
+            return f"{entry['url']}.mp4"
+
+        monkeypatch.setattr(downloader, '_download_playlist_entry', download_entry)
+        files, failed = downloader._download_entries(entries(), {}, jobs=3)
+        assert files == [f'video{i}.mp4' for i in range(1, 201)] and failed == 0
+        assert state['ahead'] <= 3 * 2 + 1
+
+    def test_download_playlist(self, tmp_path, monkeypatch):
+        """遅延抽出したエントリを開始位置と最大数に従って取り出し、ゼロ埋めは最後の番号で決めること"""
+        downloader = YouTubeDownloader(output_dir=str(tmp_path))
+        info = _flat_playlist(120)
+        consumed = []
+
+        def lazy_entries():
+            for entry in info['entries']:
+                consumed.append(entry['url'])
+                yield entry
+
+        def extract_info(ydl, url, download=True, **kwargs):
+            assert kwargs.get('process') is False
+            return {**info, 'entries': lazy_entries(), 'playlist_count': 120}
+
+        def download_entry(entry, extra_info, ydl_opts):
+            with downloader._open_ydl({'outtmpl': '%(playlist_title)s/%(playlist_index)s-%(title)s.%(ext)s'}) as ydl:
+                return ydl.prepare_filename({'title': entry['title'], 'ext': 'mp4', **extra_info})
+
+        monkeypatch.setattr(downloader, '_extract_info', extract_info)
+        monkeypatch.setattr(downloader, '_download_playlist_entry', download_entry)
+        files = downloader.download_playlist('https://www.youtube.com/playlist?list=PLtest', max_videos=3, start_at=9, jobs=2)
+        assert files == ['テスト/09-動画8.mp4', 'テスト/10-動画9.mp4', 'テスト/11-動画10.mp4']
+        # 終了位置より後のエントリは取り出さない
+        assert len(consumed) == 11
+
+        files = downloader.download_playlist('https://www.youtube.com/playlist?list=PLtest', start_at=119)
+        assert files == ['テスト/119-動画118.mp4', 'テスト/120-動画119.mp4']
+
+
+    def test_unknown_count(self, tmp_path, monkeypatch):
+        """動画数が分からない遅延抽出でも、プレイリスト全体を処理した場合と同じ桁数でゼロ埋めすること"""
+        downloader = YouTubeDownloader(output_dir=str(tmp_path))
+        info = _flat_playlist(150)
+
+        def extract_info(ydl, url, download=True, **kwargs):
+            return {**info, 'entries': iter(info['entries'])}
+
+        def download_entry(entry, extra_info, ydl_opts):
+            outtmpl = '%(playlist_index)s-%(playlist_autonumber)s-%(title)s.%(ext)s'
+            with downloader._open_ydl({'outtmpl': outtmpl}) as ydl:
+                return ydl.prepare_filename({'title': entry['title'], 'ext': 'mp4', **extra_info})
+
+        monkeypatch.setattr(downloader, '_extract_info', extract_info)
+        monkeypatch.setattr(downloader, '_download_playlist_entry', download_entry)
+        files = downloader.download_playlist('https://www.youtube.com/playlist?list=PLtest', start_at=7, jobs=2)
+        assert len(files) == 144
+        assert files[0] == '007-001-動画6.mp4' and files[-1] == '150-144-動画149.mp4'
+
+        files = downloader.download_playlist('https://www.youtube.com/playlist?list=PLtest', max_videos=3, start_at=7)
+        assert files == ['7-1-動画6.mp4', '8-2-動画7.mp4', '9-3-動画8.mp4']
+
+
+class TestAbemaSeries:
+    """AbemaDownloaderの作品タイトルURLの処理のテストクラス"""
+
+    SERIES_URL = 'https://abema.tv/video/title/90-1887'
+
+    def _downloader(self, tmp_path, monkeypatch, failing=()):
+        """作品のメタデータとエピソードのダウンロードを置き換えたダウンローダーを作成する"""
+        info = {
+            '_type': 'playlist',
+            'id': '90-1887',
+            'title': 'テスト作品',
+            'extractor': 'AbemaTVTitle',
+            'extractor_key': 'AbemaTVTitle',
+            'entries': [
+                {'_type': 'url', 'url': f'https://abema.tv/video/episode/90-1887_s1_p{i}'}
+                for i in range(1, 4)
+            ],
+        }
+        monkeypatch.setattr(abema, 'cached_extract_info', lambda *args, **kwargs: info)
+        downloader = AbemaDownloader(output_dir=str(tmp_path))
+        downloaded = []
+
+        def download_entry(entry, extra_info, ydl_opts):
+            downloaded.append(entry['url'])
+            if extra_info['playlist_index'] in failing:
+                return False
+            return f"episode{extra_info['playlist_index']}.mp4"
+
+        monkeypatch.setattr(downloader, '_download_playlist_entry', download_entry)
+        return downloader, downloaded
+
+    def test_returns_files_and_skips_archived(self, tmp_path, monkeypatch):
+        """エピソードのファイルパスを順に返し、アーカイブ済みのエピソードはダウンロードしないこと"""
+        downloader, downloaded = self._downloader(tmp_path, monkeypatch)
+        archive = DownloadArchive(str(tmp_path / 'archive.txt'))
+        archive.add('abematv 90-1887_s1_p2')
+
+        files = downloader.download(self.SERIES_URL, archive=archive, jobs=3)
+        assert files == ['episode1.mp4', 'episode3.mp4']
+        assert sorted(downloaded) == [
+            'https://abema.tv/video/episode/90-1887_s1_p1',
+            'https://abema.tv/video/episode/90-1887_s1_p3',
+        ]
+
+    def test_failed_episode(self, tmp_path, monkeypatch):
+        """失敗したエピソードがある場合はNoneを返すこと"""
+        downloader, _ = self._downloader(tmp_path, monkeypatch, failing=(2,))
+        assert downloader.download(self.SERIES_URL) is None
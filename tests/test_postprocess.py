@@ -0,0 +1,90 @@
+"""
+後処理のパイプラインのテスト
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import Future
+from datascoop.postprocess import TranscodePool, then
+
+
+class TestTranscodePool:
+    """TranscodePoolのテストクラス"""
+
+    def test_runs_in_worker_processes(self):
+        """登録した関数が別のプロセスで実行され、結果をFutureで受け取れること"""
+        with TranscodePool(workers=2) as pool:
+            futures = [pool.submit(os.getpid) for _ in range(4)]
+            pids = {f.result(timeout=60) for f in futures}
+        assert os.getpid() not in pids
+        assert len(pids) <= 2
+
+    def test_back_pressure(self):
+        """実行中と待機中の数が上限に達すると、空きができるまで登録を待たせること"""
+        pool = TranscodePool(workers=1, queue_size=2)
+        try:
+            first = pool.submit(time.sleep, 0.5)
+            pool.submit(time.sleep, 0)
+            submitted = threading.Event()
+
+            def submit_third():
+                pool.submit(time.sleep, 0)
+                submitted.set()
+
+            thread = threading.Thread(target=submit_third)
+            thread.start()
+            # 最初の変換が終わるまでは3件目を登録できない
+            assert not submitted.wait(timeout=0.1) or first.done()
+            first.result(timeout=60)
+            assert submitted.wait(timeout=60)
+            thread.join()
+        finally:
+            pool.close()
+
+    def test_close_without_wait(self):
+        """待たずに終了する場合は、開始していない変換を取り消すこと"""
+        pool = TranscodePool(workers=1, queue_size=3)
+        running = pool.submit(time.sleep, 0.5)
+        queued = [pool.submit(time.sleep, 0) for _ in range(2)]
+        pool.close(wait=False)
+        running.result(timeout=60)
+        assert all(f.cancelled() or f.done() for f in queued)
+        assert any(f.cancelled() for f in queued)
+
+    def test_failed_transcode_removes_source(self, tmp_path):
+        """変換に失敗した場合は、一時的に保存した変換元のファイルを削除すること"""
+        source = tmp_path / 'source.webm'
+        source.write_bytes(b'not a media file')
+        with TranscodePool(workers=1) as pool:
+            future = pool.submit_audio(str(source), str(tmp_path / 'out'), 'invalid', remove_source=True)
+            assert future.exception(timeout=60) is not None
+        assert not source.exists()
+
+    def test_defaults(self):
+        """プロセスの数と待機数の上限の既定値"""
+        pool = TranscodePool(workers=3)
+        assert pool.workers == 3
+        assert pool.queue_size == 6
+        # プロセスは最初の登録まで起動しない
+        pool.close()
+
+
+def test_then():
+    """Futureの結果を変換でき、例外はそのまま伝わること"""
+    source = Future()
+    chained = then(source, lambda value: value * 2)
+    source.set_result(21)
+    assert chained.result(timeout=1) == 42
+
+    failed = Future()
+    chained = then(failed, lambda value: value)
+    failed.set_exception(ValueError('boom'))
+    assert isinstance(chained.exception(timeout=1), ValueError)
+
+    errors = []
+    failed = Future()
+    chained = then(failed, lambda value: value, on_error=errors.append)
+    failed.set_exception(ValueError('boom'))
+    assert isinstance(chained.exception(timeout=1), ValueError)
+    assert len(errors) == 1 and isinstance(errors[0], ValueError)
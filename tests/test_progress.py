@@ -0,0 +1,89 @@
+"""
+進捗表示のテスト
+"""
+
+import io
+import logging
+from datascoop.utils.progress import ProgressReporter, format_bytes
+
+
+def _downloading(name, downloaded, total, speed=1024):
+    """yt-dlpの進捗情報を作成する"""
+    return {
+        'status': 'downloading',
+        'filename': name,
+        'downloaded_bytes': downloaded,
+        'total_bytes': total,
+        'speed': speed,
+    }
+
+
+class TestProgressReporter:
+    """ProgressReporterのテストクラス"""
+
+    def test_format_bytes(self):
+        """バイト数が単位付きで表示されること"""
+        assert format_bytes(512) == '512B'
+        assert format_bytes(1536) == '1.5KiB'
+        assert format_bytes(5 * 1024 * 1024) == '5.0MiB'
+        assert format_bytes(3 * 1024 ** 3) == '3.0GiB'
+
+    def test_aggregates_concurrent_downloads(self):
+        """並列ダウンロードの進捗が集計されること"""
+        reporter = ProgressReporter(use_tty=False, enabled=False)
+        reporter.update(_downloading('a.mp4', 100, 1000))
+        reporter.update(_downloading('b.mp4', 50, 500))
+        stats = reporter.snapshot()
+        assert stats['active'] == 2
+        assert stats['downloaded_bytes'] == 150
+        assert stats['total_bytes'] == 1500
+        assert stats['speed'] == 2048
+
+        reporter.update({'status': 'finished', 'filename': 'a.mp4', 'total_bytes': 1000})
+        stats = reporter.snapshot()
+        assert stats['active'] == 1
+        assert stats['finished'] == 1
+        assert stats['downloaded_bytes'] == 1050
+
+    def test_real_event_sequence(self):
+        """yt-dlpの実際の通知（転送中はtmpfilenameを含み、完了時は含まない）で完了を集計すること"""
+        reporter = ProgressReporter(use_tty=False, enabled=False)
+        for downloaded in (500, 1500):
+            reporter.update({
+                'status': 'downloading', 'filename': 'a.mp4', 'tmpfilename': 'a.mp4.part',
+                'downloaded_bytes': downloaded, 'total_bytes': 1500, 'speed': 1024.0, 'elapsed': 1.0,
+            })
+        reporter.update({'status': 'finished', 'filename': 'a.mp4', 'downloaded_bytes': 1500,
+                         'total_bytes': 1500, 'elapsed': 1.5})
+        stats = reporter.snapshot()
+        assert stats['active'] == 0 and stats['finished'] == 1
+        assert stats['downloaded_bytes'] == stats['total_bytes'] == 1500
+
+        reporter.update({'status': 'downloading', 'filename': 'b.mp4', 'tmpfilename': 'b.mp4.part',
+                         'downloaded_bytes': 10, 'total_bytes': 100})
+        reporter.update({'status': 'error', 'filename': 'b.mp4', 'downloaded_bytes': 10, 'total_bytes': 100})
+        assert reporter.snapshot()['active'] == 0
+
+    def test_non_tty_summary_is_throttled(self, caplog):
+        """端末以外では一定間隔でのみ要約が出力されること"""
+        reporter = ProgressReporter(interval=0, summary_interval=3600, stream=io.StringIO())
+        reporter._last_summary -= 3600
+        with caplog.at_level(logging.INFO, logger='datascoop.utils.progress'):
+            for i in range(1000):
+                reporter.update(_downloading('a.mp4', i, 1000))
+        summaries = [r for r in caplog.records if 'ダウンロード進捗' in r.getMessage()]
+        assert len(summaries) == 1
+
+    def test_tty_bar(self):
+        """端末では1本のプログレスバーにまとめて表示されること"""
+        stream = io.StringIO()
+        reporter = ProgressReporter(interval=0, stream=stream, use_tty=True)
+        reporter.update(_downloading('a.mp4', 100, 1000))
+        reporter.update(_downloading('b.mp4', 100, 1000))
+        assert reporter._bar is not None
+        assert reporter._bar.n == 200
+        assert '2件ダウンロード中' in stream.getvalue()
+
+        reporter.update({'status': 'finished', 'filename': 'a.mp4', 'total_bytes': 1000})
+        reporter.update({'status': 'finished', 'filename': 'b.mp4', 'total_bytes': 1000})
+        assert reporter._bar is None
@@ -0,0 +1,103 @@
+"""
+再試行の管理のテスト
+"""
+
+import random
+import socket
+from datascoop.utils.retry import (
+    RetryPolicy,
+    classify_error,
+    record_error,
+    TRANSIENT,
+    THROTTLED,
+    GEO_AUTH,
+    PERMANENT,
+)
+
+
+class DownloadError(Exception):
+    """yt-dlpのDownloadErrorと同じく元の例外を保持する例外"""
+
+    def __init__(self, msg, exc_info=None):
+        super().__init__(msg)
+        self.exc_info = exc_info
+
+
+class GeoRestrictedError(Exception):
+    """yt-dlpのGeoRestrictedErrorと同じ名前の例外"""
+
+
+class TestClassifyError:
+    """classify_error関数のテストクラス"""
+
+    def test_messages(self):
+        """yt-dlpのエラーメッセージを分類できること"""
+        assert classify_error('ERROR: Unable to download webpage: HTTP Error 503: Service Unavailable') == TRANSIENT
+        assert classify_error('ERROR: [Errno 104] Connection reset by peer') == TRANSIENT
+        assert classify_error('ERROR: Read timed out.') == TRANSIENT
+        assert classify_error('ERROR: HTTP Error 429: Too Many Requests') == THROTTLED
+        assert classify_error('ERROR: The uploader has not made this video available in your country') == GEO_AUTH
+        assert classify_error('ERROR: Sign in to confirm your age') == GEO_AUTH
+        assert classify_error('ERROR: Private video') == GEO_AUTH
+        assert classify_error('ERROR: Unable to download webpage: HTTP Error 404: Not Found') == PERMANENT
+        assert classify_error('ERROR: Unsupported URL: https://example.com') == PERMANENT
+        assert classify_error(None) == PERMANENT
+
+    def test_exceptions(self):
+        """例外の種類や元の例外から分類できること"""
+        assert classify_error(socket.timeout('timed out')) == TRANSIENT
+        assert classify_error(ConnectionResetError()) == TRANSIENT
+        assert classify_error(GeoRestrictedError('blocked')) == GEO_AUTH
+        wrapped = DownloadError('ERROR: download failed', exc_info=(None, ConnectionResetError(), None))
+        assert classify_error(wrapped) == TRANSIENT
+
+
+class TestRetryPolicy:
+    """RetryPolicyのテストクラス"""
+
+    def test_backoff_with_jitter(self):
+        """待機時間が指数的に増え、上限とジッターの範囲に収まること"""
+        policy = RetryPolicy(base_delay=1.0, max_delay=10.0, throttle_factor=4.0, rng=random.Random(0))
+        for attempt, expected in ((1, 1.0), (2, 2.0), (3, 4.0), (5, 10.0)):
+            delay = policy.delay_for(attempt, TRANSIENT)
+            assert expected / 2 <= delay <= expected
+        assert 2.0 <= policy.delay_for(1, THROTTLED) <= 4.0
+
+    def test_retry_limits_and_budget(self):
+        """再試行できない分類、ジョブごとの上限、プラットフォームの予算を守ること"""
+        policy = RetryPolicy(retries=2, platform_budget={'youtube': 3, 'unknown': 1}, base_delay=0)
+        assert policy.next_delay('youtube', 1, PERMANENT) is None
+        assert policy.next_delay('youtube', 1, GEO_AUTH) is None
+        assert policy.next_delay('youtube', 1, TRANSIENT) == 0
+        assert policy.next_delay('youtube', 2, THROTTLED) == 0
+        # ジョブごとの再試行の上限
+        assert policy.next_delay('youtube', 3, TRANSIENT) is None
+        assert policy.remaining_budget('youtube') == 1
+        assert policy.next_delay('youtube', 1, TRANSIENT) == 0
+        # プラットフォームの予算を使い切った
+        assert policy.next_delay('youtube', 1, TRANSIENT) is None
+        assert policy.next_delay('example', 1, TRANSIENT) == 0
+        assert policy.next_delay('example', 1, TRANSIENT) is None
+
+    def test_call(self):
+        """記録されたエラーが一時的なものであれば再試行すること"""
+        attempts = []
+        sleeps = []
+
+        def download():
+            attempts.append(1)
+            if len(attempts) < 3:
+                record_error('HTTP Error 503: Service Unavailable')
+                return False
+            return True
+
+        policy = RetryPolicy(retries=3, base_delay=1.0, rng=random.Random(0))
+        assert policy.call(download, 'youtube', sleep=sleeps.append) == (True, 3, None, None)
+        assert len(sleeps) == 2
+
+        def forbidden():
+            record_error('HTTP Error 403: Forbidden')
+            return False
+
+        success, count, category, error = policy.call(forbidden, 'youtube', sleep=sleeps.append)
+        assert (success, count, category) == (False, 1, GEO_AUTH)
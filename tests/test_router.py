@@ -0,0 +1,54 @@
+"""
+URLの振り分けのテスト
+"""
+
+import sys
+import subprocess
+from datascoop.utils.router import classify_url, classify_many, Route
+from datascoop.utils.helpers import extract_content_id
+
+
+class TestRouter:
+    """URLの振り分けのテストクラス"""
+
+    def test_classify_url(self):
+        """プラットフォーム・種類・コンテンツID・ダウンローダーを判定できること"""
+        cases = {
+            'https://www.youtube.com/watch?v=dQw4w9WgXcQ': ('youtube', 'video', 'dQw4w9WgXcQ', 'YouTubeDownloader'),
+            'https://youtu.be/dQw4w9WgXcQ': ('youtube', 'video', 'dQw4w9WgXcQ', 'YouTubeDownloader'),
+            'https://www.youtube.com/shorts/dQw4w9WgXcQ': ('youtube', 'video', 'dQw4w9WgXcQ', 'YouTubeDownloader'),
+            'https://www.youtube.com/playlist?list=PLabc_123-x': ('youtube', 'playlist', 'PLabc_123-x', 'YouTubeDownloader'),
+            'https://www.youtube.com/@example': ('youtube', 'channel', '@example', 'YouTubeDownloader'),
+            'https://www.youtube.com/channel/UC1234567890': ('youtube', 'channel', 'channel/UC1234567890', 'YouTubeDownloader'),
+            'https://www.nicovideo.jp/watch/sm12345678': ('niconico', 'video', 'sm12345678', 'VideoDownloader'),
+            'https://www.nicovideo.jp/user/1234/series/5678': ('niconico', 'series', 'series/5678', 'VideoDownloader'),
+            'https://abema.tv/video/episode/90-1_s1_p1': ('abema', 'video', '90-1_s1_p1', 'AbemaDownloader'),
+            'https://abema.tv/video/title/90-1': ('abema', 'series', '90-1', 'AbemaDownloader'),
+            'https://example.com/video.mp4': ('unknown', 'unknown', None, 'VideoDownloader'),
+        }
+        for url, expected in cases.items():
+            assert classify_url(url) == Route(*expected), url
+
+    def test_classify_many(self):
+        """入力と同じ順序で判定結果を返し、同じURLはキャッシュされること"""
+        urls = ['https://youtu.be/dQw4w9WgXcQ', 'https://example.com/a', 'https://youtu.be/dQw4w9WgXcQ']
+        routes = list(classify_many(iter(urls)))
+        assert [r.platform for r in routes] == ['youtube', 'unknown', 'youtube']
+        assert routes[0] is routes[2]
+
+    def test_extract_content_id_only_for_single_content(self):
+        """再生リストやチャンネルのURLはコンテンツIDを持たないこと"""
+        assert extract_content_id('https://www.youtube.com/playlist?list=PLabc') is None
+        assert extract_content_id('https://www.youtube.com/@example') is None
+        assert extract_content_id('https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PLabc') == ('youtube', 'dQw4w9WgXcQ')
+
+    def test_downloader_class_is_resolved_lazily(self):
+        """判定だけではyt-dlpを読み込まず、ダウンローダーのクラスは参照した時点で解決すること"""
+        code = (
+            "import sys\n"
+            "from datascoop.utils.router import classify_url\n"
+            "route = classify_url('https://abema.tv/video/title/90-1')\n"
+            "assert 'yt_dlp' not in sys.modules\n"
+            "assert route.downloader_class.__name__ == 'AbemaDownloader'\n"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True)
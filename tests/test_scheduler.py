@@ -0,0 +1,121 @@
+"""
+バッチダウンロードのスケジューラーのテスト
+"""
+
+import time
+import threading
+from datascoop.batch import BatchDownloader, read_batch_urls
+from datascoop.scheduler import (
+    FifoScheduler,
+    PriorityScheduler,
+    ShortestJobFirstScheduler,
+    PlatformScheduler,
+    create_scheduler,
+    estimate_size,
+)
+
+
+class FakeCache:
+    """URLごとのメタデータを返すキャッシュ"""
+
+    def __init__(self, infos):
+        self.infos = infos
+
+    def get(self, url, variant=None):
+        return self.infos.get(url)
+
+
+def _run_in_order(scheduler, urls, **kwargs):
+    """
+    最初のURLの実行中に残りのURLをすべて読み込ませ、残りのURLを実行した順序を返す
+    """
+    order = []
+    holder = {}
+
+    def download(url):
+        if url == urls[0]:
+            # 全てのURLが待ち行列に入るまで、1つしかないワーカーを占有する
+            while holder['batch'].received < len(urls):
+                time.sleep(0.001)
+        else:
+            order.append(url)
+        return True
+
+    batch = BatchDownloader(download, jobs=1, scheduler=scheduler, **kwargs)
+    holder['batch'] = batch
+    results = list(batch.run(urls))
+    assert len(results) == len(urls)
+    return order
+
+
+class TestSchedulers:
+    """スケジューラーのテストクラス"""
+
+    def test_estimate_size(self):
+        """filesize、フォーマットごとのサイズ、再生時間の順に推定すること"""
+        assert estimate_size({'filesize_approx': 1000}) == 1000
+        formats = [
+            {'vcodec': 'avc1', 'filesize': 5000},
+            {'vcodec': 'avc1', 'filesize_approx': 8000},
+            {'vcodec': 'none', 'filesize': 300},
+        ]
+        assert estimate_size({'formats': formats}) == 8300
+        assert estimate_size({'duration': 2}) == 2 * 512 * 1024
+        assert estimate_size({}) is None
+        assert estimate_size(None) is None
+
+    def test_keys(self):
+        """方式ごとに並べ替えのキーが決まること"""
+        assert FifoScheduler().key(3, 'a', 'youtube') < FifoScheduler().key(4, 'b', 'youtube')
+        scheduler = PriorityScheduler({'b': 10})
+        assert scheduler.key(4, 'b', 'youtube') < scheduler.key(3, 'a', 'youtube')
+        scheduler = PlatformScheduler(['niconico', 'youtube'])
+        assert scheduler.key(5, 'a', 'niconico') < scheduler.key(1, 'b', 'youtube') < scheduler.key(0, 'c', 'abema')
+        assert isinstance(create_scheduler('priority'), PriorityScheduler)
+
+    def test_shortest_job_first(self):
+        """推定サイズの小さい順に実行し、推定できないジョブは最後に実行すること"""
+        urls = ['https://example.com/gate', 'https://example.com/long', 'https://example.com/unknown',
+                'https://example.com/short', 'https://example.com/medium']
+        cache = FakeCache({
+            'https://example.com/long': {'duration': 3 * 60 * 60},
+            'https://example.com/short': {'duration': 120},
+            'https://example.com/medium': {'filesize': 100 * 1024 * 1024},
+        })
+        order = _run_in_order(ShortestJobFirstScheduler(cache), urls)
+        assert order == ['https://example.com/short', 'https://example.com/medium',
+                         'https://example.com/long', 'https://example.com/unknown']
+
+    def test_priorities_from_batch_file(self, tmp_path):
+        """バッチファイルで指定した優先度の高い順に実行すること"""
+        path = tmp_path / 'urls.txt'
+        path.write_text(
+            'https://example.com/gate 100\nhttps://example.com/a\nhttps://example.com/b 5\n'
+            'https://example.com/c -1\nhttps://example.com/d 5\n',
+            encoding='utf-8'
+        )
+        priorities = {}
+        urls = list(read_batch_urls(str(path), priorities))
+        assert priorities['https://example.com/b'] == 5
+        order = _run_in_order(PriorityScheduler(priorities), urls)
+        assert order == ['https://example.com/b', 'https://example.com/d', 'https://example.com/a', 'https://example.com/c']
+
+    def test_lanes(self):
+        """レーンを使用する場合、遅いプラットフォームのジョブが他のプラットフォームを待たせないこと"""
+        release = threading.Event()
+        finished = []
+
+        def download(url):
+            if 'abema' in url:
+                assert release.wait(timeout=5)
+            finished.append(url)
+            if 'example.com/2' in url:
+                release.set()
+            return True
+
+        urls = ['https://abema.tv/video/episode/1-1_s1_p1', 'https://example.com/1', 'https://example.com/2']
+        batch = BatchDownloader(download, jobs=1, platform_limits={'abema': 1, 'unknown': 1}, lanes=True)
+        results = list(batch.run(urls))
+        assert len(results) == 3 and all(r.success for r in results)
+        # Abemaのジョブは他のプラットフォームのジョブが終わるまで待っていた
+        assert finished[-1] == urls[0]
@@ -0,0 +1,131 @@
+"""
+ダウンロードセッションのテスト
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import yt_dlp
+from datascoop.session import DownloadSession
+from datascoop.downloaders import VideoDownloader, AudioDownloader
+
+
+class TestDownloadSession:
+    """DownloadSessionのテストクラス"""
+
+    def test_downloader_reuse(self, tmp_path):
+        """同じ設定のダウンローダーが再利用されること"""
+        output_dir = str(tmp_path / "videos")
+        with DownloadSession() as session:
+            with session.downloader(VideoDownloader, output_dir=output_dir) as first:
+                assert first.session is session
+            with session.downloader(VideoDownloader, output_dir=output_dir) as second:
+                assert second is first
+            with session.downloader(VideoDownloader, output_dir=str(tmp_path / "other")) as other:
+                assert other is not first
+
+    def test_downloader_exclusive(self, tmp_path):
+        """使用中のダウンローダーが別の呼び出し元に渡されないこと"""
+        output_dir = str(tmp_path / "audio")
+        with DownloadSession() as session:
+            with session.downloader(AudioDownloader, output_dir=output_dir) as first:
+                with session.downloader(AudioDownloader, output_dir=output_dir) as second:
+                    assert second is not first
+
+    def test_ydl_reuse_with_job_options(self, tmp_path):
+        """yt-dlpのインスタンスが再利用され、ジョブごとのオプションが引き継がれないこと"""
+        hook = lambda d: None
+        with DownloadSession() as session:
+            with session.acquire_ydl({
+                'quiet': True,
+                'outtmpl': str(tmp_path / 'a-%(title)s.%(ext)s'),
+                'format': 'best',
+                'progress_hooks': [hook],
+                'writesubtitles': True,
+            }) as first:
+                assert first.params['writesubtitles'] is True
+                assert first.prepare_filename({'title': 'x', 'ext': 'mp4'}).endswith('a-x.mp4')
+
+            with session.acquire_ydl({
+                'quiet': True,
+                'outtmpl': str(tmp_path / 'b-%(title)s.%(ext)s'),
+            }) as second:
+                assert second is first
+                assert 'writesubtitles' not in second.params
+                assert second.prepare_filename({'title': 'x', 'ext': 'mp4'}).endswith('b-x.mp4')
+
+            # インスタンス生成時のオプションが異なる場合は別のインスタンスを使用する
+            with session.acquire_ydl({'quiet': True, 'noprogress': True}) as third:
+                assert third is not first
+
+    def test_downloader_uses_session_ydl(self, tmp_path):
+        """セッションに紐付いたダウンローダーがプールされたインスタンスを使用すること"""
+        with DownloadSession() as session:
+            with session.downloader(VideoDownloader, output_dir=str(tmp_path)) as downloader:
+                with downloader._open_ydl({'quiet': True}) as first:
+                    pass
+                with downloader._open_ydl({'quiet': True}) as second:
+                    assert second is first
+
+
+class _MediaHandler(BaseHTTPRequestHandler):
+    """固定の内容の動画ファイルを返すハンドラー"""
+
+    def do_GET(self):
+        body = b'\x00' * 4096
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def media_url():
+    """ローカルの配信サーバーを起動し、動画ファイルのURLを返す"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _MediaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}/video.mp4'
+    server.shutdown()
+    server.server_close()
+
+
+def test_job_isolation_with_installed_yt_dlp(tmp_path, media_url):
+    """インストールされているyt-dlpで、再利用したインスタンスの出力先と進捗フックがジョブごとに切り替わること"""
+    calls = {'a': [], 'b': []}
+    with DownloadSession() as session:
+        for name in ('a', 'b'):
+            with session.acquire_ydl({
+                'quiet': True,
+                'outtmpl': str(tmp_path / f'{name}-%(id)s.%(ext)s'),
+                'progress_hooks': [lambda d, name=name: calls[name].append(d['status'])],
+            }) as ydl:
+                ydl.extract_info(media_url)
+        assert len(session._all_ydls) == 1
+
+    assert (tmp_path / 'a-video.mp4').exists() and (tmp_path / 'b-video.mp4').exists()
+    assert calls['a'][-1] == 'finished' and calls['b'][-1] == 'finished'
+    # 前のジョブの進捗フックは呼ばれない
+    assert calls['a'].count('finished') == 1
+
+
+def test_without_reuse_support(tmp_path, monkeypatch):
+    """再利用に必要な機能がないyt-dlpでは、ジョブごとに新しいインスタンスを作成すること"""
+    from datascoop import session as session_module
+    probes = []
+    monkeypatch.setattr(session_module, '_supports_reuse', lambda ydl: probes.append(ydl) or False)
+    created = []
+    init = yt_dlp.YoutubeDL.__init__
+    monkeypatch.setattr(yt_dlp.YoutubeDL, '__init__', lambda self, *args, **kwargs: created.append(self) or init(self, *args, **kwargs))
+    with DownloadSession() as session:
+        with session.acquire_ydl({'quiet': True, 'outtmpl': str(tmp_path / 'a.%(ext)s')}) as first:
+            assert first.prepare_filename({'id': 'x', 'ext': 'mp4'}).endswith('a.mp4')
+        with session.acquire_ydl({'quiet': True, 'outtmpl': str(tmp_path / 'b.%(ext)s')}) as second:
+            assert second is not first
+            assert second.prepare_filename({'id': 'x', 'ext': 'mp4'}).endswith('b.mp4')
+    # 判定は最初の1回のみ行い、2件目以降のジョブではインスタンスを1つだけ作成する
+    assert len(probes) == 1 and len(created) == 3
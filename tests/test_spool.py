@@ -0,0 +1,149 @@
+"""
+共有ジョブキューのテスト
+"""
+
+import time
+import threading
+from datascoop.spool import JobSpool, SpoolWorker, LEASED
+from datascoop.utils.retry import RetryPolicy
+
+URLS = [f'https://www.youtube.com/watch?v=video{i:02d}' for i in range(12)]
+
+
+class TestJobSpool:
+    """JobSpoolのテストクラス"""
+
+    def test_add_and_claim(self, tmp_path):
+        """優先度の高い順にリースを設定して取得し、同じURLは重複して追加しないこと"""
+        with JobSpool(str(tmp_path / 'queue.db')) as spool:
+            assert spool.add(URLS[:3], {'type': 'audio'}, {URLS[2]: 5}) == (3, 0, 0)
+            assert spool.add(URLS[:3]) == (0, 0, 3)
+            job = spool.claim('w1')
+            assert job.url == URLS[2] and job.options == {'type': 'audio'} and job.attempts == 1
+            assert spool.stats()['counts'][LEASED] == 1
+
+    def test_requeue_failed(self, tmp_path):
+        """失敗したジョブは指定した場合のみ待ち行列に戻し、完了したジョブは追加しないこと"""
+        with JobSpool(str(tmp_path / 'queue.db')) as spool:
+            spool.add(URLS[:2])
+            done, failed = spool.claim('w1'), spool.claim('w1')
+            spool.complete(done.id, 'w1', True)
+            spool.complete(failed.id, 'w1', False, 'HTTP Error 404', 'permanent')
+            assert spool.add(URLS[:3]) == (1, 0, 2)
+            assert spool.add(URLS[:3], {'type': 'audio'}, requeue_failed=True) == (0, 1, 2)
+            job = spool.claim('w2')
+            assert job.url == URLS[1] and job.attempts == 1 and job.options == {'type': 'audio'}
+
+    def test_concurrent_claims(self, tmp_path):
+        """複数のプロセス（接続）から同時に取得しても、同じジョブを二重に取得しないこと"""
+        path = str(tmp_path / 'queue.db')
+        with JobSpool(path) as spool:
+            spool.add(URLS)
+        claimed = []
+
+        def claim_all(worker_id):
+            with JobSpool(path) as spool:
+                while (job := spool.claim(worker_id)) is not None:
+                    claimed.append(job.url)
+
+        threads = [threading.Thread(target=claim_all, args=(f'w{i}',)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(claimed) == URLS
+
+    def test_reclaim_expired_lease(self, tmp_path):
+        """期限切れのリースは他のワーカーが回収し、元のワーカーは延長も結果の記録もできないこと"""
+        with JobSpool(str(tmp_path / 'queue.db')) as spool:
+            spool.add(URLS[:1])
+            first = spool.claim('w1', lease_seconds=0.01)
+            assert spool.claim('w2') is None
+            time.sleep(0.05)
+            second = spool.claim('w2')
+            assert second.id == first.id and second.attempts == 2
+            assert not spool.heartbeat(first.id, 'w1')
+            assert not spool.complete(first.id, 'w1', True)
+            assert spool.complete(second.id, 'w2', True)
+            assert spool.is_drained()
+
+    def test_max_attempts(self, tmp_path):
+        """リースの期限切れが上限の回数に達したジョブは失敗とすること"""
+        with JobSpool(str(tmp_path / 'queue.db')) as spool:
+            spool.add(URLS[:1])
+            spool.claim('w1', lease_seconds=0.0, max_attempts=1)
+            time.sleep(0.01)
+            assert spool.claim('w2', max_attempts=1) is None
+            assert spool.stats()['counts']['failed'] == 1
+
+
+class TestSpoolWorker:
+    """SpoolWorkerのテストクラス"""
+
+    def test_workers_share_queue(self, tmp_path):
+        """複数のワーカーが同じキューを分担し、一時的なエラーのジョブは再試行すること"""
+        path = str(tmp_path / 'queue.db')
+        with JobSpool(path) as spool:
+            spool.add(URLS)
+        processed = []
+        lock = threading.Lock()
+
+        def run_job(url, options, journal):
+            with lock:
+                processed.append(url)
+                first = processed.count(url) == 1
+            if url == URLS[0] and first:
+                raise ConnectionResetError('Connection reset by peer')
+            journal.progress_hook(url)({'status': 'finished', 'total_bytes': 1000})
+            return True
+
+        def work(worker_id):
+            with JobSpool(path) as spool:
+                SpoolWorker(
+                    spool, run_job, jobs=2, worker_id=worker_id, poll_interval=0.01,
+                    retry_policy=RetryPolicy(retries=1, base_delay=0.0)
+                ).run(exit_when_empty=True)
+
+        threads = [threading.Thread(target=work, args=(f'w{i}',)) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+
+        assert sorted(processed) == sorted(URLS + URLS[:1])
+        with JobSpool(path) as spool:
+            stats = spool.stats()
+        assert stats['counts']['done'] == len(URLS)
+        assert sum(w['done'] for w in stats['workers']) == len(URLS)
+        assert sum(w['bytes'] for w in stats['workers']) == len(URLS) * 1000
+        assert all(w['stopped_at'] for w in stats['workers'])
+
+    def test_lost_lease_aborts_job(self, tmp_path):
+        """リースを失ったジョブは中断し、結果を記録しないこと"""
+        path = str(tmp_path / 'queue.db')
+        with JobSpool(path) as spool:
+            spool.add(URLS[:1])
+        aborted = threading.Event()
+
+        def run_job(url, options, journal):
+            hook = journal.progress_hook(url)
+            # 他のワーカーがリースを回収したものとする
+            with JobSpool(path) as other:
+                other._conn.execute("UPDATE jobs SET worker = 'w2'")
+            try:
+                while True:
+                    hook({'status': 'downloading'})
+                    time.sleep(0.01)
+            except Exception:
+                aborted.set()
+                raise
+
+        with JobSpool(path) as spool:
+            worker = SpoolWorker(spool, run_job, worker_id='w1', lease_seconds=0.3, poll_interval=0.01)
+            thread = threading.Thread(target=worker.run)
+            thread.start()
+            assert aborted.wait(timeout=5)
+            worker.stop()
+            thread.join(timeout=5)
+            assert spool.stats()['counts'][LEASED] == 1
+            assert worker.totals == {'done': 0, 'failed': 0, 'retried': 0}
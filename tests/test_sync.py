@@ -0,0 +1,151 @@
+"""
+チャンネルの差分同期のテスト
+"""
+
+import multiprocessing
+import yt_dlp
+from datascoop import cli
+from datascoop.downloaders.youtube import YouTubeDownloader, channel_videos_url, new_channel_entries
+from datascoop.utils.sync_state import ChannelSyncState, is_known_entry
+
+CHANNEL_URL = 'https://www.youtube.com/@example'
+
+
+class FakeYoutubeDL(yt_dlp.YoutubeDL):
+    """チャンネルの動画一覧をネットワークにアクセスせずに返すyt-dlp"""
+
+    def __init__(self, video_ids, fetched):
+        super().__init__({'quiet': True})
+        self.video_ids = video_ids
+        self.fetched = fetched
+
+    def extract_info(self, url, download=True, **kwargs):
+        def entries():
+            # 列挙した分だけ動画一覧を取得したものとして記録する
+            for video_id in self.video_ids:
+                self.fetched.append(video_id)
+                yield {'_type': 'url', 'ie_key': 'Youtube', 'id': video_id, 'url': video_id}
+
+        return {
+            '_type': 'playlist', 'id': 'UCexample', 'title': 'Example - Videos',
+            'extractor': 'youtube:tab', 'extractor_key': 'YoutubeTab',
+            'webpage_url': url, 'entries': entries(),
+        }
+
+
+class TestChannelSync:
+    """YouTubeDownloader.sync_channelのテストクラス"""
+
+    def _sync(self, tmp_path, monkeypatch, state, video_ids, max_videos=None, failing=()):
+        """動画一覧とダウンロードを置き換えて同期し、(結果, 取得した動画ID, ダウンロードした動画ID) を返す"""
+        downloader = YouTubeDownloader(output_dir=str(tmp_path))
+        fetched, downloaded = [], []
+        monkeypatch.setattr(downloader, '_open_ydl', lambda opts: FakeYoutubeDL(video_ids, fetched))
+
+        def download_entries(entries, ydl_opts, jobs):
+            ids = [entry['id'] for entry, _ in entries]
+            downloaded.extend(ids)
+            failed = len([i for i in ids if i in failing])
+            return [f'{i}.mp4' for i in ids if i not in failing], failed
+
+        monkeypatch.setattr(downloader, '_download_entries', download_entries)
+        result = downloader.sync_channel(CHANNEL_URL, state, max_videos=max_videos)
+        return result, fetched, downloaded
+
+    def test_downloads_only_new_videos(self, tmp_path, monkeypatch):
+        """2回目以降は同期済みの動画に到達した時点で列挙を打ち切り、新しい動画のみをダウンロードすること"""
+        state = ChannelSyncState(str(tmp_path / 'sync.json'))
+        history = [f'v{i:04d}' for i in range(100, 0, -1)]
+
+        files, fetched, downloaded = self._sync(tmp_path, monkeypatch, state, history, max_videos=3)
+        assert files == ['v0100.mp4', 'v0099.mp4', 'v0098.mp4']
+        assert len(fetched) == 3
+        assert state.get(channel_videos_url(CHANNEL_URL))['video_id'] == 'v0100'
+
+        files, fetched, downloaded = self._sync(tmp_path, monkeypatch, state, ['v0102', 'v0101', *history])
+        assert downloaded == ['v0102', 'v0101']
+        # 同期済みの最新の動画より後は取得しない
+        assert fetched == ['v0102', 'v0101', 'v0100']
+        assert state.get(channel_videos_url(CHANNEL_URL))['video_id'] == 'v0102'
+
+        files, fetched, downloaded = self._sync(tmp_path, monkeypatch, state, ['v0102', 'v0101', *history])
+        assert files == [] and downloaded == []
+        assert fetched == ['v0102']
+
+    def test_max_videos_catches_up_oldest_first(self, tmp_path, monkeypatch):
+        """新しい動画が上限より多い場合は古い順にダウンロードし、残りを次回以降の同期で取りこぼさないこと"""
+        state = ChannelSyncState(str(tmp_path / 'sync.json'))
+        state.update(channel_videos_url(CHANNEL_URL), ['v0100'])
+        listing = [f'v{i:04d}' for i in range(106, 0, -1)]
+
+        for expected in (['v0102', 'v0101'], ['v0104', 'v0103'], ['v0106', 'v0105'], []):
+            files, _, downloaded = self._sync(tmp_path, monkeypatch, state, listing, max_videos=2)
+            assert downloaded == expected
+            assert files == [f'{i}.mp4' for i in expected]
+        assert state.get(channel_videos_url(CHANNEL_URL))['video_id'] == 'v0106'
+
+    def test_failure_keeps_mark(self, tmp_path, monkeypatch):
+        """ダウンロードに失敗した場合はハイウォーターマークを更新しないこと"""
+        state = ChannelSyncState(str(tmp_path / 'sync.json'))
+        state.update(channel_videos_url(CHANNEL_URL), ['v0001'])
+
+        files, _, _ = self._sync(tmp_path, monkeypatch, state, ['v0003', 'v0002', 'v0001'], failing=('v0002',))
+        assert files is None
+        assert state.get(channel_videos_url(CHANNEL_URL))['video_id'] == 'v0001'
+
+        files, _, downloaded = self._sync(tmp_path, monkeypatch, state, ['v0003', 'v0002', 'v0001'])
+        assert downloaded == ['v0003', 'v0002']
+        assert state.get(channel_videos_url(CHANNEL_URL))['recent_ids'][:3] == ['v0003', 'v0002', 'v0001']
+
+
+def _update_channels(path, prefix):
+    """別のプロセスで複数のチャンネルの状態を更新する"""
+    state = ChannelSyncState(path)
+    for i in range(20):
+        state.update(f'https://www.youtube.com/@{prefix}{i}/videos', [f'{prefix}{i}'])
+
+
+def test_run_sync_throughput_profile(tmp_path, monkeypatch):
+    """syncサブコマンドでも指定したプロファイルでダウンローダーを作成すること"""
+    profiles = []
+
+    def sync_channel(self, channel_url, state, **kwargs):
+        profiles.append(self.throughput_profile)
+        return []
+
+    monkeypatch.setattr(YouTubeDownloader, 'sync_channel', sync_channel)
+    assert cli.run_sync([CHANNEL_URL, '--state', str(tmp_path / 'state.json'), '-o', str(tmp_path),
+                         '--throughput-profile', 'datacenter'])
+    assert profiles == ['datacenter']
+
+
+def test_concurrent_processes(tmp_path):
+    """複数のプロセスが別のチャンネルを同時に同期しても、互いの状態を失わないこと"""
+    path = str(tmp_path / 'sync.json')
+    context = multiprocessing.get_context('spawn')
+    processes = [context.Process(target=_update_channels, args=(path, prefix)) for prefix in ('a', 'b', 'c')]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=60)
+        assert process.exitcode == 0
+    assert len(ChannelSyncState(path).channels()) == 60
+
+
+def test_known_entries():
+    """削除された動画や投稿日の古い動画でも列挙を打ち切れること"""
+    mark = {'video_id': 'deleted', 'upload_date': '20240301', 'recent_ids': ['deleted', 'old']}
+    assert is_known_entry({'id': 'old'}, mark)
+    assert is_known_entry({'id': 'x', 'upload_date': '20240201'}, mark)
+    assert not is_known_entry({'id': 'x', 'upload_date': '20240302'}, mark)
+    assert not is_known_entry({'id': 'x'}, None)
+
+    entries = [{'id': 'new'}, None, {'id': 'old'}, {'id': 'older'}]
+    assert [e['id'] for e in new_channel_entries(entries, mark)] == ['new']
+
+
+def test_channel_videos_url():
+    """チャンネルのトップページのURLを動画タブのURLに変換すること"""
+    assert channel_videos_url('https://www.youtube.com/@example') == 'https://www.youtube.com/@example/videos'
+    assert channel_videos_url('https://www.youtube.com/channel/UCabc/') == 'https://www.youtube.com/channel/UCabc/videos'
+    assert channel_videos_url('https://www.youtube.com/@example/streams') == 'https://www.youtube.com/@example/streams'